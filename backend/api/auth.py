@@ -6,6 +6,7 @@
 from flask import Blueprint, request, jsonify, current_app
 from werkzeug.security import check_password_hash, generate_password_hash
 from models import db, Admin
+from utils.token_cache import get_cached_admin_id, remember_token
 import jwt
 from datetime import datetime, timedelta
 from functools import wraps
@@ -39,67 +40,61 @@ def create_token(admin_id):
         'iat': datetime.utcnow()  # 添加token创建时间
     }
     token = jwt.encode(payload, JWT_SECRET_KEY, algorithm='HS256')
-    print('\n=== Token Creation ===')
-    print('Admin ID:', admin_id)
-    print('Token:', token)
-    print('=== End Token Creation ===\n')
+    current_app.logger.debug('Token created for admin %s', admin_id)
     return token
 
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
-        print('\n=== Token Verification Start ===')
-        print('Request Method:', request.method)
-        print('Request Path:', request.path)
-        print('Request Headers:', dict(request.headers))
+        logger = current_app.logger
+        logger.debug('Token verification: %s %s', request.method, request.path)
         
         # 检查 Authorization 头
         auth_header = request.headers.get('Authorization')
-        print('Authorization Header:', auth_header)
         
         if not auth_header:
-            print('No Authorization header found')
+            logger.debug('No Authorization header found')
             return jsonify({'msg': 'Token is missing'}), 401
         
         try:
             # 检查是否是Bearer token
             parts = auth_header.split()
-            print('Auth header parts:', parts)
             
             if len(parts) != 2:
-                print('Invalid token format: wrong number of parts')
+                logger.debug('Invalid token format: wrong number of parts')
                 return jsonify({'msg': 'Invalid token format'}), 401
                 
             if parts[0] != 'Bearer':
-                print('Invalid token format: not a Bearer token')
+                logger.debug('Invalid token format: not a Bearer token')
                 return jsonify({'msg': 'Invalid token format'}), 401
             
             token = parts[1]
-            print('Extracted token:', token)
+
+            # 近期验证过的令牌直接放行，不再解码和查库
+            if get_cached_admin_id(token) is not None:
+                return f(*args, **kwargs)
             
             try:
-                print('Attempting to decode token with secret key:', JWT_SECRET_KEY)
                 data = jwt.decode(token, JWT_SECRET_KEY, algorithms=['HS256'])
-                print('Decoded token data:', data)
                 current_admin_id = data['admin_id']
                 
                 # 验证管理员是否存在
-                admin = Admin.query.get(current_admin_id)
+                admin = db.session.get(Admin, current_admin_id)
                 if not admin:
-                    print('Admin not found:', current_admin_id)
+                    logger.info('Token rejected: admin %s not found', current_admin_id)
                     return jsonify({'msg': 'Invalid admin'}), 401
-                    
-                print('Token verification successful')
-                print('=== Token Verification End ===\n')
+
+                remember_token(token, current_admin_id, data['exp'])
+                logger.debug('Token verified for admin %s', current_admin_id)
                 return f(*args, **kwargs)
             except jwt.ExpiredSignatureError:
-                print('Token has expired')
+                logger.debug('Token has expired')
                 return jsonify({'msg': 'Token has expired'}), 401
             except jwt.InvalidTokenError as e:
-                print('Invalid token:', str(e))
+                logger.info('Invalid token: %s', e)
                 return jsonify({'msg': 'Invalid token'}), 401
         except Exception as e:
-            print('Unexpected error:', str(e))
+            logger.warning('Token verification failed: %s', e)
             return jsonify({'msg': 'Token verification failed'}), 401
             
     return decorated
@@ -110,22 +105,13 @@ def login():
     username = data.get('username')
     password = data.get('password')
     
-    print('\n=== Login Attempt ===')
-    print('Username:', username)
-    print('Request Data:', data)
-    
     admin = Admin.query.filter_by(username=username).first()
     if not admin:
-        print('Login failed: User not found')
-        print('=== End Login Attempt ===\n')
+        current_app.logger.info('Login failed for %r: user not found', username)
         return jsonify({'msg': '用户名或密码错误'}), 401
         
     if not check_password_hash(admin.password_hash, password):
-        print('Login failed: Invalid password')
-        print('admin.password_hash:', admin.password_hash)
-        print('输入密码:', password)
-        print('check_password_hash:', check_password_hash(admin.password_hash, password))
-        print('=== End Login Attempt ===\n')
+        current_app.logger.info('Login failed for %r: invalid password', username)
         return jsonify({'msg': '用户名或密码错误'}), 401
         
     token = create_token(admin.id)
@@ -134,9 +120,7 @@ def login():
         'admin_id': admin.id,
         'token': token
     }
-    print('Login successful')
-    print('Response:', response)
-    print('=== End Login Attempt ===\n')
+    current_app.logger.info('Login successful for %r', username)
     return jsonify(response)
 
 @bp.route('/verify-token', methods=['GET'])
@@ -168,7 +152,7 @@ def change_password():
     if not is_valid:
         return jsonify({'msg': message}), 400
         
-    # 使用更安全的密码哈希方法
+    # 使用更安全的密码哈希方法（提交时 token_cache 会清除该管理员的缓存令牌）
     admin.password_hash = generate_password_hash(new_password, method='pbkdf2:sha256')
     db.session.commit()
     return jsonify({'msg': 'Password updated'})
\ No newline at end of file
@@ -6,14 +6,23 @@
 
 from flask import Blueprint, request, jsonify, current_app
 from flask_cors import cross_origin
-from models import db, Questionnaire, Dimension, Question, Option, BranchRule, Submission, Answer, AssessmentLevel, DimensionScore
+from models import db, Questionnaire, Dimension, Question, Option, BranchRule, Submission, Answer, AssessmentLevel, SubmissionResult
 from api.auth import token_required
+from utils.questionnaire_cache import get_questionnaire_definition, invalidate_questionnaire
 from datetime import datetime
 import uuid
 from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
 import json
 from werkzeug.exceptions import NotFound
-from pypinyin import lazy_pinyin
+from utils.grouping import generate_group_key, text_pinyin
+from utils.scoring_plan import get_scoring_plan
+from utils.result_snapshot import unpack_result, regenerate_result_snapshot
+from utils.answer_options import option_filter
+from utils.submission_writer import save_submissions, save_keyed_submissions, submission_summary, find_by_client_keys
+from utils.submission_queue import queue_enabled, enqueue, get_status as get_submit_queue_status
+from utils.pagination import page_args, keyset_page
+from utils.metrics import count_submission
 import re
 
 bp = Blueprint('questionnaire', __name__, url_prefix='/api/questionnaire')
@@ -21,14 +30,6 @@ bp = Blueprint('questionnaire', __name__, url_prefix='/api/questionnaire')
 def generate_access_code():
     return str(uuid.uuid4())[:8]
 
-def generate_group_key(question, option):
-    """
-    基于题目和选项的拼音生成稳定的分组键
-    """
-    question_pinyin = ''.join(lazy_pinyin(question.text))
-    option_pinyin = ''.join(lazy_pinyin(option.text))
-    return f"{question_pinyin}_{option_pinyin}"
-
 def check_question_has_assessment_config(question_id):
     """检查题目是否配置了评估规则"""
     question = Question.query.get(question_id)
@@ -36,7 +37,7 @@ def check_question_has_assessment_config(question_id):
         return False, 0
         
     # 检查是否有基于该题目的评估配置
-    question_pinyin = ''.join(lazy_pinyin(question.text))
+    question_pinyin = text_pinyin(question.text)
     
     count = AssessmentLevel.query.filter(
         AssessmentLevel.group_key.like(f"{question_pinyin}_%"),
@@ -45,6 +46,14 @@ def check_question_has_assessment_config(question_id):
     
     return count > 0, count
 
+def invalidate_level_owners(qid, level):
+    """评估等级变更后标记相关问卷；维度等级可能配置在子问卷下，而维度归属父问卷"""
+    invalidate_questionnaire(qid)
+    if level.dimension_id:
+        owner_id = db.session.query(Dimension.questionnaire_id).filter_by(id=level.dimension_id).scalar()
+        if owner_id and owner_id != qid:
+            invalidate_questionnaire(owner_id)
+
 # ==================== 问卷基础管理 ====================
 
 @bp.route('/', methods=['POST'])
@@ -374,6 +383,7 @@ def add_dimension(qid):
             weight=weight
         )
         db.session.add(dimension)
+        invalidate_questionnaire(qid)
         db.session.commit()
         
         return jsonify({
@@ -408,6 +418,7 @@ def delete_dimension(qid, dimension_id):
         if not dim:
             return jsonify({'code': 404, 'msg': '维度不存在'}), 404
         dim.is_deleted = True
+        invalidate_questionnaire(dim.questionnaire_id)
         db.session.commit()
         return jsonify({'code': 0, 'msg': '删除成功'})
     except Exception as e:
@@ -423,6 +434,7 @@ def update_dimension(qid, dimension_id):
         dimension = Dimension.query.filter_by(id=dimension_id, questionnaire_id=qid, is_deleted=False).first_or_404()
         dimension.name = data.get('name')
         dimension.weight = data.get('weight')
+        invalidate_questionnaire(qid)
         db.session.commit()
         return jsonify({'code': 0, 'msg': 'Success'})
     except Exception as e:
@@ -501,6 +513,7 @@ def add_question(qid):
                 )
                 db.session.add(rule)
                 
+        invalidate_questionnaire(qid)
         db.session.commit()
         
         return jsonify({
@@ -544,6 +557,7 @@ def delete_question(qid, question_id):
         if not question:
             return jsonify({'code': 404, 'msg': '题目不存在'}), 404
         question.is_deleted = True
+        invalidate_questionnaire(question.questionnaire_id)
         db.session.commit()
         return jsonify({'code': 0, 'msg': '删除成功'})
     except Exception as e:
@@ -570,6 +584,7 @@ def reorder_questions(qid):
             if q:
                 q.order = item['order']
                 
+        invalidate_questionnaire(qid)
         db.session.commit()
         
         return jsonify({
@@ -635,6 +650,7 @@ def update_question(qid, question_id):
                         next_questionnaire_id=br_data.get('next_questionnaire_id')
                     )
                     db.session.add(rule)
+        invalidate_questionnaire(qid)
         db.session.commit()
         return jsonify({
             'code': 0,
@@ -724,6 +740,7 @@ def save_assessment_level(qid):
         level.opinion = data.get('opinion')
         level.group_key = data.get('group_key')  # 保存分组
         level.dimension_id = data.get('dimension_id')  # 保存维度
+        invalidate_level_owners(qid, level)
         
         db.session.commit()
         
@@ -756,6 +773,7 @@ def delete_assessment_level(qid, level_id):
         if not level:
             return jsonify({'code': 404, 'msg': '规则不存在'}), 404
         level.is_deleted = True
+        invalidate_level_owners(qid, level)
         db.session.commit()
         return jsonify({'code': 0, 'msg': '删除成功'})
     except Exception as e:
@@ -854,79 +872,9 @@ def fill_by_access_code(access_code):
                 'msg': '访问码不能为空'
             }), 400
 
-        questionnaire = Questionnaire.query.filter_by(
-            access_code=access_code, 
-            is_published=True
-        ).first_or_404()
-
-        # 查所有题目，按order排序
-        questions = Question.query.filter_by(
-            questionnaire_id=questionnaire.id,
-            is_deleted=False
-        ).order_by(Question.order).all()
-
-        # 查所有维度
-        dimensions = Dimension.query.filter_by(
-            questionnaire_id=questionnaire.id,
-            is_deleted=False
-        ).all()
-
-        # 组装题目数据
-        questions_data = []
-        for q in questions:
-            options = Option.query.filter_by(question_id=q.id, is_deleted=False).all()
-            branch_rules = []
-            for br in BranchRule.query.filter_by(question_id=q.id, is_deleted=False).all():
-                # 获取分支问卷的 access_code
-                next_questionnaire = Questionnaire.query.get(br.next_questionnaire_id)
-                branch_rule = {
-                    'option_id': br.option_id,
-                    'next_questionnaire_id': br.next_questionnaire_id,
-                    'next_questionnaire_access_code': next_questionnaire.access_code if next_questionnaire else None
-                }
-                branch_rules.append(branch_rule)
-            
-            questions_data.append({
-                'id': q.id,
-                'text': q.text,
-                'type': q.type,
-                'dimension_id': q.dimension_id,
-                'order': q.order,
-                'multiline': getattr(q, 'multiline', False),
-                'input_rows': getattr(q, 'input_rows', 1),
-                'input_type': getattr(q, 'input_type', None),
-                'options': [
-                    {
-                        'id': opt.id,
-                        'text': opt.text,
-                        'value': opt.value,
-                        'is_other': opt.is_other
-                    } for opt in options
-                ],
-                'branch_rules': branch_rules
-            })
-
-        return jsonify({
-            'code': 0,
-            'msg': 'Success',
-            'data': {
-                'id': questionnaire.id,
-                'title': questionnaire.title,
-                'description': questionnaire.description,
-                'status': questionnaire.status,
-                'created_at': questionnaire.created_at.isoformat() if questionnaire.created_at else None,
-                'access_code': questionnaire.access_code,
-                'parent_id': questionnaire.parent_id,
-                'dimensions': [
-                    {
-                        'id': dim.id,
-                        'name': dim.name,
-                        'weight': dim.weight
-                    } for dim in dimensions
-                ],
-                'questions': questions_data
-            }
-        })
+        # 问卷结构按版本缓存，序列化后的响应体直接返回
+        definition = get_questionnaire_definition(access_code)
+        return current_app.response_class(definition.body, mimetype=current_app.json.mimetype)
     except NotFound:
         return jsonify({
             'code': 404,
@@ -953,9 +901,13 @@ def submit_answers(access_code):
         # 从请求中提取答案数据
         data = request.json
         answers = data.get('answers', [])
+        # 幂等键：前端每次填写生成一次，网络重试时不变，重复提交返回原答卷；空串视为未提供
+        client_key = request.headers.get('Idempotency-Key') or data.get('client_key') or None
         
         if not answers:
             raise ValueError('答案数据不能为空')
+        if client_key is not None and (not isinstance(client_key, str) or len(client_key) > 64):
+            raise ValueError('client_key 应为 1~64 个字符')
 
         # 获取问卷
         questionnaire = Questionnaire.query.filter_by(
@@ -963,264 +915,137 @@ def submit_answers(access_code):
             is_published=True
         ).first_or_404()
 
-        # 开始事务
-        db.session.begin_nested()
+        # 评分所需配置按问卷版本缓存，评分过程不再查询数据库
+        plan = get_scoring_plan(questionnaire)
+        scored = plan.score(answers)
 
-        # 创建提交记录
-        submission = Submission(
-            questionnaire_id=questionnaire.id,
-            submitted_at=datetime.now()
-        )
-        db.session.add(submission)
-        db.session.flush()
+        if queue_enabled():
+            # 队列模式：校验通过即落盘返回令牌，由 flask drain-submissions 分批写库
+            token = enqueue(questionnaire.id, answers, client_key)
+            count_submission('queued')
+            return jsonify({
+                'code': 0,
+                'msg': '已提交，正在处理',
+                'data': {'token': token, 'status': 'pending'}
+            }), 202
 
-        # 批量处理答案
-        answers_to_insert = []
-        total_score = 0
-        
-        # 预先获取所有问题
-        question_ids = [ans.get('question_id') for ans in answers]
-        questions = {q.id: q for q in Question.query.filter(Question.id.in_(question_ids), Question.is_deleted==False).all()}
-        
-        # 预先获取所有选项
-        option_ids = []
-        for ans in answers:
-            if isinstance(ans.get('answer'), list):
-                option_ids.extend(ans.get('answer'))
-            elif ans.get('answer'):
-                option_ids.append(ans.get('answer'))
-        options = {o.id: o for o in Option.query.filter(Option.id.in_(option_ids), Option.is_deleted==False).all()}
-
-        for answer_data in answers:
-            question_id = answer_data.get('question_id')
-            question = questions.get(question_id)
-            if not question:
-                continue
-
-            option_id = answer_data.get('answer')
-            try:
-                option_id = int(option_id)
-            except (TypeError, ValueError):
-                option_id = None
-            text = answer_data.get('text')
-
-            # 验证答案数据
-            if not question_id:
-                raise ValueError('题目ID不能为空')
-            if option_id is None and not text and not (isinstance(answer_data.get('answer'), list) and answer_data.get('answer')):
-                raise ValueError('答案不能为空')
-
-            # 计算分值
-            value = 0
-            selected_ids = []
-            if question.type == 'multiple':
-                # 多选题，answer字段为选项ID数组
-                answer_val = answer_data.get('answer')
-                if isinstance(answer_val, list):
-                    selected_ids = answer_val
-                elif isinstance(answer_val, str):
-                    selected_ids = [int(x) for x in answer_val.split(',') if x.strip()]
-                else:
-                    selected_ids = []
-                for opt_id in selected_ids:
-                    option = options.get(opt_id)
-                    if not option:
-                        raise ValueError(f'选项不存在: {opt_id}')
-                    value += option.value if option.value is not None else 0
-                option_id = None  # 多选题不设置单个option_id
-            elif option_id is not None:
-                # 单选题
-                option = options.get(option_id)
-                if not option:
-                    raise ValueError(f'选项不存在: {option_id}')
-                value = option.value if option and option.value is not None else 0
-
-            total_score += value
-
-            # 判断是否需要保存 text_answer
-            save_text_answer = False
-            if text and isinstance(text, str):
-                if question.type == 'multiple':
-                    # 多选题，判断选中的选项里是否有 is_other
-                    selected_options = [options.get(opt_id) for opt_id in selected_ids if opt_id in options]
-                    if any(opt.is_other for opt in selected_options if opt):
-                        save_text_answer = True
-                elif question.type == 'single':
-                    option = options.get(option_id)
-                    if option and option.is_other:
-                        save_text_answer = True
-                elif question.type == 'text':
-                    save_text_answer = True
-
-            # 创建答案记录
-            if question.type == 'address':
-                answer = Answer(
-                    submission_id=submission.id,
-                    question_id=question_id,
-                    text_answer=answer_data.get('text')
-                )
-                answers_to_insert.append(answer)
-                continue
-
-            answer = Answer(
-                submission_id=submission.id,
-                question_id=question_id,
-                option_id=option_id if option_id is not None else None,
-                value=value,
-                selected_option_ids=json.dumps(selected_ids) if question.type == 'multiple' else None,
-                text_answer=text if save_text_answer else None
-            )
-            answers_to_insert.append(answer)
-
-        # 批量插入答案
-        db.session.bulk_save_objects(answers_to_insert)
-
-        # 计算维度分数和评估
-        raw_dim_scores = {}
-        for answer in answers_to_insert:
-            question = questions.get(answer.question_id)
-            if question and question.dimension_id:
-                # 排除"用户基本信息(不参与得分评估)"维度
-                dimension = Dimension.query.get(question.dimension_id)
-                if dimension and dimension.name != '用户基本信息(不参与得分评估)':
-                    raw_dim_scores.setdefault(question.dimension_id, 0)
-                    raw_dim_scores[question.dimension_id] += answer.value if answer.value is not None else 0
-        for dim_id, raw_score in raw_dim_scores.items():
-            current_app.logger.info(f"[维度原始分] Dimension ID: {dim_id}, Raw Score: {raw_score}")
-
-        # 计算加权分
-        weighted_dim_scores = {}
-        for dim_id, raw_score in raw_dim_scores.items():
-            dimension = Dimension.query.get(dim_id)
-            weight = dimension.weight if dimension else 1.0
-            weighted_score = raw_score * weight
-            weighted_dim_scores[dim_id] = weighted_score
-            current_app.logger.info(f"[维度加权分] Dimension ID: {dim_id}, Weighted Score: {weighted_score}, Weight: {weight}")
-
-        # 确定用户分组
-        group_key = None
-        # 获取基本信息维度
-        basic_dimension = Dimension.query.filter_by(
-            questionnaire_id=questionnaire.id,
-            name='用户基本信息(不参与得分评估)'
-        ).first()
-        
-        if basic_dimension:
-            current_app.logger.info(f"[分组确定] 找到基本信息维度: {basic_dimension.id}")
-            # 专门查找"所在科室"题目的答案来确定分组
-            for answer_data in answers:
-                question_id = answer_data.get('question_id')
-                question = questions.get(question_id)  # 使用预先获取的问题字典
-                if question and question.dimension_id == basic_dimension.id:
-                    current_app.logger.info(f"[分组确定] 检查基本信息题目: {question.id} - {question.text}")
-                    # 优先查找"所在科室"题目，因为这是分组的关键字段
-                    if question.type == 'single' and '科室' in question.text:
-                        option_id_raw = answer_data.get('answer')
-                        if option_id_raw:
-                            try:
-                                option_id = int(option_id_raw)  # 确保转换为整数
-                                option = options.get(option_id)  # 使用预先获取的选项字典
-                                if option:
-                                    group_key = generate_group_key(question, option)
-                                    current_app.logger.info(f"[分组确定] 生成分组键: {group_key} (题目: {question.text}, 选项: {option.text})")
-                                    break
-                                else:
-                                    current_app.logger.warning(f"[分组确定] 选项不存在: {option_id}")
-                            except (ValueError, TypeError) as e:
-                                current_app.logger.warning(f"[分组确定] 选项ID转换失败: {option_id_raw}, 错误: {e}")
-                    elif question.type == 'address':
-                        # 地址题暂时不处理分组
-                        current_app.logger.info(f"[分组确定] 跳过地址题目: {question.text}")
-                        pass
-        else:
-            current_app.logger.warning("[分组确定] 未找到基本信息维度")
-            
-        current_app.logger.info(f"[分组确定] 最终分组键: {group_key}")
-
-        dim_assessments = []
-        for dim_id, score in weighted_dim_scores.items():
-            # 维度评估等级查询，考虑分组
-            level_query = AssessmentLevel.query.filter(
-                AssessmentLevel.dimension_id == dim_id,
-                AssessmentLevel.min_score <= score,
-                AssessmentLevel.max_score >= score
-            )
-            
-            # 如果有分组，优先匹配分组规则
-            if group_key:
-                level = level_query.filter(AssessmentLevel.group_key == group_key).first()
-                if not level:
-                    # 如果没有找到分组规则，查找没有分组的规则
-                    level = level_query.filter(AssessmentLevel.group_key.is_(None)).first()
-            else:
-                # 没有分组，查找没有分组的规则
-                level = level_query.filter(AssessmentLevel.group_key.is_(None)).first()
-                
-            current_app.logger.info(f"Dimension ID: {dim_id}, Score: {score}, Group: {group_key}, Level: {level.name if level else 'None'}")
-            dim_assessments.append({
-                'dimension_id': dim_id,
-                'score': score,
-                'assessment_level': level.name if level else None,
-                'assessment_opinion': level.opinion if level else None
+        current_app.logger.info(f"[submit_answers] Group: {scored.group_key}, Assessment Level: {scored.assessment_level}, Opinion: {scored.assessment_opinion}")
+
+        # 答卷、答案、区域/选项索引、维度分数、结果快照和统计汇总在同一事务内写入，
+        # 每张表一条语句，语句数与答案数、维度数无关
+        # 重复的幂等键由唯一索引拒绝，正常提交不多查一次
+        try:
+            submission, = save_submissions(questionnaire, plan, [(scored, datetime.now(), client_key)])
+
+            # 提交后对象会过期，先取出响应字段，避免提交后再查一次答卷
+            response_data = {
+                'code': 0,
+                'msg': '提交成功',
+                'data': submission_summary(submission)
+            }
+
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            original = find_by_client_keys(questionnaire.id, [client_key]).get(client_key) if client_key else None
+            if original is None:
+                raise
+            count_submission('duplicate')
+            return jsonify({
+                'code': 0,
+                'msg': '提交成功',
+                'data': original
             })
 
-        # 保存维度分数到数据库
-        for dim_assessment in dim_assessments:
-            # 获取维度的权重
-            dimension = Dimension.query.get(dim_assessment['dimension_id'])
-            weight = dimension.weight if dimension else 1.0
-            
-            dim_score = DimensionScore(
-                submission_id=submission.id,
-                dimension_id=dim_assessment['dimension_id'],
-                score=dim_assessment['score'],
-                weight=weight,
-                assessment_level=dim_assessment['assessment_level'],
-                assessment_opinion=dim_assessment['assessment_opinion']
-            )
-            db.session.add(dim_score)
+        count_submission('success', answers=len(scored.answers))
+        return jsonify(response_data)
 
-        # 总分也用加权分数之和
-        submission.total_score = sum(weighted_dim_scores.values())
+    except ValueError as e:
+        db.session.rollback()
+        count_submission('invalid')
+        return jsonify({
+            'code': 400,
+            'msg': str(e)
+        }), 400
+    except Exception as e:
+        db.session.rollback()
+        count_submission('error')
+        current_app.logger.error(f"提交答案失败: {str(e)}")
+        return jsonify({
+            'code': 500,
+            'msg': f'提交失败: {str(e)}'
+        }), 500
 
-        # 计算评估等级，考虑分组
-        level_query = AssessmentLevel.query.filter(
-            AssessmentLevel.questionnaire_id == questionnaire.id,
-            AssessmentLevel.min_score <= submission.total_score,
-            AssessmentLevel.max_score >= submission.total_score,
-            AssessmentLevel.dimension_id.is_(None)  # 总分配置
-        )
-        
-        # 如果有分组，优先匹配分组规则
-        if group_key:
-            level = level_query.filter(AssessmentLevel.group_key == group_key).first()
-            if not level:
-                # 如果没有找到分组规则，查找没有分组的规则
-                level = level_query.filter(AssessmentLevel.group_key.is_(None)).first()
-        else:
-            # 没有分组，查找没有分组的规则
-            level = level_query.filter(AssessmentLevel.group_key.is_(None)).first()
+@bp.route('/fill/<access_code>/submit-batch', methods=['POST'])
+def submit_answers_batch(access_code):
+    """批量上传离线采集的答卷，逐份返回结果，部分失败不影响其余答卷
 
-        # 添加日志以检查评估等级和意见
-        current_app.logger.info(f"[submit_answers] Group: {group_key}, Assessment Level: {level.name if level else 'None'}, Opinion: {level.opinion if level else 'None'}")
-        # 更新提交记录
-        submission.group_key = group_key  # 保存分组键
-        submission.assessment_level = level.name if level else None
-        submission.assessment_opinion = level.opinion if level else None
+    请求体 {"submissions": [{"client_key": "...", "answers": [...], "submitted_at": "ISO 时间，可选"}]}，
+    client_key 由采集端生成，同一问卷内重复上传的标识返回原答卷而不再写入。
+    状态为 retry 的答卷因数据库暂时不可用未写入，可用同一 client_key 重新上传。
 
-        # 提交事务
-        db.session.commit()
+    Args:
+        access_code: 问卷访问码
+
+    Returns:
+        JSON response with results in request order, status created/duplicate/error/retry
+    """
+    try:
+        items = (request.json or {}).get('submissions') or []
+        if not items:
+            raise ValueError('答卷数据不能为空')
+        max_items = current_app.config['SUBMIT_BATCH_MAX_ITEMS']
+        if len(items) > max_items:
+            raise ValueError(f'单次最多上传 {max_items} 份答卷')
+
+        questionnaire = Questionnaire.query.filter_by(
+            access_code=access_code,
+            is_published=True
+        ).first_or_404()
+        # 整批共用一份评分计划
+        plan = get_scoring_plan(questionnaire)
+
+        results = [None] * len(items)
+        entries = {}  # client_key -> (客户端标识, 评分结果, 提交时间)
+        positions = {}  # client_key -> 在请求中的下标
+        for index, item in enumerate(items):
+            client_key = item.get('client_key') if isinstance(item, dict) else None
+            try:
+                if not isinstance(client_key, str) or not client_key or len(client_key) > 64:
+                    raise ValueError('client_key 应为 1~64 个字符')
+                if client_key in entries:
+                    raise ValueError('同一请求中 client_key 重复')
+                if not item.get('answers'):
+                    raise ValueError('答案数据不能为空')
+                submitted_at = datetime.now()
+                if item.get('submitted_at'):
+                    try:
+                        submitted_at = datetime.fromisoformat(item['submitted_at'])
+                    except (ValueError, TypeError):
+                        raise ValueError('submitted_at 格式错误，应为 ISO 时间')
+                entries[client_key] = (client_key, plan.score(item['answers']), submitted_at)
+                positions[client_key] = index
+            except (ValueError, TypeError) as e:
+                count_submission('invalid')
+                results[index] = {'client_key': client_key, 'status': 'error', 'msg': str(e)}
+
+        for client_key, (status, result) in save_keyed_submissions(questionnaire, plan, list(entries.values())).items():
+            if status == 'created':
+                count_submission('success', answers=len(entries[client_key][1].answers))
+            else:
+                count_submission('error' if status == 'retry' else status)
+            results[positions[client_key]] = {'client_key': client_key, 'status': status, **result}
 
-        response_data = {
+        return jsonify({
             'code': 0,
-            'msg': '提交成功',
+            'msg': '上传完成',
             'data': {
-                'submission_id': submission.id,
-                'total_score': submission.total_score,
-                'assessment_level': submission.assessment_level
+                'results': results,
+                'created': sum(1 for r in results if r['status'] == 'created'),
+                'duplicates': sum(1 for r in results if r['status'] == 'duplicate'),
+                'errors': sum(1 for r in results if r['status'] in ('error', 'retry'))
             }
-        }
-        return jsonify(response_data)
+        })
 
     except ValueError as e:
         db.session.rollback()
@@ -1228,12 +1053,43 @@ def submit_answers(access_code):
             'code': 400,
             'msg': str(e)
         }), 400
+    except NotFound:
+        return jsonify({
+            'code': 404,
+            'msg': '问卷不存在或已下架'
+        }), 404
     except Exception as e:
         db.session.rollback()
-        current_app.logger.error(f"提交答案失败: {str(e)}")
+        current_app.logger.error(f"批量上传答卷失败: {str(e)}")
         return jsonify({
             'code': 500,
-            'msg': f'提交失败: {str(e)}'
+            'msg': f'批量上传失败: {str(e)}'
+        }), 500
+
+@bp.route('/fill/submit-status/<token>', methods=['GET'])
+def get_submit_status(token):
+    """查询队列模式下提交的处理状态
+    Args:
+        token: 提交时返回的令牌
+    Returns:
+        JSON response with status (pending/processing/done/failed), submission_id when done
+    """
+    try:
+        status = get_submit_queue_status(token)
+        if status is None:
+            return jsonify({
+                'code': 404,
+                'msg': '提交记录不存在或已过期'
+            }), 404
+        return jsonify({
+            'code': 0,
+            'data': status
+        })
+    except Exception as e:
+        current_app.logger.error(f"查询提交状态失败: {str(e)}")
+        return jsonify({
+            'code': 500,
+            'msg': f'查询提交状态失败: {str(e)}'
         }), 500
 
 @bp.route('/fill/result/<int:submission_id>', methods=['GET'])
@@ -1251,171 +1107,19 @@ def get_result(submission_id):
                 'msg': '答卷ID不能为空'
             }), 400
 
-        # 获取答卷
-        submission = Submission.query.get_or_404(submission_id)
-        questionnaire = Questionnaire.query.get_or_404(submission.questionnaire_id)
-        answers = Answer.query.filter_by(submission_id=submission_id).all()
-        
-        current_app.logger.info(f"[get_result] 提交ID: {submission_id}, 分组: {submission.group_key}")
-
-        # 维度分数聚合
-        dim_scores = {}
-        question_results = []
-        for ans in answers:
-            question = Question.query.get(ans.question_id)
-            if not question:
-                continue
-            option_text = None
-            fillin_text = getattr(ans, 'text_answer', None)
-            # 多选题处理
-            if question.type == 'multiple' and ans.selected_option_ids:
-                try:
-                    s = ans.selected_option_ids
-                    if s.startswith('['):
-                        selected_ids = json.loads(s)
-                    else:
-                        selected_ids = [int(x) for x in s.replace('"', '').split(',') if x.strip()]
-                    options = Option.query.filter(Option.id.in_(selected_ids)).all()
-                    option_texts = []
-                    for opt in options:
-                        if opt.is_other and fillin_text:
-                            # 如果是"其他"选项且有填写内容，显示为"其他（填写内容）"
-                            option_texts.append(f"{opt.text}（{fillin_text}）")
-                        else:
-                            option_texts.append(opt.text)
-                    option_text = ', '.join(option_texts)
-                except Exception as e:
-                    option_text = str(ans.selected_option_ids)
-            elif ans.option_id is not None:
-                option = Option.query.get(ans.option_id)
-                option_text = option.text if option else None
-                # 单选题的"其他"处理
-                if option and option.is_other and fillin_text:
-                    option_text = f"{option_text}（{fillin_text}）"
-
-            # 组装题目结果
-            if question.type == 'address':
-                question_results.append({
-                    'id': question.id,
-                    'text': question.text,
-                    'type': question.type,
-                    'answer': ans.text_answer,
-                    'option_id': None,
-                    'option_text': None,
-                    'fillin_text': None,
-                    'value': ans.value
-                })
-                continue
-            question_results.append({
-                'id': question.id,
-                'text': question.text,
-                'type': question.type,
-                'answer': (
-                    ans.text_answer if question.type == 'text'
-                    else option_text
-                ),
-                'option_id': ans.option_id,
-                'option_text': option_text,
-                'fillin_text': fillin_text,
-                'value': ans.value
-            })
-
-        # 获取维度信息
-        dim_list = []
-        # 获取所有有答案的维度ID
-        answered_dimension_ids = set()
-        for ans in answers:
-            question = Question.query.get(ans.question_id)
-            if question and question.dimension_id:
-                answered_dimension_ids.add(question.dimension_id)
-        
-        # 只返回有答案的维度，排除"用户基本信息(不参与得分评估)"维度
-        for dim in Dimension.query.filter_by(questionnaire_id=questionnaire.id, is_deleted=False).all():
-            # 只包含有题目参与得分计算的维度，且排除基本信息维度
-            if dim.id in answered_dimension_ids and dim.name != '用户基本信息(不参与得分评估)':
-                # 获取维度得分记录
-                dim_score = DimensionScore.query.filter_by(
-                    submission_id=submission_id,
-                    dimension_id=dim.id
-                ).first()
-                
-                # 获取该维度的最大分数（从评估等级配置中查找，考虑用户分组）
-                max_score_query = AssessmentLevel.query.filter_by(
-                    dimension_id=dim.id,
-                    is_deleted=False
-                )
-                
-                # 如果用户有分组，优先查找该分组的配置
-                if submission.group_key:
-                    max_score_config = max_score_query.filter_by(
-                        group_key=submission.group_key
-                    ).order_by(AssessmentLevel.max_score.desc()).first()
-                    
-                    # 如果没有找到分组配置，查找没有分组的配置
-                    if not max_score_config:
-                        max_score_config = max_score_query.filter(
-                            AssessmentLevel.group_key.is_(None)
-                        ).order_by(AssessmentLevel.max_score.desc()).first()
-                else:
-                    # 没有分组，查找没有分组的配置
-                    max_score_config = max_score_query.filter(
-                        AssessmentLevel.group_key.is_(None)
-                    ).order_by(AssessmentLevel.max_score.desc()).first()
-                
-                dimension_max_score = max_score_config.max_score if max_score_config else 100
-                current_app.logger.info(f"[get_result] 维度 {dim.name} (ID: {dim.id}): 最大分数={dimension_max_score}, 配置来源={'分组' if max_score_config and max_score_config.group_key else '通用'}")
-                
-                dim_list.append({
-                    'dimension_id': dim.id,
-                    'dimension_name': dim.name,
-                    'score': dim_score.score if dim_score else 0,
-                    'max_score': dimension_max_score,
-                    'assessment_level': dim_score.assessment_level if dim_score else None,
-                    'assessment_opinion': dim_score.assessment_opinion if dim_score else None
-                })
-
-        # 获取总分的最大值（从评估等级配置中查找，考虑用户分组）
-        total_max_score_query = AssessmentLevel.query.filter_by(
-            questionnaire_id=questionnaire.id,
-            dimension_id=None,  # 总分配置
-            is_deleted=False
-        )
-        
-        # 如果用户有分组，优先查找该分组的配置
-        if submission.group_key:
-            total_max_score_config = total_max_score_query.filter_by(
-                group_key=submission.group_key
-            ).order_by(AssessmentLevel.max_score.desc()).first()
-            
-            # 如果没有找到分组配置，查找没有分组的配置
-            if not total_max_score_config:
-                total_max_score_config = total_max_score_query.filter(
-                    AssessmentLevel.group_key.is_(None)
-                ).order_by(AssessmentLevel.max_score.desc()).first()
+        snapshot = SubmissionResult.query.get(submission_id)
+        if snapshot is not None:
+            body = unpack_result(snapshot)
         else:
-            # 没有分组，查找没有分组的配置
-            total_max_score_config = total_max_score_query.filter(
-                AssessmentLevel.group_key.is_(None)
-            ).order_by(AssessmentLevel.max_score.desc()).first()
-        
-        total_max_score = total_max_score_config.max_score if total_max_score_config else 100
-        current_app.logger.info(f"[get_result] 总分最大值: {total_max_score}, 配置来源={'分组' if total_max_score_config and total_max_score_config.group_key else '通用'}")
-
-        response_data = {
-            'code': 0,
-            'msg': 'Success',
-            'data': {
-                'total_score': submission.total_score,
-                'total_max_score': total_max_score,
-                'dimensions': dim_list,
-                'questionnaire_title': questionnaire.title,
-                'assessment_level': submission.assessment_level,
-                'assessment_opinion': submission.assessment_opinion,
-                'questions': question_results,
-                'submitted_at': submission.submitted_at.isoformat() if submission.submitted_at else None
-            }
-        }
-        return jsonify(response_data)
+            # 历史答卷没有快照，首次查看时生成
+            submission = Submission.query.get_or_404(submission_id)
+            body = regenerate_result_snapshot(submission)
+            try:
+                db.session.commit()
+            except IntegrityError:
+                # 并发请求已写入快照
+                db.session.rollback()
+        return current_app.response_class(body, mimetype=current_app.json.mimetype)
 
     except Exception as e:
         current_app.logger.error(f"获取答卷结果失败: {str(e)}")
@@ -1426,13 +1130,33 @@ def get_result(submission_id):
 
 # ==================== 答卷列表 ====================
 
+@bp.route('/<int:qid>/submissions/<int:submission_id>/result/regenerate', methods=['POST'])
+@token_required
+def regenerate_result(qid, submission_id):
+    """重新生成答卷结果快照（重新评分或修改题目后使用）"""
+    try:
+        submission = Submission.query.filter_by(id=submission_id, questionnaire_id=qid).first()
+        if not submission:
+            return jsonify({'code': 404, 'msg': '答卷不存在'}), 404
+        regenerate_result_snapshot(submission)
+        db.session.commit()
+        return jsonify({'code': 0, 'msg': 'Success'})
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"重新生成答卷结果失败: {str(e)}")
+        return jsonify({
+            'code': 500,
+            'msg': f'重新生成答卷结果失败: {str(e)}'
+        }), 500
+
 @bp.route('/<int:qid>/submissions', methods=['GET'])
 @token_required
 def get_submissions(qid):
-    """获取问卷的答卷列表，支持按基本信息字段筛选"""
+    """获取问卷的答卷列表，支持按基本信息字段筛选，按 id 倒序游标分页（参数同统计接口）"""
     try:
         basic_question_id = request.args.get('basic_question_id')
         basic_question_value = request.args.get('basic_question_value')
+        cursor, limit, with_total = page_args()
 
         query = Submission.query.filter_by(questionnaire_id=qid)
 
@@ -1446,27 +1170,34 @@ def get_submissions(qid):
                     Answer.text_answer == basic_question_value
                 )
             else:
-                # 单选题，按 option_id 匹配（前端应传选项ID）
+                # 选择题，按选中的选项匹配（前端应传选项ID），单选与多选均适用
                 try:
                     option_id = int(basic_question_value)
                 except Exception:
                     option_id = -1  # 不会有这个id
-                query = query.join(Answer).filter(
-                    Answer.question_id == int(basic_question_id),
-                    Answer.option_id == option_id
-                )
+                query = option_filter(query, int(basic_question_id), option_id)
 
-        submissions = query.order_by(Submission.id.desc()).all()
+        submissions, next_cursor = keyset_page(query, Submission.id, cursor, limit)
+        total = query.with_entities(func.count(Submission.id)).scalar() if with_total else None
         return jsonify({
             'code': 0,
             'msg': 'Success',
-            'data': [{
-                'id': s.id,
-                'submitted_at': s.submitted_at.strftime('%Y-%m-%d %H:%M:%S') if s.submitted_at else '',
-                'total_score': s.total_score,
-                'assessment_level': s.assessment_level,
-            } for s in submissions]
+            'data': {
+                'items': [{
+                    'id': s.id,
+                    'submitted_at': s.submitted_at.strftime('%Y-%m-%d %H:%M:%S') if s.submitted_at else '',
+                    'total_score': s.total_score,
+                    'assessment_level': s.assessment_level,
+                } for s in submissions],
+                'next_cursor': next_cursor,
+                'total': total
+            }
         })
+    except ValueError as e:
+        return jsonify({
+            'code': 400,
+            'msg': str(e)
+        }), 400
     except Exception as e:
         current_app.logger.error(f"获取答卷列表失败: {str(e)}")
         return jsonify({
@@ -4,11 +4,19 @@
 @description 统计相关API
 """
 
-from flask import Blueprint, jsonify, current_app, request
-from models import db, Questionnaire, Submission, Answer, Question, AssessmentLevel, Dimension, Option, BranchRule
+from flask import Blueprint, jsonify, current_app, request, stream_with_context
+from models import db, Questionnaire, Submission, Answer, Question, AssessmentLevel, Dimension, Option, BranchRule, DimensionStat, LevelStat, GroupStat, AnswerArea, AnswerOption
 from api.auth import token_required
+from utils.stats_aggregates import ensure_questionnaire_stats, retract_submission
+from utils.answer_areas import AREA_PATH_SEPARATOR, area_prefix_filter
+from utils.answer_options import option_filter
+from utils.pagination import page_args, keyset_page
+from utils.submission_export import SubmissionExport, stream_csv
+from utils.xlsx_stream import stream_xlsx
+from utils.analytics_snapshot import write_analytics_snapshot
+from urllib.parse import quote
 from sqlalchemy import func
-import json
+from datetime import datetime, timedelta
 
 bp = Blueprint('stats', __name__, url_prefix='/api/stats')
 
@@ -27,104 +35,86 @@ def get_questionnaire_overview(qid):
         # 获取问卷
         questionnaire = Questionnaire.query.get_or_404(qid)
         
-        # 获取所有未删除的答卷
-        submissions = Submission.query.filter_by(questionnaire_id=qid, is_deleted=False).all()
-        
-        # 获取所有未删除答卷的答案
-        answers = Answer.query.join(Submission).filter(
+        # 答卷数与维度平均分读取增量维护的统计汇总
+        stat = ensure_questionnaire_stats(qid)
+        dimension_avg_scores = [{
+            'dimension_id': dim_id,
+            'dimension_name': name,
+            'avg_score': round(score_sum / count, 2) if count > 0 else 0
+        } for dim_id, name, score_sum, count in db.session.query(
+            DimensionStat.dimension_id,
+            Dimension.name,
+            DimensionStat.score_sum,
+            DimensionStat.answer_count
+        ).join(
+            Dimension, DimensionStat.dimension_id == Dimension.id
+        ).filter(
+            DimensionStat.questionnaire_id == qid,
+            DimensionStat.answer_count > 0,
+            Dimension.name != '用户基本信息(不参与得分评估)'
+        ).order_by(DimensionStat.dimension_id).all()]
+
+        # 统计 address 题型的区域分布，按提交时拆出的区域编码分组
+        area_rows = db.session.query(
+            AnswerArea.question_id,
+            AnswerArea.area_path,
+            Submission.assessment_level,
+            func.count()
+        ).join(
+            Submission, AnswerArea.submission_id == Submission.id
+        ).filter(
             Submission.questionnaire_id == qid,
             Submission.is_deleted == False
+        ).group_by(
+            AnswerArea.question_id,
+            AnswerArea.area_path,
+            Submission.assessment_level
         ).all()
-        
-        # 计算维度平均分
-        dimension_scores = {}
-        for answer in answers:
-            question = Question.query.get(answer.question_id)
-            if question and question.dimension_id and answer.value is not None:
-                # 排除"用户基本信息(不参与得分评估)"维度
-                dimension = Dimension.query.get(question.dimension_id)
-                if dimension and dimension.name != '用户基本信息(不参与得分评估)':
-                    if question.dimension_id not in dimension_scores:
-                        dimension_scores[question.dimension_id] = {'total': 0, 'count': 0}
-                    dimension_scores[question.dimension_id]['total'] += answer.value
-                    dimension_scores[question.dimension_id]['count'] += 1
-        
-        # 计算每个维度的平均分
-        dimension_avg_scores = []
-        for dim_id, scores in dimension_scores.items():
-            question = Question.query.filter_by(dimension_id=dim_id).first()
-            if question and question.dimension:
-                avg_score = scores['total'] / scores['count'] if scores['count'] > 0 else 0
-                dimension_avg_scores.append({
-                    'dimension_id': dim_id,
-                    'dimension_name': question.dimension.name,
-                    'avg_score': round(avg_score, 2)
-                })
-        # 过滤掉"用户基本信息(不参与得分评估)"维度
-        dimension_avg_scores = [d for d in dimension_avg_scores if d['dimension_name'] != '用户基本信息(不参与得分评估)']
-        
-        # 统计 address 题型的区域分布
+
         area_counter = {}
-        for answer in answers:
-            question = Question.query.get(answer.question_id)
-            if question and question.type == 'address' and answer.text_answer:
-                try:
-                    val = json.loads(answer.text_answer)
-                    area = val.get('area')
-                    if area and isinstance(area, list):
-                        area_str = '/'.join([str(x) for x in area])
-                        area_counter[area_str] = area_counter.get(area_str, 0) + 1
-                except (json.JSONDecodeError, TypeError, AttributeError) as e:
-                    current_app.logger.warning(f"解析区域数据失败: {str(e)}, answer_id: {answer.id}")
-                    continue
-        
+        area_level_stats = []
+        for question_id, area_path, level, count in area_rows:
+            area_counter[area_path] = area_counter.get(area_path, 0) + count
+            area_level_stats.append({
+                'question_id': question_id,
+                'area': area_path.split(AREA_PATH_SEPARATOR),
+                'level': level,
+                'count': count
+            })
+
         # 获取所有 address 题目
         address_questions = Question.query.filter_by(questionnaire_id=qid, type='address').all()
         address_questions_data = [
             {'id': q.id, 'text': q.text} for q in address_questions
         ]
 
-        # 收集所有 address 答案的原始区域数据
-        area_stats_raw = []
-        area_level_stats_raw = []
-        for answer in answers:
-            question = Question.query.get(answer.question_id)
-            if question and question.type == 'address' and answer.text_answer:
-                submission = Submission.query.get(answer.submission_id)
-                try:
-                    val = json.loads(answer.text_answer)
-                    area = val.get('area')
-                    if area and isinstance(area, list):
-                        area_stats_raw.append({
-                            'question_id': answer.question_id,
-                            'area': area
-                        })
-                        area_level_stats_raw.append({
-                            'question_id': answer.question_id,
-                            'area': area,
-                            'level': submission.assessment_level if submission else None
-                        })
-                except (json.JSONDecodeError, TypeError, AttributeError) as e:
-                    current_app.logger.warning(f"解析区域数据失败: {str(e)}, answer_id: {answer.id}")
-                    continue
-        
+        data = {
+            'total_submissions': stat.submission_count,
+            'dimension_scores': dimension_avg_scores,
+            'area_stats': area_counter,
+            'area_level_stats': area_level_stats,
+            'address_questions': address_questions_data
+        }
+
+        # 全部答案明细随答卷数线性增长，只在显式请求时返回；选项分布见 option-distribution 接口
+        if request.args.get('raw_answers') == '1':
+            answers = db.session.query(
+                Answer.submission_id, Answer.question_id, Answer.value, Answer.text_answer
+            ).join(Submission, Answer.submission_id == Submission.id).filter(
+                Submission.questionnaire_id == qid,
+                Submission.is_deleted == False
+            ).all()
+            data['raw_answers'] = [{
+                'submission_id': a.submission_id,
+                'question_id': a.question_id,
+                'value': a.value,
+                'text_answer': a.text_answer
+            } for a in answers]
+
         return jsonify({
             'code': 0,
             'msg': 'Success',
-            'data': {
-                'total_submissions': len(submissions),
-                'dimension_scores': dimension_avg_scores,
-                'area_stats': area_counter,
-                'area_stats_raw': area_stats_raw,
-                'area_level_stats_raw': area_level_stats_raw,
-                'address_questions': address_questions_data,
-                'raw_answers': [{
-                    'submission_id': a.submission_id,
-                    'question_id': a.question_id,
-                    'value': a.value,
-                    'text_answer': a.text_answer
-                } for a in answers]
-            }
+            'data': data
         })
     except Exception as e:
         current_app.logger.error(f"获取问卷统计概览失败: {str(e)}")
@@ -133,6 +123,158 @@ def get_questionnaire_overview(qid):
             'msg': f'获取问卷统计概览失败: {str(e)}'
         }), 500
 
+def submission_filters(qid):
+    """从查询参数解析答卷筛选条件：group_key、level、start_date / end_date（YYYY-MM-DD，含两端）
+
+    Raises:
+        ValueError: 日期格式不正确
+    """
+    conditions = [Submission.questionnaire_id == qid, Submission.is_deleted == False]
+    group_key = request.args.get('group_key')
+    level = request.args.get('level')
+    if group_key:
+        conditions.append(Submission.group_key == group_key)
+    if level:
+        conditions.append(Submission.assessment_level == level)
+    try:
+        start_date = request.args.get('start_date')
+        end_date = request.args.get('end_date')
+        if start_date:
+            conditions.append(Submission.submitted_at >= datetime.strptime(start_date, '%Y-%m-%d'))
+        if end_date:
+            conditions.append(Submission.submitted_at < datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1))
+    except ValueError:
+        raise ValueError('日期格式应为 YYYY-MM-DD')
+    return conditions
+
+def score_histogram(score_counts, buckets):
+    """把 (总分, 人数) 分组结果按等宽区间合并"""
+    if not score_counts:
+        return []
+    low = min(score for score, _ in score_counts)
+    high = max(score for score, _ in score_counts)
+    width = (high - low) / buckets or 1
+    counts = [0] * buckets
+    for score, count in score_counts:
+        counts[min(int((score - low) / width), buckets - 1)] += count
+    return [{
+        'min': round(low + width * i, 2),
+        'max': round(low + width * (i + 1), 2),
+        'count': count
+    } for i, count in enumerate(counts)]
+
+@bp.route('/questionnaire/<int:qid>/option-distribution', methods=['GET'])
+@token_required
+def get_option_distribution(qid):
+    """各选择题的选项人数与占比、"其他"填写数和总分分布，全部由分组聚合查询得到
+
+    Query Args:
+        group_key / level / start_date / end_date: 答卷筛选条件，见 submission_filters
+        buckets: 总分分布的区间数，默认 10
+    """
+    try:
+        Questionnaire.query.get_or_404(qid)
+        conditions = submission_filters(qid)
+        buckets = min(max(request.args.get('buckets', 10, type=int), 1), 100)
+
+        total, avg_score = db.session.query(
+            func.count(Submission.id), func.avg(Submission.total_score)
+        ).filter(*conditions).one()
+
+        questions = Question.query.filter(
+            Question.questionnaire_id == qid,
+            Question.is_deleted == False,
+            Question.type.in_(('single', 'multiple'))
+        ).order_by(Question.order).all()
+        question_ids = [q.id for q in questions]
+        options = Option.query.filter(
+            Option.question_id.in_(question_ids), Option.is_deleted == False
+        ).order_by(Option.id).all() if question_ids else []
+
+        # 选项人数：多选题每个选中的选项各计一次
+        option_counts = dict(((question_id, option_id), count) for question_id, option_id, count in db.session.query(
+            AnswerOption.question_id, AnswerOption.option_id, func.count()
+        ).join(
+            Submission, AnswerOption.submission_id == Submission.id
+        ).filter(
+            *conditions, AnswerOption.question_id.in_(question_ids)
+        ).group_by(AnswerOption.question_id, AnswerOption.option_id).all()) if question_ids else {}
+
+        # 作答人数作为占比的分母
+        answered = dict(db.session.query(
+            AnswerOption.question_id, func.count(func.distinct(AnswerOption.submission_id))
+        ).join(
+            Submission, AnswerOption.submission_id == Submission.id
+        ).filter(
+            *conditions, AnswerOption.question_id.in_(question_ids)
+        ).group_by(AnswerOption.question_id).all()) if question_ids else {}
+
+        # 选择题只在选中"其他"时保存填写内容
+        other_counts = dict(db.session.query(
+            Answer.question_id, func.count()
+        ).join(
+            Submission, Answer.submission_id == Submission.id
+        ).filter(
+            *conditions,
+            Answer.question_id.in_(question_ids),
+            Answer.text_answer.isnot(None),
+            Answer.text_answer != ''
+        ).group_by(Answer.question_id).all()) if question_ids else {}
+
+        score_counts = db.session.query(
+            Submission.total_score, func.count()
+        ).filter(
+            *conditions, Submission.total_score.isnot(None)
+        ).group_by(Submission.total_score).all()
+
+        options_by_question = {}
+        for option in options:
+            options_by_question.setdefault(option.question_id, []).append(option)
+
+        question_stats = []
+        for q in questions:
+            respondents = answered.get(q.id, 0)
+            question_stats.append({
+                'question_id': q.id,
+                'text': q.text,
+                'type': q.type,
+                'answered': respondents,
+                'other_text_count': other_counts.get(q.id, 0),
+                'options': [{
+                    'option_id': o.id,
+                    'text': o.text,
+                    'is_other': o.is_other,
+                    'count': option_counts.get((q.id, o.id), 0),
+                    'percent': round(option_counts.get((q.id, o.id), 0) * 100 / respondents, 2) if respondents else 0
+                } for o in options_by_question.get(q.id, [])]
+            })
+
+        return jsonify({
+            'code': 0,
+            'msg': 'Success',
+            'data': {
+                'total_submissions': total,
+                'questions': question_stats,
+                'score_distribution': {
+                    'avg': round(avg_score, 2) if avg_score is not None else None,
+                    'min': min((score for score, _ in score_counts), default=None),
+                    'max': max((score for score, _ in score_counts), default=None),
+                    'buckets': score_histogram(score_counts, buckets)
+                }
+            }
+        })
+    except ValueError as e:
+        return jsonify({
+            'code': 400,
+            'msg': str(e)
+        }), 400
+    except Exception as e:
+        current_app.logger.error(f"获取选项分布统计失败: {str(e)}")
+        return jsonify({
+            'code': 500,
+            'msg': f'获取选项分布统计失败: {str(e)}'
+        }), 500
+
 @bp.route('/questionnaire/<int:qid>/level-stats', methods=['GET'])
 @token_required
 def get_level_stats(qid):
@@ -145,16 +287,16 @@ def get_level_stats(qid):
         JSON response with level distribution statistics
     """
     try:
-        # 获取所有未删除答卷的评估等级分布
+        # 评估等级分布读取增量维护的统计汇总
+        ensure_questionnaire_stats(qid)
         level_stats = db.session.query(
-            Submission.assessment_level,
-            func.count(Submission.id).label('count')
+            LevelStat.assessment_level,
+            LevelStat.submission_count
         ).filter(
-            Submission.questionnaire_id == qid,
-            Submission.assessment_level.isnot(None),
-            Submission.is_deleted == False
-        ).group_by(
-            Submission.assessment_level
+            LevelStat.questionnaire_id == qid,
+            LevelStat.submission_count > 0
+        ).order_by(
+            LevelStat.assessment_level
         ).all()
         
         return jsonify({
@@ -172,6 +314,45 @@ def get_level_stats(qid):
             'msg': f'获取评估等级分布统计失败: {str(e)}'
         }), 500
 
+@bp.route('/questionnaire/<int:qid>/group-stats', methods=['GET'])
+@token_required
+def get_group_stats(qid):
+    """获取各分组（分组题所选选项）的答卷数
+
+    Args:
+        qid: 问卷ID
+
+    Returns:
+        JSON response with submission counts per group_key
+    """
+    try:
+        # 分组答卷数读取增量维护的统计汇总
+        ensure_questionnaire_stats(qid)
+        group_stats = db.session.query(
+            GroupStat.group_key,
+            GroupStat.submission_count
+        ).filter(
+            GroupStat.questionnaire_id == qid,
+            GroupStat.submission_count > 0
+        ).order_by(
+            GroupStat.group_key
+        ).all()
+
+        return jsonify({
+            'code': 0,
+            'msg': 'Success',
+            'data': [{
+                'group_key': group_key,
+                'count': count
+            } for group_key, count in group_stats]
+        })
+    except Exception as e:
+        current_app.logger.error(f"获取分组答卷数统计失败: {str(e)}")
+        return jsonify({
+            'code': 500,
+            'msg': f'获取分组答卷数统计失败: {str(e)}'
+        }), 500
+
 @bp.route('/questionnaire/<int:qid>/basic-questions', methods=['GET'])
 @token_required
 def get_basic_questions(qid):
@@ -274,41 +455,55 @@ def get_level_by_basic(qid, question_id):
         # 获取题目
         question = Question.query.get_or_404(question_id)
         
-        # 获取所有相关未删除答卷的答案
-        answers = db.session.query(
-            Answer,
-            Submission.assessment_level
-        ).join(
-            Submission
-        ).filter(
+        live = db.and_(
             Submission.questionnaire_id == qid,
-            Answer.question_id == question_id,
             Submission.assessment_level.isnot(None),
             Submission.is_deleted == False
-        ).all()
-        
+        )
+
         # 统计每个选项在每个评估等级下的数量
+        if question.type == 'address':
+            # 地址题按完整区域分组
+            grouped = [db.session.query(
+                Submission.assessment_level, AnswerArea.area_path, func.count()
+            ).join(
+                Submission, AnswerArea.submission_id == Submission.id
+            ).filter(
+                live, AnswerArea.question_id == question_id
+            ).group_by(Submission.assessment_level, AnswerArea.area_path)]
+        elif question.type in ('single', 'multiple'):
+            # 选择题按选中选项的文本分组，多选题每个选项各计一次；"其他"的填写内容只是选项的补充说明，不另计
+            grouped = [db.session.query(
+                Submission.assessment_level, Option.text, func.count()
+            ).select_from(AnswerOption).join(
+                Submission, AnswerOption.submission_id == Submission.id
+            ).join(
+                Option, AnswerOption.option_id == Option.id
+            ).filter(
+                live, AnswerOption.question_id == question_id
+            ).group_by(Submission.assessment_level, Option.text)]
+        else:
+            # 填空题按填写内容分组
+            grouped = [
+                db.session.query(
+                    Submission.assessment_level, Answer.text_answer, func.count()
+                ).join(
+                    Submission, Answer.submission_id == Submission.id
+                ).filter(
+                    live,
+                    Answer.question_id == question_id,
+                    Answer.option_id.is_(None),
+                    Answer.text_answer.isnot(None),
+                    Answer.text_answer != ''
+                ).group_by(Submission.assessment_level, Answer.text_answer)
+            ]
+
         stats = {}
-        for answer, level in answers:
-            option_text = None
-            question = Question.query.get(answer.question_id)
-            if question and question.type == 'address' and answer.text_answer:
-                try:
-                    val = json.loads(answer.text_answer)
-                    area = val.get('area')
-                    if area and isinstance(area, list):
-                        area_str = '/'.join([str(x) for x in area])
-                        option_text = area_str
-                except Exception:
-                    continue
-            elif answer.option_id:
-                option = Option.query.get(answer.option_id)
-                option_text = option.text if option else None
-            elif answer.text_answer and not option_text:
-                option_text = answer.text_answer
-            if option_text:
-                key = (level, option_text)
-                stats[key] = stats.get(key, 0) + 1
+        for query in grouped:
+            for level, option_text, count in query.all():
+                if option_text:
+                    key = (level, option_text)
+                    stats[key] = stats.get(key, 0) + count
         
         return jsonify({
             'code': 0,
@@ -329,10 +524,15 @@ def get_level_by_basic(qid, question_id):
 @bp.route('/questionnaire/<int:qid>/submissions', methods=['GET'])
 @token_required
 def get_submissions(qid):
-    """获取问卷的答卷列表，支持按基本信息字段筛选"""
+    """获取问卷的答卷列表，支持按基本信息字段筛选，按 id 倒序游标分页
+
+    Query Args:
+        cursor: 上一页返回的 next_cursor，不传取第一页
+        limit: 每页条数，默认 20
+        with_total: 为 1 时返回总数
+    """
     try:
-        print('==== get_submissions called ====')
-        print('request.args:', request.args)
+        current_app.logger.debug('get_submissions args: %s', request.args)
         basic_question_id = request.args.get('basic_question_id')
         basic_question_value = request.args.get('basic_question_value')
         area_code_arr = request.args.getlist('area_code_arr')
@@ -343,39 +543,23 @@ def get_submissions(qid):
             if area_code_str:
                 area_code_arr = area_code_str.split(',')
 
-        print(f"area_code_arr: {area_code_arr} type: {type(area_code_arr)}")
+        current_app.logger.debug('area_code_arr: %s', area_code_arr)
+
+        cursor, limit, with_total = page_args()
 
         query = Submission.query.filter_by(questionnaire_id=qid, is_deleted=False)
 
-        if basic_question_id and (basic_question_value or area_code_arr):
+        filtered = bool(basic_question_id and (basic_question_value or area_code_arr))
+        if filtered:
             question = Question.query.get(int(basic_question_id))
             if question and question.type == 'address' and area_code_arr:
                 # address题型，按区域前缀匹配（支持省、省市、省市区的部分匹配）
-                submission_ids = set()
-                answers = Answer.query.filter_by(question_id=int(basic_question_id)).all()
-                for ans in answers:
-                    if ans.text_answer:
-                        try:
-                            val = json.loads(ans.text_answer)
-                            area = val.get('area')
-                            print(f"submission_id={ans.submission_id}, area={area}")
-                            if area and isinstance(area, list):
-                                area_str_list = [str(x) for x in area]
-                                area_code_arr_str = [str(x) for x in area_code_arr]
-                                print(f"Compare: {area_str_list[:len(area_code_arr_str)]} == {area_code_arr_str}")
-                                # 支持部分匹配：只要前缀匹配就算匹配
-                                if len(area_str_list) >= len(area_code_arr_str) and area_str_list[:len(area_code_arr_str)] == area_code_arr_str:
-                                    print(f"Matched submission_id={ans.submission_id}")
-                                    submission_ids.add(ans.submission_id)
-                        except Exception as e:
-                            print(f"Error parsing area for submission_id={ans.submission_id}: {e}")
-                            continue
-                print('submission_ids:', submission_ids)
-                if submission_ids:
-                    query = query.filter(Submission.id.in_(submission_ids))
-                else:
-                    # 没有匹配，直接返回空
-                    return jsonify({'code': 0, 'msg': 'Success', 'data': []})
+                query = query.join(
+                    AnswerArea, AnswerArea.submission_id == Submission.id
+                ).filter(
+                    AnswerArea.question_id == int(basic_question_id),
+                    *area_prefix_filter(area_code_arr)
+                )
             elif question and question.type == 'text':
                 # 填空题，支持模糊查询（LIKE匹配）
                 query = query.join(Answer).filter(
@@ -383,27 +567,40 @@ def get_submissions(qid):
                     Answer.text_answer.like(f'%{basic_question_value}%')
                 )
             else:
-                # 单选题，按 option_id 匹配（前端应传选项ID）
+                # 选择题，按选中的选项匹配（前端应传选项ID），单选与多选均适用
                 try:
                     option_id = int(basic_question_value)
                 except Exception:
                     option_id = -1  # 不会有这个id
-                query = query.join(Answer).filter(
-                    Answer.question_id == int(basic_question_id),
-                    Answer.option_id == option_id
-                )
+                query = option_filter(query, int(basic_question_id), option_id)
 
-        submissions = query.order_by(Submission.id.desc()).all()
+        submissions, next_cursor = keyset_page(query, Submission.id, cursor, limit)
+        total = None
+        if with_total:
+            if filtered:
+                total = query.with_entities(func.count(Submission.id)).scalar()
+            else:
+                # 未筛选时直接读取统计汇总中的答卷数
+                total = ensure_questionnaire_stats(qid).submission_count
         return jsonify({
             'code': 0,
             'msg': 'Success',
-            'data': [{
-                'id': s.id,
-                'submitted_at': s.submitted_at.strftime('%Y-%m-%d %H:%M:%S') if s.submitted_at else '',
-                'total_score': s.total_score,
-                'assessment_level': s.assessment_level,
-            } for s in submissions]
+            'data': {
+                'items': [{
+                    'id': s.id,
+                    'submitted_at': s.submitted_at.strftime('%Y-%m-%d %H:%M:%S') if s.submitted_at else '',
+                    'total_score': s.total_score,
+                    'assessment_level': s.assessment_level,
+                } for s in submissions],
+                'next_cursor': next_cursor,
+                'total': total
+            }
         })
+    except ValueError as e:
+        return jsonify({
+            'code': 400,
+            'msg': str(e)
+        }), 400
     except Exception as e:
         current_app.logger.error(f"获取答卷列表失败: {str(e)}")
         return jsonify({
@@ -411,6 +608,87 @@ def get_submissions(qid):
             'msg': f'获取答卷列表失败: {str(e)}'
         }), 500
 
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+}
+
+
+@bp.route('/questionnaire/<int:qid>/export', methods=['GET'])
+@token_required
+def export_submissions(qid):
+    """流式导出答卷明细，每份答卷一行，包含各题答案、维度得分、评估等级和分组
+
+    Query Args:
+        format: csv（默认）或 xlsx
+        start_id / end_id: 只导出该 id 区间（含两端）的答卷，导出中断后以最后一行的答卷ID+1 作为 start_id 续传
+    """
+    try:
+        questionnaire = Questionnaire.query.get_or_404(qid)
+        export_format = request.args.get('format', 'csv').lower()
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({
+                'code': 400,
+                'msg': '不支持的导出格式'
+            }), 400
+        start_id = request.args.get('start_id', type=int)
+        end_id = request.args.get('end_id', type=int)
+
+        export = SubmissionExport(questionnaire, start_id=start_id, end_id=end_id)
+        title = questionnaire.title
+        filename = f"{title}_答卷.{export_format}"
+
+        def generate():
+            try:
+                if export_format == 'xlsx':
+                    yield from stream_xlsx(export.rows(), sheet_name=title)
+                else:
+                    yield from stream_csv(export.rows())
+            except Exception as e:
+                # 响应头已发出，只能记录日志并中断输出
+                current_app.logger.error(f"导出答卷失败: {str(e)}")
+                raise
+
+        response = current_app.response_class(
+            stream_with_context(generate()),
+            mimetype=EXPORT_FORMATS[export_format]
+        )
+        response.headers['Content-Disposition'] = f"attachment; filename*=UTF-8''{quote(filename)}"
+        # 关闭反向代理缓冲，数据边生成边发送
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
+    except Exception as e:
+        current_app.logger.error(f"导出答卷失败: {str(e)}")
+        return jsonify({
+            'code': 500,
+            'msg': f'导出答卷失败: {str(e)}'
+        }), 500
+
+@bp.route('/questionnaire/<int:qid>/analytics-snapshot', methods=['POST'])
+@token_required
+def create_analytics_snapshot(qid):
+    """生成问卷的 Parquet 分析快照，默认只追加上次之后的新答卷，请求体 {"full": true} 时全量重建"""
+    try:
+        Questionnaire.query.get_or_404(qid)
+        data = request.get_json(silent=True) or {}
+        manifest = write_analytics_snapshot(qid, full=bool(data.get('full')))
+        return jsonify({
+            'code': 0,
+            'msg': 'Success',
+            'data': manifest
+        })
+    except RuntimeError as e:
+        return jsonify({
+            'code': 409,
+            'msg': str(e)
+        }), 409
+    except Exception as e:
+        current_app.logger.error(f"生成分析快照失败: {str(e)}")
+        return jsonify({
+            'code': 500,
+            'msg': f'生成分析快照失败: {str(e)}'
+        }), 500
+
 @bp.route('/questionnaire/<int:qid>/submissions/<int:submission_id>', methods=['DELETE'])
 @token_required
 def delete_submission(qid, submission_id):
@@ -423,14 +701,22 @@ def delete_submission(qid, submission_id):
                 'msg': '答卷不存在'
             }), 404
         
-        submission.is_deleted = True
+        # 条件更新只有一个请求能把 is_deleted 从 0 改为 1，并发删除同一答卷时统计只扣除一次
+        deleted = Submission.query.filter_by(
+            id=submission_id,
+            is_deleted=False
+        ).update({Submission.is_deleted: True}, synchronize_session=False)
+        if deleted == 1:
+            # 同一事务内扣除统计汇总
+            retract_submission(submission)
         db.session.commit()
-        
+
         return jsonify({
             'code': 0,
             'msg': 'Success'
         })
     except Exception as e:
+        db.session.rollback()
         current_app.logger.error(f"删除答卷失败: {str(e)}")
         return jsonify({
             'code': 500,
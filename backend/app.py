@@ -3,7 +3,7 @@
 @github https://github.com/halouxiaoyu
 """
 
-from flask import Flask, session, request
+from flask import Flask, session
 from flask_cors import CORS, cross_origin
 from flask_migrate import Migrate
 from flask_session import Session
@@ -12,22 +12,27 @@ from api import auth_bp
 from api.questionnaire import bp as questionnaire_bp
 from api.admin import bp as admin_bp
 from api.stats import bp as stats_bp
+from commands import register_commands
+from utils.request_logging import init_request_logging, parse_sample_rates
+from utils.metrics import init_metrics, TimedQueuePool
+from utils.sql_profiler import init_sql_profiler
 from datetime import timedelta
 import os
 from dotenv import load_dotenv
-import logging
 load_dotenv()
 
 def create_app():
     app = Flask(__name__)
-    app.logger.setLevel(logging.INFO)
+    # 日志级别，设为 DEBUG 时输出鉴权等调试信息
+    app.logger.setLevel(os.getenv('LOG_LEVEL', 'INFO').upper())
     user = os.getenv('DB_USER')
     password = os.getenv('DB_PASSWORD')
     host = os.getenv('DB_HOST')
     port = os.getenv('DB_PORT') or '3306'
     db_name = os.getenv('DB_NAME')
 
-    app.config['SQLALCHEMY_DATABASE_URI'] = f"mysql+pymysql://{user}:{password}@{host}:{port}/{db_name}"
+    # DATABASE_URL 用于压测或本地调试（如 sqlite:////tmp/bench.db），未设置时连接 MySQL
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL') or f"mysql+pymysql://{user}:{password}@{host}:{port}/{db_name}"
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'your_secret_key')
     
@@ -37,7 +42,8 @@ def create_app():
         'max_overflow': 10,  # 允许的最大溢出连接数
         'pool_timeout': 30,  # 连接池获取连接的超时时间（秒）
         'pool_recycle': 3600,  # 连接回收时间（1小时）
-        'pool_pre_ping': True  # 自动检测断开的连接
+        'pool_pre_ping': True,  # 自动检测断开的连接
+        'poolclass': TimedQueuePool  # 记录取连接的等待时间，见 /metrics
     }
     
     # Session configuration
@@ -46,6 +52,28 @@ def create_app():
     app.config['SESSION_PERMANENT'] = True
     app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(days=1)
     
+    # 分析快照目录
+    app.config['ANALYTICS_SNAPSHOT_DIR'] = os.getenv(
+        'ANALYTICS_SNAPSHOT_DIR',
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), 'snapshots')
+    )
+
+    # 批量任务检查点目录，见 flask run-job
+    app.config['JOB_CHECKPOINT_DIR'] = os.getenv(
+        'JOB_CHECKPOINT_DIR',
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), 'checkpoints')
+    )
+
+    # 答卷异步写入队列：开启后提交接口只校验入队，需另行运行 flask drain-submissions
+    app.config['SUBMIT_QUEUE_ENABLED'] = os.getenv('SUBMIT_QUEUE_ENABLED', 'False').lower() == 'true'
+    app.config['SUBMIT_QUEUE_PATH'] = os.getenv(
+        'SUBMIT_QUEUE_PATH',
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), 'queue', 'submissions.db')
+    )
+
+    # 离线批量上传单次最多答卷数
+    app.config['SUBMIT_BATCH_MAX_ITEMS'] = int(os.getenv('SUBMIT_BATCH_MAX_ITEMS', 500))
+
     # CORS 配置
     allowed_origins = os.getenv('ALLOWED_ORIGINS', 'http://localhost:3000').split(',')
     CORS(app, resources={r"/api/*": {"origins": allowed_origins}}, supports_credentials=True, methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"])
@@ -77,21 +105,31 @@ def create_app():
             return '', 404
         return '', 200
 
-    # 添加请求日志
-    @app.before_request
-    def log_request_info():
-        app.logger.info('\n=== Request Info ===')
-        app.logger.info('Method: %s', request.method)
-        app.logger.info('Path: %s', request.path)
-        app.logger.info('Headers: %s', dict(request.headers))
-        if request.is_json:
-            app.logger.info('JSON Data: %s', request.get_json())
-        app.logger.info('=== End Request Info ===\n')
+    # 请求日志：按路由采样，经队列异步写出
+    app.config['REQUEST_LOG_ENABLED'] = os.getenv('REQUEST_LOG_ENABLED', 'True').lower() == 'true'
+    app.config['REQUEST_LOG_SAMPLE_RATE'] = float(os.getenv('REQUEST_LOG_SAMPLE_RATE', 1.0))
+    app.config['REQUEST_LOG_SAMPLE_RATES'] = parse_sample_rates(os.getenv('REQUEST_LOG_SAMPLE_RATES'))
+    app.config['REQUEST_LOG_BODY_LIMIT'] = int(os.getenv('REQUEST_LOG_BODY_LIMIT', 2048))
+    app.config['REQUEST_LOG_HEADERS'] = os.getenv('REQUEST_LOG_HEADERS', 'False').lower() == 'true'
+    init_request_logging(app)
+
+    # 运行指标，/metrics 输出 Prometheus 文本格式
+    app.config['METRICS_ENABLED'] = os.getenv('METRICS_ENABLED', 'True').lower() == 'true'
+    app.config['METRICS_TOKEN'] = os.getenv('METRICS_TOKEN')
+
+    # 按请求统计 SQL 语句数，慢请求和疑似 N+1 记录日志；响应头会暴露查询规模，默认不输出
+    app.config['SQL_PROFILE_ENABLED'] = os.getenv('SQL_PROFILE_ENABLED', 'True').lower() == 'true'
+    app.config['SQL_PROFILE_HEADERS'] = os.getenv('SQL_PROFILE_HEADERS', 'False').lower() == 'true'
+    app.config['SLOW_REQUEST_MS'] = float(os.getenv('SLOW_REQUEST_MS', 500))
+    app.config['N_PLUS_ONE_THRESHOLD'] = int(os.getenv('N_PLUS_ONE_THRESHOLD', 10))
 
     # 初始化扩展
     Session(app)
     db.init_app(app)
     migrate = Migrate(app, db)
+    with app.app_context():
+        init_metrics(app, db.engine)
+        init_sql_profiler(app, db.engine)
 
     # 注册蓝图
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
@@ -99,6 +137,9 @@ def create_app():
     app.register_blueprint(admin_bp)
     app.register_blueprint(stats_bp)
 
+    # 注册命令行
+    register_commands(app)
+
     # 确保 session 目录存在
     os.makedirs(app.config['SESSION_FILE_DIR'], exist_ok=True)
 
@@ -0,0 +1,402 @@
+"""
+@description 核心接口压测：用 create_app() 连接本地 SQLite，按参数生成问卷和答卷，
+测量各接口的吞吐量与 p50/p99 延迟，结果写成 JSON 便于不同提交之间对比
+
+用法：
+    python benchmark.py --submissions 2000 --output bench.json
+    python benchmark.py --output new.json --compare bench.json
+
+请求在进程内经 Flask test client 顺序发出，不经过网络，结果反映应用与数据库本身的耗时。
+各接口每请求的 SQL 语句数超出 STATEMENT_BUDGETS 时以非零状态退出，可作为回归检查。
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+ADMIN_USERNAME = 'bench_admin'
+ADMIN_PASSWORD = 'bench_password'
+
+# 各接口每个请求允许执行的 SQL 语句数上限，超出时以非零状态退出。
+# 提交答卷：查问卷、插入答卷、4 条统计汇总、5 张子表各一条多行插入，与题目数和维度数无关
+STATEMENT_BUDGETS = {
+    'submit_answers': 11,
+    'fill_by_access_code': 1,
+    'get_result': 1,
+}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='核心接口压测')
+    parser.add_argument('--database-url', help='数据库地址，默认在临时目录新建 SQLite 文件')
+    parser.add_argument('--questions', type=int, default=20, help='计分题数量')
+    parser.add_argument('--options', type=int, default=5, help='每题选项数')
+    parser.add_argument('--dimensions', type=int, default=4, help='计分维度数')
+    parser.add_argument('--levels', type=int, default=5, help='总分评估等级数（每个维度另设同样数量）')
+    parser.add_argument('--branch-rules', type=int, default=2, help='基本信息题中配置分支规则的选项数')
+    parser.add_argument('--submissions', type=int, default=500, help='测量前预先提交的答卷数')
+    parser.add_argument('--iterations', type=int, default=200, help='每个接口测量的请求数')
+    parser.add_argument('--warmup', type=int, default=10, help='每个接口测量前的预热请求数')
+    parser.add_argument('--seed', type=int, default=1, help='随机种子')
+    parser.add_argument('--output', help='结果 JSON 文件，默认输出到标准输出')
+    parser.add_argument('--compare', help='与之前的结果 JSON 对比并打印差异')
+    return parser.parse_args(argv)
+
+
+def create_bench_app(database_url):
+    """以压测配置创建应用：关闭请求日志，只输出告警以上的日志"""
+    os.environ['DATABASE_URL'] = database_url
+    os.environ.setdefault('REQUEST_LOG_ENABLED', 'False')
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    # 每请求语句数从响应头读取
+    os.environ['SQL_PROFILE_HEADERS'] = 'True'
+    from app import create_app
+    return create_app()
+
+
+class Seeder:
+    """通过管理接口建问卷、通过填写接口交答卷，派生表（统计汇总、结果快照等）与线上写入路径一致"""
+
+    def __init__(self, client, args):
+        self.client = client
+        self.args = args
+        self.rnd = random.Random(args.seed)
+        self.headers = None
+        self.qid = None
+        self.access_code = None
+        self.basic_question_id = None
+        self.basic_options = []
+        self.address_question_id = None
+        self.questions = []  # [(question_id, type, [option_id])]
+        self.text_question_id = None
+
+    def _call(self, method, url, **kwargs):
+        response = getattr(self.client, method)(url, headers=self.headers, **kwargs)
+        body = response.get_json()
+        if response.status_code != 200 or body.get('code') != 0:
+            raise RuntimeError(f'{method.upper()} {url} 失败: {response.status_code} {body}')
+        return body.get('data')
+
+    def login(self):
+        from models import db, Admin
+        from werkzeug.security import generate_password_hash
+        if not Admin.query.filter_by(username=ADMIN_USERNAME).first():
+            db.session.add(Admin(
+                username=ADMIN_USERNAME,
+                password_hash=generate_password_hash(ADMIN_PASSWORD, method='pbkdf2:sha256')
+            ))
+            db.session.commit()
+        db.session.remove()
+        token = self.client.post('/api/auth/login', json={
+            'username': ADMIN_USERNAME, 'password': ADMIN_PASSWORD
+        }).get_json()['token']
+        self.headers = {'Authorization': f'Bearer {token}'}
+
+    def build_questionnaire(self):
+        args = self.args
+        parent = self._call('post', '/api/questionnaire/', json={'title': '压测问卷', 'description': 'benchmark'})
+        child = self._call('post', '/api/questionnaire/', json={
+            'title': '压测子问卷', 'description': 'benchmark', 'parent_id': parent['id']
+        })
+        self.qid = parent['id']
+        self._call('post', f'/api/questionnaire/{self.qid}/toggle-publish')
+
+        dimension_ids = [
+            self._call('post', f'/api/questionnaire/{self.qid}/add-dimension', json={
+                'name': f'维度{i + 1}', 'weight': 1
+            })['dimension_id']
+            for i in range(args.dimensions)
+        ]
+        detail = self._call('get', f'/api/questionnaire/{self.qid}')
+        basic_dimension_id = next(d['id'] for d in detail['dimensions'] if d['weight'] == 0)
+
+        # 基本信息：分组题（带分支规则）和地址题
+        departments = ['内科', '外科', '儿科', '妇产科', '急诊科', '眼科']
+        self.basic_question_id = self._call('post', f'/api/questionnaire/{self.qid}/add-question', json={
+            'text': '所在科室',
+            'type': 'single',
+            'dimension_id': basic_dimension_id,
+            'options': [{'text': name, 'value': 0} for name in departments],
+            'branch_rules': [
+                {'option_id': i, 'next_questionnaire_id': child['id']}
+                for i in range(min(args.branch_rules, len(departments)))
+            ]
+        })['question_id']
+        self.address_question_id = self._call('post', f'/api/questionnaire/{self.qid}/add-question', json={
+            'text': '所在地区', 'type': 'address', 'dimension_id': basic_dimension_id
+        })['question_id']
+
+        # 计分题：单选与多选交替，最后一个选项为"其他"
+        for i in range(args.questions):
+            qtype = 'multiple' if i % 3 == 2 else 'single'
+            options = [{'text': f'选项{j + 1}', 'value': j + 1} for j in range(args.options - 1)]
+            options.append({'text': '其他', 'value': args.options, 'is_other': True})
+            self._call('post', f'/api/questionnaire/{self.qid}/add-question', json={
+                'text': f'题目{i + 1}',
+                'type': qtype,
+                'dimension_id': dimension_ids[i % len(dimension_ids)],
+                'options': options
+            })
+        self.text_question_id = self._call('post', f'/api/questionnaire/{self.qid}/add-question', json={
+            'text': '意见建议', 'type': 'text', 'dimension_id': dimension_ids[0]
+        })['question_id']
+
+        detail = self._call('get', f'/api/questionnaire/{self.qid}')
+        self.access_code = detail['access_code']
+        self.questions = [
+            (q['id'], q['type'], [o['id'] for o in q['options']])
+            for q in detail['questions'] if q['type'] in ('single', 'multiple') and q['id'] != self.basic_question_id
+        ]
+        self._build_levels(dimension_ids)
+
+    def _build_levels(self, dimension_ids):
+        args = self.args
+        # 单选最高 options 分，多选全选为 1..options 之和
+        per_question = (args.options + (args.options * (args.options + 1) // 2)) / 2
+        total_max = args.questions * per_question
+        groups = [None] + [g['group_key'] for g in self._call('get', f'/api/questionnaire/{self.qid}/basic-groups')]
+        owners = [(None, total_max)] + [(d, total_max / len(dimension_ids)) for d in dimension_ids]
+        for group_key in groups:
+            for dimension_id, upper in owners:
+                step = upper / args.levels
+                for i in range(args.levels):
+                    self._call('post', f'/api/questionnaire/{self.qid}/assessment-levels', json={
+                        'name': f'等级{i + 1}',
+                        'min_score': round(step * i, 2),
+                        'max_score': round(step * (i + 1), 2) if i < args.levels - 1 else upper * 10,
+                        'opinion': f'评估意见{i + 1}',
+                        'group_key': group_key,
+                        'dimension_id': dimension_id
+                    })
+
+    def random_answers(self):
+        rnd = self.rnd
+        basic_options = self.basic_options
+        province = rnd.choice(['11', '31', '44', '51'])
+        city = province + rnd.choice(['01', '02'])
+        answers = [
+            {'question_id': self.basic_question_id, 'answer': rnd.choice(basic_options)},
+            {'question_id': self.address_question_id, 'text': json.dumps({
+                'area': [province, city, city + rnd.choice(['01', '02', '03'])], 'detail': '某街道'
+            })}
+        ]
+        for question_id, qtype, option_ids in self.questions:
+            if qtype == 'multiple':
+                chosen = rnd.sample(option_ids, rnd.randint(1, len(option_ids)))
+                text = '其他说明' if option_ids[-1] in chosen else None
+                answers.append({'question_id': question_id, 'answer': chosen, 'text': text})
+            else:
+                chosen = rnd.choice(option_ids)
+                text = '其他说明' if chosen == option_ids[-1] else None
+                answers.append({'question_id': question_id, 'answer': chosen, 'text': text})
+        answers.append({'question_id': self.text_question_id, 'text': f'建议{rnd.randint(1, 1000)}'})
+        return answers
+
+    def seed_submissions(self, count):
+        detail = self._call('get', f'/api/questionnaire/{self.qid}')
+        self.basic_options = next(
+            [o['id'] for o in q['options']] for q in detail['questions'] if q['id'] == self.basic_question_id
+        )
+        submission_ids = []
+        for _ in range(count):
+            data = self._call('post', f'/api/questionnaire/fill/{self.access_code}/submit', json={
+                'answers': self.random_answers()
+            })
+            submission_ids.append(data['submission_id'])
+        return submission_ids
+
+
+def percentile(sorted_values, pct):
+    """最近秩法百分位"""
+    if not sorted_values:
+        return None
+    rank = max(1, int(round(pct / 100 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def measure(make_request, iterations, warmup):
+    """顺序发出请求，返回延迟分布、吞吐量和每请求 SQL 语句数"""
+    for i in range(warmup):
+        make_request(i)
+    latencies = []
+    statements = []
+    errors = 0
+    started = time.perf_counter()
+    for i in range(iterations):
+        start = time.perf_counter()
+        response = make_request(i)
+        latencies.append((time.perf_counter() - start) * 1000)
+        if response.status_code >= 400:
+            errors += 1
+        if 'X-SQL-Count' in response.headers:
+            statements.append(int(response.headers['X-SQL-Count']))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        'requests': iterations,
+        'errors': errors,
+        'throughput_rps': round(iterations / elapsed, 1) if elapsed else None,
+        'mean_ms': round(statistics.fmean(latencies), 3),
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p90_ms': round(percentile(latencies, 90), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'max_ms': round(latencies[-1], 3),
+        'sql_statements': statistics.median(statements) if statements else None,
+        'max_sql_statements': max(statements) if statements else None
+    }
+
+
+def run_benchmarks(client, seeder, submission_ids, args):
+    qid = seeder.qid
+    headers = seeder.headers
+    code = seeder.access_code
+    basic_option = seeder.basic_options[0]
+    rnd = random.Random(args.seed + 1)
+    cursor = submission_ids[len(submission_ids) // 2] if submission_ids else None
+    cases = {
+        'fill_by_access_code': lambda i: client.get(f'/api/questionnaire/fill/{code}'),
+        'submit_answers': lambda i: client.post(
+            f'/api/questionnaire/fill/{code}/submit',
+            json={'answers': seeder.random_answers(), 'client_key': uuid.uuid4().hex}
+        ),
+        'get_result': lambda i: client.get(f'/api/questionnaire/fill/result/{rnd.choice(submission_ids)}'),
+        'get_questionnaire_overview': lambda i: client.get(
+            f'/api/stats/questionnaire/{qid}/overview', headers=headers
+        ),
+        'get_level_by_basic': lambda i: client.get(
+            f'/api/stats/questionnaire/{qid}/level-by-basic/{seeder.basic_question_id}', headers=headers
+        ),
+        'get_level_by_basic_address': lambda i: client.get(
+            f'/api/stats/questionnaire/{qid}/level-by-basic/{seeder.address_question_id}', headers=headers
+        ),
+        'stats_submissions_first_page': lambda i: client.get(
+            f'/api/stats/questionnaire/{qid}/submissions?with_total=1', headers=headers
+        ),
+        'stats_submissions_cursor_page': lambda i: client.get(
+            f'/api/stats/questionnaire/{qid}/submissions?cursor={cursor}', headers=headers
+        ),
+        'stats_submissions_option_filter': lambda i: client.get(
+            f'/api/stats/questionnaire/{qid}/submissions?basic_question_id={seeder.basic_question_id}'
+            f'&basic_question_value={basic_option}', headers=headers
+        ),
+        'stats_submissions_area_filter': lambda i: client.get(
+            f'/api/stats/questionnaire/{qid}/submissions?basic_question_id={seeder.address_question_id}'
+            f'&area_code_arr=11&area_code_arr=1101', headers=headers
+        ),
+        'questionnaire_submissions_first_page': lambda i: client.get(
+            f'/api/questionnaire/{qid}/submissions', headers=headers
+        ),
+    }
+    results = {}
+    for name, make_request in cases.items():
+        results[name] = measure(make_request, args.iterations, args.warmup)
+        print(f"{name:40s} p50={results[name]['p50_ms']:8.2f}ms p99={results[name]['p99_ms']:8.2f}ms "
+              f"{results[name]['throughput_rps']:8.1f} req/s  sql={results[name]['sql_statements']}",
+              file=sys.stderr)
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)), stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def check_statement_budgets(endpoints):
+    """返回超出 STATEMENT_BUDGETS 的接口说明"""
+    return [
+        f'{name}: 最多执行 {endpoints[name]["max_sql_statements"]} 条 SQL，预算为 {budget}'
+        for name, budget in STATEMENT_BUDGETS.items()
+        if (endpoints.get(name, {}).get('max_sql_statements') or 0) > budget
+    ]
+
+
+def compare(previous, current):
+    """打印各接口 p50/p99/吞吐量相对之前结果的变化"""
+    print(f"{'endpoint':40s} {'p50':>18s} {'p99':>18s} {'req/s':>18s}", file=sys.stderr)
+    for name, now in current['endpoints'].items():
+        before = previous.get('endpoints', {}).get(name)
+        if not before:
+            continue
+        cells = []
+        for key in ('p50_ms', 'p99_ms', 'throughput_rps'):
+            old, new = before.get(key), now.get(key)
+            change = f'{(new - old) / old * 100:+.0f}%' if old else 'n/a'
+            cells.append(f'{old}->{new} {change}'.rjust(18))
+        print(f'{name:40s} ' + ' '.join(cells), file=sys.stderr)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    workdir = None
+    database_url = args.database_url
+    if not database_url:
+        workdir = tempfile.mkdtemp(prefix='questionnaire-bench-')
+        database_url = 'sqlite:///' + os.path.join(workdir, 'bench.db')
+
+    app = create_bench_app(database_url)
+    client = app.test_client()
+    with app.app_context():
+        seeder = Seeder(client, args)
+        seeder.login()
+    seeder.build_questionnaire()
+
+    seed_start = time.perf_counter()
+    submission_ids = seeder.seed_submissions(args.submissions)
+    seed_seconds = time.perf_counter() - seed_start
+
+    # 问卷结构的缓存在最后一次修改若干秒后才生效，等待其稳定再测量
+    from utils.questionnaire_cache import VERSION_SETTLE_SECONDS
+    time.sleep(max(0, VERSION_SETTLE_SECONDS + 0.5 - seed_seconds))
+
+    endpoints = run_benchmarks(client, seeder, submission_ids, args)
+    result = {
+        'meta': {
+            'commit': _git_commit(),
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'database': database_url.split(':', 1)[0],
+            'seed_seconds': round(seed_seconds, 2),
+            'params': {
+                key: getattr(args, key) for key in (
+                    'questions', 'options', 'dimensions', 'levels', 'branch_rules',
+                    'submissions', 'iterations', 'warmup', 'seed'
+                )
+            }
+        },
+        'endpoints': endpoints
+    }
+
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(json.load(f), result)
+
+    exceeded = check_statement_budgets(endpoints)
+    for line in exceeded:
+        print(f'超出语句预算 {line}', file=sys.stderr)
+    return 1 if exceeded else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
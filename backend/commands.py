@@ -0,0 +1,217 @@
+"""
+@description Flask 命令行：数据回填与维护
+"""
+
+import os
+import time
+import click
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from flask.cli import with_appcontext
+from models import db, Questionnaire
+from utils.answer_areas import backfill_answer_areas
+from utils.answer_options import backfill_answer_options
+from utils.analytics_snapshot import write_analytics_snapshot, SNAPSHOT_CHUNK_SIZE
+from utils.query_plans import check_query_plans
+from utils.rescoring import rescore_questionnaire, RESCORE_CHUNK_SIZE
+from utils.job_executor import JOBS, JOB_CHUNK_SIZE, run_job, parallel_workers, init_worker, run_in_worker
+from utils import submission_queue
+from utils import synthetic_data
+from utils.synthetic_data import GenerateSpec, GENERATE_CHUNK_SIZE
+
+
+@click.command('backfill-answer-areas')
+@with_appcontext
+@click.option('--batch-size', default=1000, show_default=True, help='每批处理的答案数')
+@click.option('--after-id', default=0, show_default=True, help='从该答案 id 之后开始')
+def backfill_answer_areas_command(batch_size, after_id):
+    """为历史地址题答案补写省/市/区索引列"""
+    written = backfill_answer_areas(batch_size=batch_size, after_id=after_id)
+    click.echo(f'已回填 {written} 条地址答案')
+
+
+@click.command('backfill-answer-options')
+@with_appcontext
+@click.option('--batch-size', default=1000, show_default=True, help='每批处理的答案数')
+@click.option('--after-id', default=0, show_default=True, help='从该答案 id 之后开始')
+def backfill_answer_options_command(batch_size, after_id):
+    """为历史选择题答案补写选中选项行"""
+    written = backfill_answer_options(batch_size=batch_size, after_id=after_id)
+    click.echo(f'已回填 {written} 个选中选项')
+
+
+@click.command('analytics-snapshot')
+@with_appcontext
+@click.argument('questionnaire_id', type=int)
+@click.option('--full', is_flag=True, help='删除已有快照后全量重建')
+@click.option('--chunk-size', default=SNAPSHOT_CHUNK_SIZE, show_default=True, help='每个 row group 的答卷数')
+def analytics_snapshot_command(questionnaire_id, full, chunk_size):
+    """把问卷答卷写入 Parquet 分析快照，默认只追加上次之后的新答卷"""
+    try:
+        manifest = write_analytics_snapshot(questionnaire_id, full=full, chunk_size=chunk_size)
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"快照已更新至答卷 {manifest['last_submission_id']}，共 {len(manifest['parts'])} 个分片")
+
+
+@click.command('explain-queries')
+@with_appcontext
+@click.option('--questionnaire-id', type=int, default=None, help='用该问卷的数据作为查询参数，默认取最新问卷')
+@click.option('--verbose', is_flag=True, help='输出 SQL 与完整执行计划')
+def explain_queries_command(questionnaire_id, verbose):
+    """打印热点查询的执行计划，存在全表扫描时以非零状态退出"""
+    reports = check_query_plans(questionnaire_id)
+    flagged = 0
+    for report in reports:
+        status = '全表扫描' if report.full_scans else 'OK'
+        click.echo(f'[{status}] {report.name}')
+        if verbose:
+            click.echo(f'    SQL: {report.sql}')
+        for line in (report.plan if verbose else report.full_scans):
+            click.echo(f'    {line}')
+        flagged += bool(report.full_scans)
+    if flagged:
+        raise click.ClickException(f'{flagged} 个查询存在全表扫描')
+
+
+@click.command('rescore')
+@with_appcontext
+@click.argument('questionnaire_id', type=int)
+@click.option('--chunk-size', default=RESCORE_CHUNK_SIZE, show_default=True, help='每批处理的答卷数')
+@click.option('--after-id', default=0, show_default=True, help='从该答卷 id 之后开始，用于中断后继续')
+def rescore_command(questionnaire_id, chunk_size, after_id):
+    """按当前的维度权重、选项分值和评估等级重新计算问卷全部答卷的得分"""
+    started = time.perf_counter()
+
+    def report(progress):
+        click.echo(f'已处理 {progress.submissions} 份，变化 {progress.changed} 份，'
+                   f'最后答卷 id {progress.last_submission_id}（{time.perf_counter() - started:.1f}s）')
+
+    try:
+        result = rescore_questionnaire(questionnaire_id, chunk_size=chunk_size, after_id=after_id, progress=report)
+    except (ValueError, RuntimeError) as e:
+        raise click.ClickException(str(e))
+    click.echo(f'完成：共 {result.submissions} 份答卷，{result.changed} 份得分或等级有变化，统计已重建')
+    children = [qid for (qid,) in db.session.query(Questionnaire.id).filter_by(parent_id=questionnaire_id).all()]
+    if children:
+        click.echo(f'子问卷 {children} 使用本问卷的维度，如修改了维度权重或等级需分别重新评分')
+
+
+@click.command('run-job')
+@with_appcontext
+@click.argument('job', type=click.Choice(sorted(JOBS)))
+@click.argument('questionnaire_id', type=int)
+@click.option('--workers', default=os.cpu_count() or 1, show_default='CPU 核数', help='并行处理的进程数')
+@click.option('--chunk-size', default=JOB_CHUNK_SIZE, show_default=True, help='每块答卷数，每块单独提交')
+@click.option('--restart', is_flag=True, help='忽略上次中断留下的检查点，从头执行')
+def run_job_command(job, questionnaire_id, workers, chunk_size, restart):
+    """多进程执行问卷答卷的批量维护任务：rescore 重新评分，backfill-areas / backfill-options 回填地址与选项索引，result-snapshots 重建结果快照"""
+    started = time.perf_counter()
+
+    def report(progress):
+        click.echo(f'[{progress.done}/{progress.total}] 答卷 {progress.chunk.first_id}~{progress.chunk.last_id} '
+                   f'完成，累计 {progress.processed}（{time.perf_counter() - started:.1f}s）')
+
+    try:
+        processed = run_job(job, questionnaire_id, workers=workers, chunk_size=chunk_size,
+                            restart=restart, progress=report)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(f'{job} 完成，累计 {processed}，耗时 {time.perf_counter() - started:.1f}s')
+
+
+@click.command('generate-data')
+@with_appcontext
+@click.option('--seed', default=1, show_default=True, help='随机种子，相同种子生成相同的数据')
+@click.option('--submissions', default=100000, show_default=True, help='父问卷答卷数（分支子答卷另计）')
+@click.option('--questions', default=30, show_default=True, help='父问卷计分题数')
+@click.option('--options', default=5, show_default=True, help='每题选项数，最后一项为"其他"')
+@click.option('--dimensions', default=4, show_default=True, help='计分维度数')
+@click.option('--levels', default=5, show_default=True, help='每个维度/分组的评估等级数')
+@click.option('--departments', default=8, show_default=True, help='科室（用户分组）数')
+@click.option('--branches', default=2, show_default=True, help='配置分支子问卷的科室数')
+@click.option('--child-questions', default=10, show_default=True, help='每个子问卷的计分题数')
+@click.option('--deleted-ratio', default=0.05, show_default=True, help='软删除答卷的比例')
+@click.option('--days', default=365, show_default=True, help='提交时间分布在最近多少天内')
+@click.option('--chunk-size', default=GENERATE_CHUNK_SIZE, show_default=True, help='每块答卷数，每块一个事务')
+@click.option('--workers', default=1, show_default=True, help='并行写入的进程数')
+def generate_data_command(seed, submissions, questions, options, dimensions, levels, departments, branches,
+                          child_questions, deleted_ratio, days, chunk_size, workers):
+    """生成一份大规模合成问卷及答卷，用于本地复现性能问题"""
+    departments = max(1, min(departments, len(synthetic_data.DEPARTMENTS)))
+    spec = GenerateSpec(seed, submissions, max(1, questions), max(2, options), max(1, dimensions), max(1, levels),
+                        departments, min(branches, departments), max(1, child_questions), deleted_ratio, days,
+                        max(1, chunk_size))
+    workers = parallel_workers(workers)
+
+    parent = synthetic_data.build_structure(spec)
+    db.session.commit()
+    click.echo(f'已创建问卷 {parent.id}（访问码 {parent.access_code}）')
+
+    chunks = synthetic_data.plan_chunks(spec, synthetic_data.next_submission_id())
+    anchor = datetime.now()
+    started = time.perf_counter()
+    total_submissions = total_answers = 0
+    if workers > 1:
+        db.session.remove()
+        db.engine.dispose()
+        with ProcessPoolExecutor(workers, initializer=init_worker) as pool:
+            results = pool.map(run_in_worker, *zip(*[
+                (synthetic_data.generate_chunk, spec, parent.id, c, anchor) for c in chunks
+            ]))
+            for done, (count, answers) in enumerate(results, 1):
+                total_submissions += count
+                total_answers += answers
+                click.echo(f'[{done}/{len(chunks)}] 答卷 {total_submissions}，答案 {total_answers}')
+    else:
+        for done, chunk in enumerate(chunks, 1):
+            count, answers = synthetic_data.generate_chunk(spec, parent.id, chunk, anchor)
+            total_submissions += count
+            total_answers += answers
+            click.echo(f'[{done}/{len(chunks)}] 答卷 {total_submissions}，答案 {total_answers}')
+
+    questionnaire_ids = synthetic_data.finish_generation(parent.id)
+    click.echo(f'完成：问卷 {questionnaire_ids}，答卷 {total_submissions}，答案 {total_answers}，'
+               f'耗时 {time.perf_counter() - started:.1f}s')
+
+
+@click.command('drain-submissions')
+@with_appcontext
+@click.option('--batch-size', default=submission_queue.SUBMIT_QUEUE_BATCH_SIZE, show_default=True, help='每批领取的答卷数')
+@click.option('--interval', default=1.0, show_default=True, help='队列为空时的轮询间隔（秒）')
+@click.option('--once', is_flag=True, help='处理完当前队列后退出')
+@click.option('--requeue-stale', type=int, default=None, help='启动时把领取超过该秒数仍未完成的条目放回队列')
+@click.option('--retention', default=86400, show_default=True, help='已完成条目保留的秒数，过期后轮询返回不存在')
+def drain_submissions_command(batch_size, interval, once, requeue_stale, retention):
+    """处理异步提交队列：分批评分并写库，可同时运行多个进程"""
+    if requeue_stale is not None:
+        click.echo(f'已放回 {submission_queue.requeue_stale(requeue_stale)} 条未完成的条目')
+    total = 0
+    last_purge = time.monotonic()
+    while True:
+        processed = submission_queue.drain(batch_size)
+        # 常驻进程每批换用新会话，不跨批次持有事务和已加载的对象
+        db.session.remove()
+        total += processed
+        if processed:
+            click.echo(f'已处理 {processed} 份，累计 {total} 份')
+            continue
+        if once:
+            break
+        if time.monotonic() - last_purge > 3600:
+            submission_queue.purge(retention)
+            last_purge = time.monotonic()
+        time.sleep(interval)
+    submission_queue.purge(retention)
+    click.echo(f'队列已清空，共处理 {total} 份')
+
+
+def register_commands(app):
+    app.cli.add_command(backfill_answer_areas_command)
+    app.cli.add_command(backfill_answer_options_command)
+    app.cli.add_command(analytics_snapshot_command)
+    app.cli.add_command(explain_queries_command)
+    app.cli.add_command(rescore_command)
+    app.cli.add_command(run_job_command)
+    app.cli.add_command(generate_data_command)
+    app.cli.add_command(drain_submissions_command)
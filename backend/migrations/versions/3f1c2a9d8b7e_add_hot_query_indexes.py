@@ -0,0 +1,59 @@
+"""add composite indexes for hot query shapes
+
+Revision ID: 3f1c2a9d8b7e
+Revises:
+Create Date: 2026-10-16 21:05:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c2a9d8b7e'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+# (索引名, 表名, 列)，与 models.py 中的 __table_args__ 保持一致
+INDEXES = [
+    ('ix_submission_questionnaire_deleted_id', 'submission', ['questionnaire_id', 'is_deleted', 'id']),
+    ('ix_answer_question_submission', 'answer', ['question_id', 'submission_id']),
+    ('ix_answer_submission', 'answer', ['submission_id']),
+    ('ix_question_questionnaire_deleted_order', 'question', ['questionnaire_id', 'is_deleted', 'order']),
+    ('ix_option_question_deleted', 'option', ['question_id', 'is_deleted']),
+    ('ix_branch_rule_question_deleted', 'branch_rule', ['question_id', 'is_deleted']),
+    ('ix_assessment_level_lookup', 'assessment_level',
+     ['questionnaire_id', 'dimension_id', 'group_key', 'is_deleted', 'min_score']),
+    ('ix_dimension_score_submission', 'dimension_score', ['submission_id']),
+]
+
+
+def _existing_indexes(inspector, table):
+    return {index['name'] for index in inspector.get_indexes(table)}
+
+
+def _covered(inspector, table, columns):
+    """已有索引以这些列开头时不再重复创建（如 MySQL 为外键自动建立的索引）"""
+    return any(
+        index['column_names'][:len(columns)] == columns
+        for index in inspector.get_indexes(table)
+    )
+
+
+def upgrade():
+    # 应用启动时 db.create_all() 可能已按模型建好索引，已存在的跳过
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+    for name, table, columns in INDEXES:
+        if table in tables and not _covered(inspector, table, columns):
+            op.create_index(name, table, columns)
+
+
+def downgrade():
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+    for name, table, columns in reversed(INDEXES):
+        if table in tables and name in _existing_indexes(inspector, table):
+            op.drop_index(name, table_name=table)
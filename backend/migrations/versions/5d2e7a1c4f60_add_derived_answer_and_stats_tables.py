@@ -0,0 +1,97 @@
+"""add answer index, result snapshot and stats aggregate tables
+
+Revision ID: 5d2e7a1c4f60
+Revises: 8b4e6d2c1a95
+Create Date: 2026-10-17 10:20:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+# revision identifiers, used by Alembic.
+revision = '5d2e7a1c4f60'
+down_revision = '8b4e6d2c1a95'
+branch_labels = None
+depends_on = None
+
+
+# 与 models.py 保持一致；历史数据用 flask backfill-answer-areas / backfill-answer-options 回填，
+# 结果快照和统计汇总在首次读取时生成
+TABLES = ['answer_area', 'answer_option', 'submission_result',
+          'questionnaire_stat', 'dimension_stat', 'level_stat', 'group_stat']
+
+
+def _create(name):
+    if name == 'answer_area':
+        op.create_table(
+            'answer_area',
+            sa.Column('submission_id', sa.Integer(), sa.ForeignKey('submission.id'), primary_key=True),
+            sa.Column('question_id', sa.Integer(), sa.ForeignKey('question.id'), primary_key=True),
+            sa.Column('province', sa.String(20)),
+            sa.Column('city', sa.String(20)),
+            sa.Column('district', sa.String(20)),
+            sa.Column('area_path', sa.String(255), nullable=False)
+        )
+        op.create_index('ix_answer_area_question_region', 'answer_area',
+                        ['question_id', 'province', 'city', 'district'])
+    elif name == 'answer_option':
+        op.create_table(
+            'answer_option',
+            sa.Column('submission_id', sa.Integer(), sa.ForeignKey('submission.id'), primary_key=True),
+            sa.Column('question_id', sa.Integer(), sa.ForeignKey('question.id'), primary_key=True),
+            sa.Column('option_id', sa.Integer(), sa.ForeignKey('option.id'), primary_key=True)
+        )
+        op.create_index('ix_answer_option_option_submission', 'answer_option', ['option_id', 'submission_id'])
+    elif name == 'submission_result':
+        op.create_table(
+            'submission_result',
+            sa.Column('submission_id', sa.Integer(), sa.ForeignKey('submission.id'), primary_key=True),
+            sa.Column('payload', sa.LargeBinary().with_variant(mysql.MEDIUMBLOB(), 'mysql'), nullable=False),
+            sa.Column('created_at', sa.DateTime())
+        )
+    elif name == 'questionnaire_stat':
+        op.create_table(
+            'questionnaire_stat',
+            sa.Column('questionnaire_id', sa.Integer(), sa.ForeignKey('questionnaire.id'), primary_key=True),
+            sa.Column('submission_count', sa.Integer(), nullable=False),
+            sa.Column('updated_at', sa.DateTime())
+        )
+    elif name == 'dimension_stat':
+        op.create_table(
+            'dimension_stat',
+            sa.Column('questionnaire_id', sa.Integer(), sa.ForeignKey('questionnaire.id'), primary_key=True),
+            sa.Column('dimension_id', sa.Integer(), sa.ForeignKey('dimension.id'), primary_key=True),
+            sa.Column('score_sum', sa.Float(), nullable=False),
+            sa.Column('answer_count', sa.Integer(), nullable=False)
+        )
+    elif name == 'level_stat':
+        op.create_table(
+            'level_stat',
+            sa.Column('questionnaire_id', sa.Integer(), sa.ForeignKey('questionnaire.id'), primary_key=True),
+            sa.Column('assessment_level', sa.String(50), primary_key=True),
+            sa.Column('submission_count', sa.Integer(), nullable=False)
+        )
+    elif name == 'group_stat':
+        op.create_table(
+            'group_stat',
+            sa.Column('questionnaire_id', sa.Integer(), sa.ForeignKey('questionnaire.id'), primary_key=True),
+            sa.Column('group_key', sa.String(100), primary_key=True),
+            sa.Column('submission_count', sa.Integer(), nullable=False)
+        )
+
+
+def upgrade():
+    # 应用启动时 db.create_all() 可能已按模型建好这些表，已存在的跳过
+    tables = set(sa.inspect(op.get_bind()).get_table_names())
+    for name in TABLES:
+        if name not in tables:
+            _create(name)
+
+
+def downgrade():
+    tables = set(sa.inspect(op.get_bind()).get_table_names())
+    for name in reversed(TABLES):
+        if name in tables:
+            op.drop_table(name)
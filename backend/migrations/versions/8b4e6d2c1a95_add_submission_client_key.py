@@ -0,0 +1,39 @@
+"""add submission.client_key for client-side deduplication
+
+Revision ID: 8b4e6d2c1a95
+Revises: 3f1c2a9d8b7e
+Create Date: 2026-10-16 22:40:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b4e6d2c1a95'
+down_revision = '3f1c2a9d8b7e'
+branch_labels = None
+depends_on = None
+
+
+INDEX_NAME = 'ux_submission_questionnaire_client_key'
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if 'submission' not in inspector.get_table_names():
+        return
+    if 'client_key' not in {column['name'] for column in inspector.get_columns('submission')}:
+        op.add_column('submission', sa.Column('client_key', sa.String(64), nullable=True))
+    if INDEX_NAME not in {index['name'] for index in inspector.get_indexes('submission')}:
+        op.create_index(INDEX_NAME, 'submission', ['questionnaire_id', 'client_key'], unique=True)
+
+
+def downgrade():
+    inspector = sa.inspect(op.get_bind())
+    if 'submission' not in inspector.get_table_names():
+        return
+    if INDEX_NAME in {index['name'] for index in inspector.get_indexes('submission')}:
+        op.drop_index(INDEX_NAME, table_name='submission')
+    if 'client_key' in {column['name'] for column in inspector.get_columns('submission')}:
+        op.drop_column('submission', 'client_key')
@@ -4,6 +4,7 @@
 """
 
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.dialects import mysql
 from datetime import datetime
 
 db = SQLAlchemy()
@@ -55,6 +56,10 @@ class Question(db.Model):
     options = db.relationship('Option', backref='question', lazy=True, cascade='all, delete-orphan')
     answers = db.relationship('Answer', backref='question')
 
+    __table_args__ = (
+        db.Index('ix_question_questionnaire_deleted_order', 'questionnaire_id', 'is_deleted', 'order'),
+    )
+
 class Option(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     question_id = db.Column(db.Integer, db.ForeignKey('question.id'), nullable=False)
@@ -63,6 +68,10 @@ class Option(db.Model):
     is_other = db.Column(db.Boolean, default=False)
     is_deleted = db.Column(db.Boolean, default=False)
 
+    __table_args__ = (
+        db.Index('ix_option_question_deleted', 'question_id', 'is_deleted'),
+    )
+
 class BranchRule(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     questionnaire_id = db.Column(db.Integer, db.ForeignKey('questionnaire.id'), nullable=False)
@@ -71,6 +80,10 @@ class BranchRule(db.Model):
     next_questionnaire_id = db.Column(db.Integer, db.ForeignKey('questionnaire.id'), nullable=False)
     is_deleted = db.Column(db.Boolean, default=False)
 
+    __table_args__ = (
+        db.Index('ix_branch_rule_question_deleted', 'question_id', 'is_deleted'),
+    )
+
 class Submission(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     questionnaire_id = db.Column(db.Integer, db.ForeignKey('questionnaire.id'))
@@ -80,9 +93,20 @@ class Submission(db.Model):
     assessment_opinion = db.Column(db.Text)  # 添加评估意见字段
     group_key = db.Column(db.String(100))  # 添加分组字段
     is_deleted = db.Column(db.Boolean, default=False)  # 添加软删除字段
+    client_key = db.Column(db.String(64))  # 客户端生成的答卷标识，重复上传时据此去重
     # 关系
     answers = db.relationship('Answer', backref='submission', lazy=True, cascade='all, delete-orphan')
     dimension_scores = db.relationship('DimensionScore', backref='submission', lazy=True, cascade='all, delete-orphan')
+    result = db.relationship('SubmissionResult', uselist=False, lazy=True, cascade='all, delete-orphan')
+    areas = db.relationship('AnswerArea', lazy=True, cascade='all, delete-orphan')
+    selected_options = db.relationship('AnswerOption', lazy=True, cascade='all, delete-orphan')
+
+    __table_args__ = (
+        # 答卷列表、统计与导出均按问卷过滤未删除答卷并按 id 排序/翻页
+        db.Index('ix_submission_questionnaire_deleted_id', 'questionnaire_id', 'is_deleted', 'id'),
+        # 同一问卷内客户端标识唯一，未提供标识（NULL）的答卷不受限制
+        db.Index('ux_submission_questionnaire_client_key', 'questionnaire_id', 'client_key', unique=True),
+    )
 
 class Answer(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -93,6 +117,34 @@ class Answer(db.Model):
     selected_option_ids = db.Column(db.Text)  # 多选题用，存JSON数组
     text_answer = db.Column(db.Text)  # 填空题/"其他"内容
 
+    __table_args__ = (
+        db.Index('ix_answer_question_submission', 'question_id', 'submission_id'),
+        db.Index('ix_answer_submission', 'submission_id'),
+    )
+
+class AnswerArea(db.Model):
+    """地址题答案的省/市/区，提交时从 text_answer 中拆出，用于按区域分组统计和前缀筛选"""
+    submission_id = db.Column(db.Integer, db.ForeignKey('submission.id'), primary_key=True)
+    question_id = db.Column(db.Integer, db.ForeignKey('question.id'), primary_key=True)
+    province = db.Column(db.String(20))
+    city = db.Column(db.String(20))
+    district = db.Column(db.String(20))
+    area_path = db.Column(db.String(255), nullable=False)  # 完整区域编码，以 / 分隔
+
+    __table_args__ = (
+        db.Index('ix_answer_area_question_region', 'question_id', 'province', 'city', 'district'),
+    )
+
+class AnswerOption(db.Model):
+    """选择题答案选中的选项，每个选项一行；多选题从 selected_option_ids 拆出，用于选项频次、交叉统计和筛选"""
+    submission_id = db.Column(db.Integer, db.ForeignKey('submission.id'), primary_key=True)
+    question_id = db.Column(db.Integer, db.ForeignKey('question.id'), primary_key=True)
+    option_id = db.Column(db.Integer, db.ForeignKey('option.id'), primary_key=True)
+
+    __table_args__ = (
+        db.Index('ix_answer_option_option_submission', 'option_id', 'submission_id'),
+    )
+
 class DimensionScore(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     submission_id = db.Column(db.Integer, db.ForeignKey('submission.id'), nullable=False)
@@ -102,6 +154,41 @@ class DimensionScore(db.Model):
     assessment_level = db.Column(db.String(50))  # 添加维度评估级别
     assessment_opinion = db.Column(db.Text)      # 添加维度评估意见
 
+    __table_args__ = (
+        db.Index('ix_dimension_score_submission', 'submission_id'),
+    )
+
+class SubmissionResult(db.Model):
+    """提交时生成的结果页快照（zlib 压缩的响应体），结果页直接读取"""
+    submission_id = db.Column(db.Integer, db.ForeignKey('submission.id'), primary_key=True)
+    payload = db.Column(db.LargeBinary().with_variant(mysql.MEDIUMBLOB(), 'mysql'), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
+
+class QuestionnaireStat(db.Model):
+    """问卷统计汇总，随提交和删除答卷增量维护；存在该行表示统计已初始化"""
+    questionnaire_id = db.Column(db.Integer, db.ForeignKey('questionnaire.id'), primary_key=True)
+    submission_count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
+
+class DimensionStat(db.Model):
+    """维度答题得分汇总，用于计算维度平均分"""
+    questionnaire_id = db.Column(db.Integer, db.ForeignKey('questionnaire.id'), primary_key=True)
+    dimension_id = db.Column(db.Integer, db.ForeignKey('dimension.id'), primary_key=True)
+    score_sum = db.Column(db.Float, nullable=False, default=0)
+    answer_count = db.Column(db.Integer, nullable=False, default=0)
+
+class LevelStat(db.Model):
+    """评估等级人数汇总"""
+    questionnaire_id = db.Column(db.Integer, db.ForeignKey('questionnaire.id'), primary_key=True)
+    assessment_level = db.Column(db.String(50), primary_key=True)
+    submission_count = db.Column(db.Integer, nullable=False, default=0)
+
+class GroupStat(db.Model):
+    """用户分组人数汇总"""
+    questionnaire_id = db.Column(db.Integer, db.ForeignKey('questionnaire.id'), primary_key=True)
+    group_key = db.Column(db.String(100), primary_key=True)
+    submission_count = db.Column(db.Integer, nullable=False, default=0)
+
 class AssessmentLevel(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     questionnaire_id = db.Column(db.Integer, db.ForeignKey('questionnaire.id'), nullable=False)
@@ -113,6 +200,10 @@ class AssessmentLevel(db.Model):
     dimension_id = db.Column(db.Integer, db.ForeignKey('dimension.id'))  # 添加维度字段
     is_deleted = db.Column(db.Boolean, default=False)
 
+    __table_args__ = (
+        db.Index('ix_assessment_level_lookup', 'questionnaire_id', 'dimension_id', 'group_key', 'is_deleted', 'min_score'),
+    )
+
 class Response(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     doctor_name = db.Column(db.String(255), nullable=False)
@@ -0,0 +1,45 @@
+"""
+@description 测试夹具：每个测试使用临时目录中的 SQLite 库，关闭请求日志
+"""
+
+from argparse import Namespace
+import pytest
+from benchmark import Seeder
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', 'sqlite:///' + str(tmp_path / 'test.db'))
+    monkeypatch.setenv('REQUEST_LOG_ENABLED', 'False')
+    monkeypatch.setenv('SUBMIT_QUEUE_PATH', str(tmp_path / 'queue' / 'submissions.db'))
+    monkeypatch.setenv('LOG_LEVEL', 'WARNING')
+    # 问卷修改后立即缓存评分计划，不必等待版本稳定
+    monkeypatch.setattr('utils.questionnaire_cache.VERSION_SETTLE_SECONDS', -1)
+    from app import create_app
+    from models import db
+    from utils.questionnaire_cache import _versioned_caches
+    # 缓存按问卷 id 存放，各测试的库中 id 会重复
+    for cache in _versioned_caches:
+        cache.clear()
+    app = create_app()
+    app.config['TESTING'] = True
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def build_seeder(app, client, questions, submissions=1):
+    """通过管理接口建一份问卷并提交 submissions 份答卷（至少 1 份，用于预热评分计划缓存）"""
+    args = Namespace(questions=questions, options=5, dimensions=4, levels=3, branch_rules=2, seed=1)
+    seeder = Seeder(client, args)
+    with app.app_context():
+        seeder.login()
+    seeder.build_questionnaire()
+    seeder.submission_ids = seeder.seed_submissions(max(submissions, 1))
+    return seeder
@@ -0,0 +1,40 @@
+"""
+@description 导出文件中的用户输入不能被表格软件当作公式执行
+"""
+
+import csv
+import io
+import zipfile
+from utils.submission_export import stream_csv
+from utils.xlsx_stream import stream_xlsx
+
+ROWS = [
+    ['答卷ID', '=1+1', '备注'],
+    [1, '=HYPERLINK("http://evil.example","x")', '+SUM(A1)'],
+    [2, '-3', '@cmd'],
+    [3, '\tTAB', '\rCR'],
+    [-4, 2.5, '正常文本 = 不在开头'],
+    [5, None, ''],
+]
+
+
+def test_csv_prefixes_formula_text():
+    content = b''.join(stream_csv(iter(ROWS))).decode('utf-8-sig')
+    rows = list(csv.reader(io.StringIO(content)))
+    assert rows[0] == ['答卷ID', "'=1+1", '备注']
+    assert rows[1] == ['1', '\'=HYPERLINK("http://evil.example","x")', "'+SUM(A1)"]
+    assert rows[2] == ['2', "'-3", "'@cmd"]
+    assert rows[3] == ['3', "'\tTAB", "'\rCR"]
+    # 数值不加前缀，负数仍是数字
+    assert rows[4] == ['-4', '2.5', '正常文本 = 不在开头']
+    assert rows[5] == ['5', '', '']
+
+
+def test_xlsx_writes_text_as_inline_strings():
+    data = b''.join(stream_xlsx(iter(ROWS), sheet_name='导出'))
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        sheet = zf.read('xl/worksheets/sheet1.xml').decode('utf-8')
+    assert '<f>' not in sheet
+    assert '<c t="inlineStr"><is><t xml:space="preserve">=1+1</t></is></c>' in sheet
+    assert '<c t="inlineStr"><is><t xml:space="preserve">-3</t></is></c>' in sheet
+    assert '<c><v>-4</v></c>' in sheet
@@ -0,0 +1,31 @@
+"""
+@description 批量维护任务的区间切分
+"""
+
+from conftest import build_seeder
+from models import Submission
+from utils.job_executor import JobChunk, plan_job_chunks
+from utils.sql_profiler import count_statements
+
+
+def expected_chunks(ids, chunk_size, done_ranges):
+    ids = [i for i in ids if not any(first <= i <= last for first, last in done_ranges)]
+    return [
+        JobChunk(ids[start], ids[min(start + chunk_size, len(ids)) - 1], min(chunk_size, len(ids) - start))
+        for start in range(0, len(ids), chunk_size)
+    ]
+
+
+def test_plan_job_chunks_pages_by_id(app, client):
+    seeder = build_seeder(app, client, 3, submissions=10)
+    with app.app_context():
+        ids = [s.id for s in Submission.query.filter_by(questionnaire_id=seeder.qid).order_by(Submission.id)]
+        for chunk_size in (1, 3, 4, 10, 20):
+            for done_ranges in ([], [(ids[1], ids[2])], [(ids[0], ids[3]), (ids[6], ids[6])], [(ids[0], ids[-1])]):
+                assert plan_job_chunks(seeder.qid, chunk_size, done_ranges) == \
+                    expected_chunks(ids, chunk_size, done_ranges)
+
+        with count_statements() as stats:
+            plan_job_chunks(seeder.qid, 3)
+        # 10 份答卷每页 3 个 id：4 页数据加一次空页
+        assert stats.count == 5
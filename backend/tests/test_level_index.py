@@ -0,0 +1,104 @@
+"""
+@description LevelIndex 查找结果须与按主键顺序逐条比较区间的线性扫描一致
+"""
+
+import random
+import pytest
+from utils.level_index import LevelBand, LevelIndex
+
+
+def band(id, min_score, max_score, dimension_id=None, group_key=None):
+    return LevelBand(id, dimension_id, group_key, min_score, max_score, f'等级{id}', f'意见{id}')
+
+
+def linear_lookup(bands, score, dimension_id=None, group_key=None):
+    """引入 LevelIndex 之前的查找方式：分组等级优先，按 id 顺序取第一个包含 score 的闭区间"""
+    keys = [(dimension_id, group_key), (dimension_id, None)] if group_key else [(dimension_id, None)]
+    for key in keys:
+        for b in sorted(bands, key=lambda b: b.id):
+            if (b.dimension_id, b.group_key) == key and b.min_score <= score <= b.max_score:
+                return b
+    return None
+
+
+def test_bounds_are_inclusive():
+    index = LevelIndex([band(1, 0, 10), band(2, 10.5, 20)])
+    assert index.lookup(0).id == 1
+    assert index.lookup(10).id == 1
+    assert index.lookup(10.5).id == 2
+    assert index.lookup(20).id == 2
+    assert index.lookup(-0.01) is None
+    assert index.lookup(20.01) is None
+
+
+def test_overlap_returns_lowest_id():
+    index = LevelIndex([band(3, 0, 10), band(1, 5, 15), band(2, 8, 9)])
+    assert index.lookup(4).id == 3
+    assert index.lookup(6).id == 1
+    assert index.lookup(8.5).id == 1
+    assert index.lookup(12).id == 1
+    assert {issue.kind for issue in index.issues} == {'overlap'}
+
+
+def test_overlap_hidden_behind_long_band():
+    # 长区间之后的短区间也要参与比较，不能只看 min_score 最接近的区间
+    index = LevelIndex([band(5, 0, 100), band(2, 10, 20), band(9, 30, 40)])
+    assert index.lookup(15).id == 2
+    assert index.lookup(35).id == 5
+    assert index.lookup(50).id == 5
+
+
+def test_gap_returns_none():
+    index = LevelIndex([band(1, 0, 10), band(2, 20, 30)])
+    assert index.lookup(15) is None
+    assert index.lookup_many([5, 15, 25]) == [index.lookup(5), None, index.lookup(25)]
+    assert [(issue.kind, issue.low, issue.high) for issue in index.issues] == [('gap', 10, 20)]
+
+
+def test_invalid_band_never_matches():
+    index = LevelIndex([band(1, 10, 0), band(2, 0, 5)])
+    assert index.lookup(7) is None
+    assert index.lookup(3).id == 2
+    assert [issue.kind for issue in index.issues] == ['invalid']
+
+
+def test_group_falls_back_to_general():
+    index = LevelIndex([
+        band(1, 0, 50), band(2, 50.5, 100),
+        band(3, 0, 30, group_key='内科'),
+        band(4, 0, 10, dimension_id=7), band(5, 0, 5, dimension_id=7, group_key='内科'),
+    ])
+    assert index.lookup(20, group_key='内科').id == 3
+    assert index.lookup(40, group_key='内科').id == 1
+    assert index.lookup(20, group_key='外科').id == 1
+    assert index.lookup(20).id == 1
+    assert index.lookup(3, dimension_id=7, group_key='内科').id == 5
+    assert index.lookup(8, dimension_id=7, group_key='内科').id == 4
+    assert index.lookup(8, dimension_id=8) is None
+    assert index.max_score(group_key='内科') == 30
+    assert index.max_score(group_key='外科') == 100
+    assert index.max_score(dimension_id=8) is None
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_matches_linear_scan(seed):
+    rnd = random.Random(seed)
+    bands = []
+    for dimension_id in (None, 1, 2):
+        for group_key in (None, 'a', 'b'):
+            for _ in range(rnd.randint(0, 8)):
+                low = rnd.choice([rnd.randint(0, 100), round(rnd.uniform(0, 100), 1)])
+                # 少量 min > max 的错误配置
+                high = low + rnd.choice([rnd.randint(0, 30), round(rnd.uniform(0, 30), 1), -rnd.randint(1, 5)])
+                bands.append(band(len(bands) + 1, low, high, dimension_id, group_key))
+    rnd.shuffle(bands)
+    index = LevelIndex(bands)
+    assert len(index) == len(bands)
+
+    scores = [rnd.randint(-5, 135) for _ in range(150)] + [rnd.uniform(-5, 135) for _ in range(150)]
+    scores += [b.min_score for b in bands] + [b.max_score for b in bands]
+    for dimension_id in (None, 1, 2, 3):
+        for group_key in (None, 'a', 'b', 'c'):
+            expected = [linear_lookup(bands, score, dimension_id, group_key) for score in scores]
+            assert [index.lookup(score, dimension_id, group_key) for score in scores] == expected
+            assert index.lookup_many(scores, dimension_id, group_key) == expected
@@ -0,0 +1,24 @@
+"""
+@description /metrics 需要 METRICS_TOKEN 鉴权
+"""
+
+import pytest
+
+
+def test_metrics_not_served_without_token(client):
+    # 路由未注册；/<path:path> 只接受 OPTIONS，因此为 405
+    assert client.get('/metrics').status_code in (404, 405)
+
+
+@pytest.fixture
+def metrics_token(monkeypatch):
+    monkeypatch.setenv('METRICS_TOKEN', 'scrape-secret')
+
+
+def test_metrics_requires_token(metrics_token, app):
+    client = app.test_client()
+    assert client.get('/metrics').status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 401
+    response = client.get('/metrics', headers={'Authorization': 'Bearer scrape-secret'})
+    assert response.status_code == 200
+    assert '# TYPE http_requests_total counter' in response.get_data(as_text=True)
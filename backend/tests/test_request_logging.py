@@ -0,0 +1,59 @@
+"""
+@description 请求日志：经队列写出的日志在记录时就确定内容
+"""
+
+import json
+import logging
+from flask import Flask
+from utils.request_logging import init_request_logging
+
+
+class Capture(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+
+    def emit(self, record):
+        self.lines.append(self.format(record))
+
+
+def make_app():
+    app = Flask('request_logging_test')
+    capture = Capture()
+    app.logger.handlers = [capture]
+    app.logger.setLevel(logging.INFO)
+    app.config['REQUEST_LOG_ENABLED'] = True
+    init_request_logging(app)
+
+    @app.route('/echo', methods=['POST'])
+    def echo():
+        return {'ok': True}
+
+    return app, capture
+
+
+def test_args_and_exception_formatted_when_logged():
+    app, capture = make_app()
+    state = ['before']
+    try:
+        raise RuntimeError('boom')
+    except RuntimeError:
+        app.logger.exception('state=%s', state)
+    state[0] = 'after'
+    app.extensions['request_log_listener'].stop()
+
+    assert len(capture.lines) == 1
+    assert "state=['before']" in capture.lines[0]
+    assert 'RuntimeError: boom' in capture.lines[0]
+    assert capture.lines[0].count('Traceback') == 1
+
+
+def test_request_log_is_json_with_redacted_body():
+    app, capture = make_app()
+    app.test_client().post('/echo', json={'name': 'a', 'password': 'secret'})
+    app.extensions['request_log_listener'].stop()
+
+    entry = json.loads(capture.lines[-1])
+    assert entry['path'] == '/echo'
+    assert entry['status'] == 200
+    assert entry['body'] == {'name': 'a', 'password': '***'}
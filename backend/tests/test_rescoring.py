@@ -0,0 +1,53 @@
+"""
+@description 重新评分：删除题目或选项后，历史答卷的得分与分组不变
+"""
+
+import pytest
+from conftest import build_seeder
+from models import db, Submission, DimensionScore, Option
+from utils.questionnaire_cache import invalidate_questionnaire
+
+pytest.importorskip('numpy')
+from utils.rescoring import rescore_questionnaire  # noqa: E402
+
+
+def snapshot(qid):
+    submissions = {
+        s.id: (round(s.total_score, 6), s.assessment_level, s.group_key)
+        for s in Submission.query.filter_by(questionnaire_id=qid).all()
+    }
+    dimension_scores = sorted(
+        (ds.submission_id, ds.dimension_id, round(ds.score, 6), ds.assessment_level)
+        for ds in DimensionScore.query.join(Submission).filter(Submission.questionnaire_id == qid).all()
+    )
+    return submissions, dimension_scores
+
+
+def test_rescore_keeps_points_of_deleted_question(app, client):
+    seeder = build_seeder(app, client, 6, submissions=8)
+    with app.app_context():
+        before = snapshot(seeder.qid)
+        assert all(total > 0 for total, _, _ in before[0].values())
+
+    question_id = seeder.questions[0][0]
+    response = client.delete(f'/api/questionnaire/{seeder.qid}/question/{question_id}', headers=seeder.headers)
+    assert response.get_json()['code'] == 0
+
+    with app.app_context():
+        assert rescore_questionnaire(seeder.qid).changed == 0
+        assert snapshot(seeder.qid) == before
+
+
+def test_rescore_keeps_group_of_deleted_department_option(app, client):
+    seeder = build_seeder(app, client, 4, submissions=8)
+    with app.app_context():
+        before = snapshot(seeder.qid)
+        assert all(group_key for _, _, group_key in before[0].values())
+        soft_deleted, hard_deleted = seeder.basic_options[:2]
+        Option.query.filter_by(id=soft_deleted).update({Option.is_deleted: True})
+        Option.query.filter_by(id=hard_deleted).delete()
+        invalidate_questionnaire(seeder.qid)
+        db.session.commit()
+
+        assert rescore_questionnaire(seeder.qid).changed == 0
+        assert snapshot(seeder.qid) == before
@@ -0,0 +1,64 @@
+"""
+@description SQL 语句计数与 statement_budget
+"""
+
+import pytest
+from sqlalchemy import text
+from models import db
+from utils.sql_profiler import StatementBudgetExceeded, count_statements, statement_budget
+
+
+def run_selects(n):
+    for _ in range(n):
+        db.session.execute(text('SELECT 1'))
+
+
+def test_budget_allows_up_to_limit(app):
+    with app.app_context():
+        with statement_budget(3) as stats:
+            run_selects(3)
+    assert stats.count == 3
+    assert stats.max_repeat == 3
+
+
+def test_budget_exceeded_lists_statements(app):
+    with app.app_context():
+        with pytest.raises(StatementBudgetExceeded) as exc_info:
+            with statement_budget(2):
+                run_selects(3)
+    assert '执行了 3 条 SQL，预算为 2' in str(exc_info.value)
+    assert '3x SELECT 1' in str(exc_info.value)
+
+
+def test_nested_counts_roll_up(app):
+    with app.app_context():
+        with count_statements() as outer:
+            run_selects(1)
+            with count_statements() as inner:
+                run_selects(2)
+        run_selects(1)
+    assert inner.count == 2
+    assert outer.count == 3
+
+
+def test_request_statements_count_toward_budget(app, client):
+    with count_statements() as stats:
+        response = client.get('/api/questionnaire/fill/missing')
+    assert response.status_code == 404
+    assert stats.count >= 1
+
+
+def test_headers_off_by_default(client):
+    response = client.get('/api/questionnaire/fill/missing')
+    assert 'X-SQL-Count' not in response.headers
+
+
+@pytest.fixture
+def sql_headers(monkeypatch):
+    monkeypatch.setenv('SQL_PROFILE_HEADERS', 'True')
+
+
+def test_headers_when_enabled(sql_headers, app):
+    response = app.test_client().get('/api/questionnaire/fill/missing')
+    assert int(response.headers['X-SQL-Count']) >= 1
+    assert 'X-SQL-Time-Ms' in response.headers
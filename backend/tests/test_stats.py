@@ -0,0 +1,70 @@
+"""
+@description 统计汇总随答卷写入与删除增量维护
+"""
+
+from conftest import build_seeder
+from models import AnswerOption
+
+
+def overview(client, seeder):
+    return client.get(f'/api/stats/questionnaire/{seeder.qid}/overview', headers=seeder.headers).get_json()['data']
+
+
+def level_total(client, seeder):
+    data = client.get(f'/api/stats/questionnaire/{seeder.qid}/level-stats', headers=seeder.headers).get_json()['data']
+    return sum(row['count'] for row in data)
+
+
+def group_counts(client, seeder):
+    data = client.get(f'/api/stats/questionnaire/{seeder.qid}/group-stats', headers=seeder.headers).get_json()['data']
+    return {row['group_key']: row['count'] for row in data}
+
+
+def test_group_stats_follow_submissions(app, client):
+    seeder = build_seeder(app, client, 3, submissions=4)
+    counts = group_counts(client, seeder)
+    assert sum(counts.values()) == 4
+
+    client.post(f'/api/questionnaire/fill/{seeder.access_code}/submit', json={'answers': seeder.random_answers()})
+    after_submit = group_counts(client, seeder)
+    assert sum(after_submit.values()) == 5
+
+    client.delete(f'/api/stats/questionnaire/{seeder.qid}/submissions/{seeder.submission_ids[0]}', headers=seeder.headers)
+    assert sum(group_counts(client, seeder).values()) == 4
+
+
+def test_delete_submission_retracts_once(app, client):
+    seeder = build_seeder(app, client, 5, submissions=3)
+    assert overview(client, seeder)['total_submissions'] == 3
+    assert level_total(client, seeder) == 3
+
+    url = f'/api/stats/questionnaire/{seeder.qid}/submissions/{seeder.submission_ids[0]}'
+    for _ in range(2):
+        response = client.delete(url, headers=seeder.headers)
+        assert response.get_json()['code'] == 0
+
+    assert overview(client, seeder)['total_submissions'] == 2
+    assert level_total(client, seeder) == 2
+
+
+def test_delete_missing_submission(app, client):
+    seeder = build_seeder(app, client, 3)
+    response = client.delete(f'/api/stats/questionnaire/{seeder.qid}/submissions/999999', headers=seeder.headers)
+    assert response.status_code == 404
+
+
+def test_level_by_basic_counts_other_text_once(app, client):
+    seeder = build_seeder(app, client, 3)
+    question_id, _, option_ids = next(q for q in seeder.questions if q[1] == 'multiple')
+    answers = [a for a in seeder.random_answers() if a['question_id'] != question_id]
+    answers.append({'question_id': question_id, 'answer': option_ids, 'text': '其他说明'})
+    response = client.post(f'/api/questionnaire/fill/{seeder.access_code}/submit', json={'answers': answers})
+    assert response.get_json()['code'] == 0
+
+    data = client.get(
+        f'/api/stats/questionnaire/{seeder.qid}/level-by-basic/{question_id}', headers=seeder.headers
+    ).get_json()['data']
+    with app.app_context():
+        selected = AnswerOption.query.filter_by(question_id=question_id).count()
+    assert '其他说明' not in {row['option'] for row in data}
+    assert sum(row['count'] for row in data) == selected
@@ -0,0 +1,33 @@
+"""
+@description 离线批量上传：逐份返回结果
+"""
+
+from conftest import build_seeder
+
+
+def upload(client, seeder, items):
+    response = client.post(f'/api/questionnaire/fill/{seeder.access_code}/submit-batch', json={'submissions': items})
+    assert response.status_code == 200
+    return response.get_json()['data']
+
+
+def test_invalid_submitted_at_reports_field(app, client):
+    seeder = build_seeder(app, client, 3)
+    data = upload(client, seeder, [
+        {'client_key': 'a', 'answers': seeder.random_answers(), 'submitted_at': '2026/10/01 08:00'},
+        {'client_key': 'b', 'answers': seeder.random_answers(), 'submitted_at': 20261001},
+        {'client_key': 'c', 'answers': seeder.random_answers(), 'submitted_at': '2026-10-01T08:00:00'},
+    ])
+    assert [r['status'] for r in data['results']] == ['error', 'error', 'created']
+    assert data['results'][0]['msg'] == 'submitted_at 格式错误，应为 ISO 时间'
+    assert data['results'][1]['msg'] == 'submitted_at 格式错误，应为 ISO 时间'
+
+
+def test_repeated_upload_returns_original(app, client):
+    seeder = build_seeder(app, client, 3)
+    items = [{'client_key': 'k1', 'answers': seeder.random_answers()}]
+    first = upload(client, seeder, items)['results'][0]
+    second = upload(client, seeder, items)['results'][0]
+    assert first['status'] == 'created'
+    assert second['status'] == 'duplicate'
+    assert second['submission_id'] == first['submission_id']
@@ -0,0 +1,88 @@
+"""
+@description 队列模式：提交接口入队并计数，drain 写库
+"""
+
+import re
+from conftest import build_seeder
+from utils import submission_queue
+from utils.metrics import metrics
+
+
+def submission_count(outcome):
+    match = re.search(rf'^submissions_total\{{outcome="{outcome}"\}} (\d+)$', metrics.render(), re.M)
+    return int(match.group(1)) if match else 0
+
+
+def test_queued_submit_is_counted_and_drained(app, client):
+    seeder = build_seeder(app, client, 3)
+    app.config['SUBMIT_QUEUE_ENABLED'] = True
+    queued = submission_count('queued')
+    success = submission_count('success')
+
+    response = client.post(
+        f'/api/questionnaire/fill/{seeder.access_code}/submit',
+        json={'answers': seeder.random_answers(), 'client_key': 'queued-1'}
+    )
+    assert response.status_code == 202
+    token = response.get_json()['data']['token']
+    assert submission_count('queued') == queued + 1
+    assert submission_count('success') == success
+
+    with app.app_context():
+        assert submission_queue.drain() == 1
+        status = submission_queue.get_status(token)
+    assert status['status'] == 'done'
+    assert submission_count('success') == success + 1
+
+
+def test_connect_prepares_journal_once(app, monkeypatch):
+    with app.app_context():
+        submission_queue.get_status('missing')
+        statements = []
+        original = submission_queue.sqlite3.connect
+
+        def traced_connect(*args, **kwargs):
+            conn = original(*args, **kwargs)
+            conn.set_trace_callback(statements.append)
+            return conn
+
+        monkeypatch.setattr(submission_queue.sqlite3, 'connect', traced_connect)
+        assert submission_queue.get_status('missing') is None
+    assert statements
+    assert not [s for s in statements if 'CREATE' in s or 'journal_mode' in s or 'table_info' in s]
+
+
+def test_old_journal_gets_retry_columns(app, tmp_path):
+    import sqlite3
+    path = tmp_path / 'old' / 'submissions.db'
+    path.parent.mkdir()
+    conn = sqlite3.connect(path)
+    conn.execute(
+        'CREATE TABLE submission_queue (token TEXT PRIMARY KEY, questionnaire_id INTEGER NOT NULL, '
+        'client_key TEXT NOT NULL, payload TEXT NOT NULL, submitted_at TEXT NOT NULL, '
+        "status TEXT NOT NULL DEFAULT 'pending', result TEXT, enqueued_at REAL NOT NULL, claimed_at REAL)"
+    )
+    conn.close()
+    app.config['SUBMIT_QUEUE_PATH'] = str(path)
+    with app.app_context():
+        token = submission_queue.enqueue(1, [{'question_id': 1, 'answer': 1}], 'old-key')
+        assert submission_queue.get_status(token) == {'status': 'pending'}
+    conn = sqlite3.connect(path)
+    columns = {row[1] for row in conn.execute('PRAGMA table_info(submission_queue)')}
+    conn.close()
+    assert {'attempts', 'available_at'} <= columns
+
+
+def test_drain_ends_transaction_when_nothing_is_written(app, client):
+    seeder = build_seeder(app, client, 3)
+    answers = seeder.random_answers()
+    url = f'/api/questionnaire/fill/{seeder.access_code}/submit'
+    assert client.post(url, json={'answers': answers, 'client_key': 'dup'}).status_code == 200
+    app.config['SUBMIT_QUEUE_ENABLED'] = True
+    token = client.post(url, json={'answers': answers, 'client_key': 'dup'}).get_json()['data']['token']
+
+    from models import db
+    with app.app_context():
+        assert submission_queue.drain() == 1
+        assert not db.session().in_transaction()
+        assert submission_queue.get_status(token)['status'] == 'done'
@@ -0,0 +1,37 @@
+"""
+@description 提交接口的写入语句数与题目数、答案数无关
+"""
+
+from benchmark import STATEMENT_BUDGETS
+from conftest import build_seeder
+from utils.sql_profiler import count_statements, statement_budget
+
+
+def submit(client, seeder):
+    response = client.post(
+        f'/api/questionnaire/fill/{seeder.access_code}/submit',
+        json={'answers': seeder.random_answers()}
+    )
+    assert response.status_code == 200, response.get_json()
+    return response
+
+
+def test_submit_statements_do_not_grow_with_answers(app, client):
+    counts = {}
+    for questions in (3, 30):
+        seeder = build_seeder(app, client, questions)
+        with statement_budget(STATEMENT_BUDGETS['submit_answers']) as stats:
+            submit(client, seeder)
+        counts[questions] = stats.count
+    assert 0 < counts[3] == counts[30]
+
+
+def test_duplicate_key_reads_original(app, client):
+    seeder = build_seeder(app, client, 5)
+    url = f'/api/questionnaire/fill/{seeder.access_code}/submit'
+    payload = {'answers': seeder.random_answers(), 'client_key': 'same-key'}
+    first = client.post(url, json=payload).get_json()
+    with count_statements() as stats:
+        second = client.post(url, json=payload).get_json()
+    assert second['data'] == first['data']
+    assert stats.count <= STATEMENT_BUDGETS['submit_answers']
@@ -0,0 +1,313 @@
+"""
+@description 分析快照：把问卷的答卷、答案、维度得分和题目选项写成 Parquet 列式文件，供离线分析
+
+目录结构（每个问卷一个目录）：
+    questionnaire_<id>/
+        manifest.json                 已导出的最大答卷 id 与各批次文件
+        submissions/part-00001.parquet
+        answers/part-00001.parquet
+        dimension_scores/part-00001.parquet
+        questions.parquet / options.parquet / dimensions.parquet   每次全量覆盖
+
+每次运行只追加上次快照之后新增的答卷，写成新的 part 文件；文件内每批答卷为一个 row group。
+已导出答卷的后续软删除不会回写，需要时用 full=True 全量重建。
+"""
+
+import fcntl
+import json
+import os
+import shutil
+from datetime import datetime
+from flask import current_app
+from models import db, Submission, Answer, DimensionScore, Question, Option, Dimension
+from utils.result_snapshot import parse_selected_ids
+
+SNAPSHOT_CHUNK_SIZE = 5000
+FACT_TABLES = ('submissions', 'answers', 'dimension_scores')
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError('生成分析快照需要安装 pyarrow：pip install pyarrow')
+    return pa, pq
+
+
+def _schemas(pa):
+    return {
+        'submissions': pa.schema([
+            ('submission_id', pa.int64()),
+            ('questionnaire_id', pa.int64()),
+            ('submitted_at', pa.timestamp('s')),
+            ('total_score', pa.float64()),
+            ('assessment_level', pa.string()),
+            ('group_key', pa.string()),
+            ('is_deleted', pa.bool_())
+        ]),
+        'answers': pa.schema([
+            ('answer_id', pa.int64()),
+            ('submission_id', pa.int64()),
+            ('question_id', pa.int64()),
+            ('option_id', pa.int64()),
+            ('value', pa.float64()),
+            ('selected_option_ids', pa.list_(pa.int64())),
+            ('text_answer', pa.string())
+        ]),
+        'dimension_scores': pa.schema([
+            ('submission_id', pa.int64()),
+            ('dimension_id', pa.int64()),
+            ('score', pa.float64()),
+            ('weight', pa.float64()),
+            ('assessment_level', pa.string())
+        ]),
+        'questions': pa.schema([
+            ('question_id', pa.int64()),
+            ('dimension_id', pa.int64()),
+            ('type', pa.string()),
+            ('text', pa.string()),
+            ('order', pa.int64()),
+            ('is_deleted', pa.bool_())
+        ]),
+        'options': pa.schema([
+            ('option_id', pa.int64()),
+            ('question_id', pa.int64()),
+            ('text', pa.string()),
+            ('value', pa.float64()),
+            ('is_other', pa.bool_()),
+            ('is_deleted', pa.bool_())
+        ]),
+        'dimensions': pa.schema([
+            ('dimension_id', pa.int64()),
+            ('questionnaire_id', pa.int64()),
+            ('name', pa.string()),
+            ('weight', pa.float64()),
+            ('is_deleted', pa.bool_())
+        ])
+    }
+
+
+def _decode_selected_ids(raw):
+    """多选题的 selected_option_ids 解码为整数列表，无法解析时为空值"""
+    if not raw:
+        return None
+    try:
+        return [int(x) for x in parse_selected_ids(raw)]
+    except (ValueError, TypeError):
+        return None
+
+
+def snapshot_dir(questionnaire_id):
+    base = current_app.config.get('ANALYTICS_SNAPSHOT_DIR') or os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'snapshots'
+    )
+    return os.path.join(base, f'questionnaire_{questionnaire_id}')
+
+
+def _read_manifest(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _write_atomic(path, writer):
+    tmp_path = path + '.tmp'
+    writer(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _write_dimension_tables(pa, pq, schemas, directory, questionnaire_id):
+    """题目、选项和维度数据量小，每次全量覆盖"""
+    questions = Question.query.filter_by(questionnaire_id=questionnaire_id).order_by(Question.id).all()
+    question_ids = [q.id for q in questions]
+    options = Option.query.filter(
+        Option.question_id.in_(question_ids) if question_ids else db.false()
+    ).order_by(Option.id).all()
+    # 子问卷的题目挂在父问卷的维度上
+    dimension_ids = {q.dimension_id for q in questions if q.dimension_id}
+    dimensions = Dimension.query.filter(db.or_(
+        Dimension.questionnaire_id == questionnaire_id,
+        Dimension.id.in_(dimension_ids) if dimension_ids else db.false()
+    )).order_by(Dimension.id).all()
+
+    tables = {
+        'questions': {
+            'question_id': [q.id for q in questions],
+            'dimension_id': [q.dimension_id for q in questions],
+            'type': [q.type for q in questions],
+            'text': [q.text for q in questions],
+            'order': [q.order for q in questions],
+            'is_deleted': [bool(q.is_deleted) for q in questions]
+        },
+        'options': {
+            'option_id': [o.id for o in options],
+            'question_id': [o.question_id for o in options],
+            'text': [o.text for o in options],
+            'value': [o.value for o in options],
+            'is_other': [bool(o.is_other) for o in options],
+            'is_deleted': [bool(o.is_deleted) for o in options]
+        },
+        'dimensions': {
+            'dimension_id': [d.id for d in dimensions],
+            'questionnaire_id': [d.questionnaire_id for d in dimensions],
+            'name': [d.name for d in dimensions],
+            'weight': [d.weight for d in dimensions],
+            'is_deleted': [bool(d.is_deleted) for d in dimensions]
+        }
+    }
+    for name, columns in tables.items():
+        table = pa.Table.from_pydict(columns, schema=schemas[name])
+        _write_atomic(os.path.join(directory, f'{name}.parquet'), lambda p, t=table: pq.write_table(t, p))
+
+
+def _fact_chunks(questionnaire_id, after_id, upto_id, chunk_size):
+    """按答卷 id 升序分批产出三张事实表的列数据"""
+    while True:
+        submissions = db.session.query(
+            Submission.id,
+            Submission.submitted_at,
+            Submission.total_score,
+            Submission.assessment_level,
+            Submission.group_key,
+            Submission.is_deleted
+        ).filter(
+            Submission.questionnaire_id == questionnaire_id,
+            Submission.id > after_id,
+            Submission.id <= upto_id
+        ).order_by(Submission.id).limit(chunk_size).all()
+        if not submissions:
+            return
+        ids = [s.id for s in submissions]
+        answers = db.session.query(
+            Answer.id,
+            Answer.submission_id,
+            Answer.question_id,
+            Answer.option_id,
+            Answer.value,
+            Answer.selected_option_ids,
+            Answer.text_answer
+        ).filter(Answer.submission_id.in_(ids)).order_by(Answer.id).all()
+        scores = db.session.query(
+            DimensionScore.submission_id,
+            DimensionScore.dimension_id,
+            DimensionScore.score,
+            DimensionScore.weight,
+            DimensionScore.assessment_level
+        ).filter(DimensionScore.submission_id.in_(ids)).order_by(DimensionScore.id).all()
+        # 结束只读事务，避免长时间占用连接
+        db.session.rollback()
+
+        yield {
+            'submissions': {
+                'submission_id': ids,
+                'questionnaire_id': [questionnaire_id] * len(ids),
+                'submitted_at': [s.submitted_at for s in submissions],
+                'total_score': [s.total_score for s in submissions],
+                'assessment_level': [s.assessment_level for s in submissions],
+                'group_key': [s.group_key for s in submissions],
+                'is_deleted': [bool(s.is_deleted) for s in submissions]
+            },
+            'answers': {
+                'answer_id': [a.id for a in answers],
+                'submission_id': [a.submission_id for a in answers],
+                'question_id': [a.question_id for a in answers],
+                'option_id': [a.option_id for a in answers],
+                'value': [a.value for a in answers],
+                'selected_option_ids': [_decode_selected_ids(a.selected_option_ids) for a in answers],
+                'text_answer': [a.text_answer for a in answers]
+            },
+            'dimension_scores': {
+                'submission_id': [d.submission_id for d in scores],
+                'dimension_id': [d.dimension_id for d in scores],
+                'score': [d.score for d in scores],
+                'weight': [d.weight for d in scores],
+                'assessment_level': [d.assessment_level for d in scores]
+            }
+        }, ids[-1]
+        after_id = ids[-1]
+
+
+def write_analytics_snapshot(questionnaire_id, full=False, chunk_size=SNAPSHOT_CHUNK_SIZE):
+    """生成或追加问卷的分析快照
+
+    Args:
+        questionnaire_id: 问卷ID
+        full: 为 True 时删除已有快照全量重建
+        chunk_size: 每个 row group 包含的答卷数
+
+    Returns:
+        dict: 更新后的 manifest
+
+    Raises:
+        RuntimeError: 未安装 pyarrow，或同一问卷的快照正在生成
+    """
+    pa, pq = _require_pyarrow()
+    schemas = _schemas(pa)
+    directory = snapshot_dir(questionnaire_id)
+    os.makedirs(directory, exist_ok=True)
+
+    with open(os.path.join(directory, '.lock'), 'w') as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise RuntimeError('该问卷的分析快照正在生成，请稍后再试')
+
+        manifest_path = os.path.join(directory, 'manifest.json')
+        if full:
+            for name in FACT_TABLES:
+                shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+            if os.path.exists(manifest_path):
+                os.remove(manifest_path)
+        manifest = _read_manifest(manifest_path) or {
+            'questionnaire_id': questionnaire_id,
+            'last_submission_id': 0,
+            'parts': []
+        }
+
+        _write_dimension_tables(pa, pq, schemas, directory, questionnaire_id)
+
+        # 本次导出的上界在开始时确定，之后提交的答卷留给下一次
+        upto_id = db.session.query(db.func.max(Submission.id)).filter(
+            Submission.questionnaire_id == questionnaire_id
+        ).scalar() or 0
+        after_id = manifest['last_submission_id']
+
+        part_name = f"part-{len(manifest['parts']) + 1:05d}.parquet"
+        writers = {}
+        tmp_paths = {}
+        rows = 0
+        last_id = after_id
+        try:
+            for columns, last_id in _fact_chunks(questionnaire_id, after_id, upto_id, chunk_size):
+                for name in FACT_TABLES:
+                    if name not in writers:
+                        os.makedirs(os.path.join(directory, name), exist_ok=True)
+                        tmp_paths[name] = os.path.join(directory, name, part_name + '.tmp')
+                        writers[name] = pq.ParquetWriter(tmp_paths[name], schemas[name])
+                    writers[name].write_table(pa.Table.from_pydict(columns[name], schema=schemas[name]))
+                rows += len(columns['submissions']['submission_id'])
+        finally:
+            for writer in writers.values():
+                writer.close()
+
+        if rows:
+            for name, tmp_path in tmp_paths.items():
+                os.replace(tmp_path, tmp_path[:-len('.tmp')])
+            manifest['parts'].append({
+                'file': part_name,
+                'first_submission_id': after_id + 1,
+                'last_submission_id': last_id,
+                'submissions': rows,
+                'created_at': datetime.now().isoformat()
+            })
+            manifest['last_submission_id'] = last_id
+        manifest['updated_at'] = datetime.now().isoformat()
+        _write_atomic(manifest_path, lambda p: _dump_manifest(manifest, p))
+        return manifest
+
+
+def _dump_manifest(manifest, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
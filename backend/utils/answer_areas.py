@@ -0,0 +1,116 @@
+"""
+@description 地址题答案的区域拆分：提交时解析一次 JSON，按省/市/区写入 AnswerArea
+"""
+
+import json
+from models import db, Question, Answer, AnswerArea
+
+AREA_PATH_SEPARATOR = '/'
+
+
+def extract_area(text_answer):
+    """从地址题的 text_answer（{"area": [...], "detail": ...}）中取出区域编码列表，无法解析时返回 None"""
+    if not text_answer:
+        return None
+    try:
+        area = json.loads(text_answer).get('area')
+    except (ValueError, TypeError, AttributeError):
+        return None
+    if not area or not isinstance(area, list):
+        return None
+    return [str(code) for code in area]
+
+
+def area_row(submission_id, question_id, area):
+    """组装一条 AnswerArea 字段字典"""
+    padded = area + [None] * 3
+    return {
+        'submission_id': submission_id,
+        'question_id': question_id,
+        'province': padded[0],
+        'city': padded[1],
+        'district': padded[2],
+        'area_path': AREA_PATH_SEPARATOR.join(area)
+    }
+
+
+def collect_area_rows(plan, submission_id, answer_rows):
+    """从评分后的答案中挑出地址题，生成待写入的 AnswerArea 字段字典列表"""
+    rows = {}
+    for row in answer_rows:
+        if plan.questions[row['question_id']].type != 'address':
+            continue
+        area = extract_area(row['text_answer'])
+        if area:
+            # 同一题重复作答时只保留第一条，与 insert_area_rows 一致
+            rows.setdefault(row['question_id'], area_row(submission_id, row['question_id'], area))
+    return list(rows.values())
+
+
+def area_prefix_filter(area_codes):
+    """区域前缀筛选条件：选到省则匹配全省，选到市则匹配全市，依此类推"""
+    area_codes = [str(code) for code in area_codes]
+    conditions = [
+        column == code
+        for column, code in zip((AnswerArea.province, AnswerArea.city, AnswerArea.district), area_codes)
+    ]
+    if len(area_codes) > 3:
+        prefix = AREA_PATH_SEPARATOR.join(area_codes)
+        conditions.append(db.or_(
+            AnswerArea.area_path == prefix,
+            AnswerArea.area_path.like(prefix + AREA_PATH_SEPARATOR + '%')
+        ))
+    return conditions
+
+
+def insert_area_rows(answers):
+    """为尚无 AnswerArea 的地址题答案（id, submission_id, question_id, text_answer）写入区域行，由调用方提交
+
+    Returns:
+        int: 写入的行数
+    """
+    rows = {}
+    for answer_id, submission_id, question_id, text_answer in answers:
+        area = extract_area(text_answer)
+        if area:
+            # 同一答卷同一题只保留第一条答案
+            rows.setdefault((submission_id, question_id), area_row(submission_id, question_id, area))
+    if rows:
+        db.session.bulk_insert_mappings(AnswerArea, list(rows.values()))
+    return len(rows)
+
+
+def missing_area_answers_query():
+    """尚未写入 AnswerArea 的地址题答案"""
+    return db.session.query(
+        Answer.id, Answer.submission_id, Answer.question_id, Answer.text_answer
+    ).join(
+        Question, Answer.question_id == Question.id
+    ).outerjoin(
+        AnswerArea, db.and_(
+            AnswerArea.submission_id == Answer.submission_id,
+            AnswerArea.question_id == Answer.question_id
+        )
+    ).filter(
+        Question.type == 'address',
+        AnswerArea.submission_id.is_(None)
+    )
+
+
+def backfill_answer_areas(batch_size=1000, after_id=0):
+    """为历史地址题答案补写 AnswerArea，按答案 id 分批提交，可重复执行
+
+    Returns:
+        int: 新写入的行数
+    """
+    written = 0
+    while True:
+        answers = missing_area_answers_query().filter(
+            Answer.id > after_id
+        ).order_by(Answer.id).limit(batch_size).all()
+        if not answers:
+            return written
+
+        written += insert_area_rows(answers)
+        db.session.commit()
+        after_id = answers[-1].id
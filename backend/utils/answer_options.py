@@ -0,0 +1,103 @@
+"""
+@description 选择题答案的选项拆分：提交时把单选 option_id 和多选 selected_option_ids 写成 AnswerOption 行
+"""
+
+from models import db, Question, Answer, AnswerOption, Submission
+from utils.result_snapshot import parse_selected_ids
+
+CHOICE_TYPES = ('single', 'multiple')
+
+
+def selected_ids(option_id, selected_option_ids):
+    """答案选中的选项 id 列表，多选题无法解析时返回空列表"""
+    if selected_option_ids:
+        try:
+            return [int(x) for x in parse_selected_ids(selected_option_ids)]
+        except (ValueError, TypeError):
+            return []
+    return [option_id] if option_id is not None else []
+
+
+def option_rows(submission_id, question_id, option_ids):
+    """组装 AnswerOption 字段字典列表，重复选项只保留一行"""
+    return [
+        {'submission_id': submission_id, 'question_id': question_id, 'option_id': option_id}
+        for option_id in dict.fromkeys(option_ids)
+    ]
+
+
+def collect_option_rows(plan, submission_id, answer_rows):
+    """从评分后的答案中挑出选择题，生成待写入的 AnswerOption 字段字典列表
+
+    同一题重复作答时按 (题目, 选项) 在整份答卷内去重，与 insert_option_rows 一致。
+    """
+    rows = {}
+    for row in answer_rows:
+        if plan.questions[row['question_id']].type not in CHOICE_TYPES:
+            continue
+        for option_row in option_rows(
+            submission_id, row['question_id'], selected_ids(row['option_id'], row['selected_option_ids'])
+        ):
+            rows.setdefault((row['question_id'], option_row['option_id']), option_row)
+    return list(rows.values())
+
+
+def option_filter(query, question_id, option_id):
+    """答卷查询按选项筛选，单选与多选题均适用"""
+    return query.join(
+        AnswerOption, AnswerOption.submission_id == Submission.id
+    ).filter(
+        AnswerOption.question_id == question_id,
+        AnswerOption.option_id == option_id
+    )
+
+
+def missing_option_answers_query():
+    """尚未写入 AnswerOption 的选择题答案"""
+    return db.session.query(
+        Answer.id, Answer.submission_id, Answer.question_id, Answer.option_id, Answer.selected_option_ids
+    ).join(
+        Question, Answer.question_id == Question.id
+    ).outerjoin(
+        AnswerOption, db.and_(
+            AnswerOption.submission_id == Answer.submission_id,
+            AnswerOption.question_id == Answer.question_id
+        )
+    ).filter(
+        Question.type.in_(CHOICE_TYPES),
+        AnswerOption.submission_id.is_(None)
+    )
+
+
+def insert_option_rows(answers):
+    """为 missing_option_answers_query 查出的答案写入 AnswerOption，由调用方提交
+
+    Returns:
+        int: 写入的行数
+    """
+    rows = {}
+    for answer_id, submission_id, question_id, option_id, selected_option_ids in answers:
+        for row in option_rows(submission_id, question_id, selected_ids(option_id, selected_option_ids)):
+            rows.setdefault((submission_id, question_id, row['option_id']), row)
+    if rows:
+        db.session.bulk_insert_mappings(AnswerOption, list(rows.values()))
+    return len(rows)
+
+
+def backfill_answer_options(batch_size=1000, after_id=0):
+    """为历史选择题答案补写 AnswerOption，按答案 id 分批提交，可重复执行
+
+    Returns:
+        int: 新写入的行数
+    """
+    written = 0
+    while True:
+        answers = missing_option_answers_query().filter(
+            Answer.id > after_id
+        ).order_by(Answer.id).limit(batch_size).all()
+        if not answers:
+            return written
+
+        written += insert_option_rows(answers)
+        db.session.commit()
+        after_id = answers[-1].id
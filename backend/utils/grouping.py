@@ -0,0 +1,24 @@
+"""
+@description 用户分组键生成
+
+分组键由题目和选项文本的拼音拼成。pypinyin 导入时加载较大的词典，推迟到首次生成分组键时才导入；
+同一文本的拼音结果有界缓存，题目或选项改名后文本不同，自然不会命中旧结果。
+"""
+
+from functools import lru_cache
+
+PINYIN_CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=PINYIN_CACHE_SIZE)
+def text_pinyin(text):
+    """文本的拼音串（不带声调，直接拼接）"""
+    from pypinyin import lazy_pinyin
+    return ''.join(lazy_pinyin(text))
+
+
+def generate_group_key(question, option):
+    """
+    基于题目和选项的拼音生成稳定的分组键
+    """
+    return f"{text_pinyin(question.text)}_{text_pinyin(option.text)}"
@@ -0,0 +1,240 @@
+"""
+@description 批量维护任务执行器：把问卷的答卷按 id 区间分块，分发到多个进程并行处理
+
+每个工作进程创建自己的应用与数据库连接，每块单独提交。主进程在每块完成后把区间写入检查点文件，
+中断后再次执行会跳过已完成的区间；全部完成后删除检查点。
+"""
+
+import json
+import os
+from bisect import bisect_right
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from flask import current_app
+from models import db, Questionnaire, Submission, Answer
+from utils.answer_areas import insert_area_rows, missing_area_answers_query
+from utils.answer_options import insert_option_rows, missing_option_answers_query
+from utils.rescoring import Rescorer
+from utils.result_snapshot import regenerate_result_snapshot
+from utils.scoring_plan import build_scoring_plan
+from utils.stats_aggregates import rebuild_questionnaire_stats
+
+JOB_CHUNK_SIZE = 2000
+
+# 答卷 id 闭区间 [first_id, last_id]
+JobChunk = namedtuple('JobChunk', ['first_id', 'last_id', 'count'])
+# 每块完成后的进度
+JobProgress = namedtuple('JobProgress', ['chunk', 'done', 'total', 'processed'])
+
+
+def _chunk_submissions(questionnaire_id, first_id, last_id):
+    return db.session.query(
+        Submission.id, Submission.total_score, Submission.assessment_level,
+        Submission.assessment_opinion, Submission.group_key
+    ).filter(
+        Submission.questionnaire_id == questionnaire_id,
+        Submission.id.between(first_id, last_id)
+    ).order_by(Submission.id).all()
+
+
+def rescore_chunk(questionnaire_id, first_id, last_id):
+    """按当前配置重新评分，返回有变化的答卷数"""
+    rescorer = Rescorer(Questionnaire.query.get(questionnaire_id))
+    return rescorer.rescore(_chunk_submissions(questionnaire_id, first_id, last_id))
+
+
+def backfill_areas_chunk(questionnaire_id, first_id, last_id):
+    """补写地址题答案的区域索引，返回新写入的行数"""
+    answers = missing_area_answers_query().join(
+        Submission, Answer.submission_id == Submission.id
+    ).filter(
+        Submission.questionnaire_id == questionnaire_id,
+        Submission.id.between(first_id, last_id)
+    ).order_by(Answer.id).all()
+    return insert_area_rows(answers)
+
+
+def backfill_options_chunk(questionnaire_id, first_id, last_id):
+    """补写选择题答案的选项行，返回新写入的行数"""
+    answers = missing_option_answers_query().join(
+        Submission, Answer.submission_id == Submission.id
+    ).filter(
+        Submission.questionnaire_id == questionnaire_id,
+        Submission.id.between(first_id, last_id)
+    ).order_by(Answer.id).all()
+    return insert_option_rows(answers)
+
+
+def result_snapshots_chunk(questionnaire_id, first_id, last_id):
+    """重新生成结果页快照，返回生成的份数"""
+    questionnaire = Questionnaire.query.get(questionnaire_id)
+    plan = build_scoring_plan(questionnaire)
+    submissions = Submission.query.filter(
+        Submission.questionnaire_id == questionnaire_id,
+        Submission.id.between(first_id, last_id)
+    ).order_by(Submission.id).all()
+    for submission in submissions:
+        regenerate_result_snapshot(submission, plan)
+    return len(submissions)
+
+
+def _rebuild_stats(questionnaire_id):
+    rebuild_questionnaire_stats(questionnaire_id)
+    db.session.commit()
+
+
+# 任务名: (每块的处理函数, 全部完成后在主进程执行的收尾函数)
+JOBS = {
+    'rescore': (rescore_chunk, _rebuild_stats),
+    'backfill-areas': (backfill_areas_chunk, None),
+    'backfill-options': (backfill_options_chunk, None),
+    'result-snapshots': (result_snapshots_chunk, None),
+}
+
+
+def plan_job_chunks(questionnaire_id, chunk_size, done_ranges=()):
+    """按答卷 id 切分区间，跳过检查点中已完成的区间
+
+    按 id 游标分页读取，每次最多 chunk_size 个 id，内存占用与答卷总数无关。
+    """
+    done_ranges = sorted(done_ranges)
+    starts = [first for first, last in done_ranges]
+
+    def done(submission_id):
+        i = bisect_right(starts, submission_id) - 1
+        return i >= 0 and submission_id <= done_ranges[i][1]
+
+    chunks = []
+    first_id, last_id, count = None, None, 0
+    after_id = 0
+    while True:
+        ids = [submission_id for (submission_id,) in db.session.query(Submission.id).filter(
+            Submission.questionnaire_id == questionnaire_id,
+            Submission.id > after_id
+        ).order_by(Submission.id).limit(chunk_size)]
+        if not ids:
+            break
+        for submission_id in ids:
+            if done(submission_id):
+                continue
+            if count == 0:
+                first_id = submission_id
+            last_id = submission_id
+            count += 1
+            if count == chunk_size:
+                chunks.append(JobChunk(first_id, last_id, count))
+                count = 0
+        after_id = ids[-1]
+    if count:
+        chunks.append(JobChunk(first_id, last_id, count))
+    return chunks
+
+
+class Checkpoint:
+    """记录已完成的答卷区间，只由主进程读写"""
+
+    def __init__(self, job, questionnaire_id):
+        directory = current_app.config['JOB_CHECKPOINT_DIR']
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f'{job}-questionnaire_{questionnaire_id}.json')
+        self.done = []
+        if os.path.exists(self.path):
+            with open(self.path, encoding='utf-8') as f:
+                self.done = [tuple(r) for r in json.load(f)['done']]
+
+    def add(self, chunk):
+        self.done.append((chunk.first_id, chunk.last_id))
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'done': self.done}, f)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        self.done = []
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+_worker_app = None
+
+
+def parallel_workers(workers):
+    """实际可用的进程数：SQLite 不支持并发写入，只用单进程"""
+    if workers > 1 and db.engine.dialect.name == 'sqlite':
+        current_app.logger.warning('SQLite 不支持并发写入，改为单进程执行')
+        return 1
+    return max(1, workers)
+
+
+def init_worker():
+    """工作进程初始化：创建独立的应用与数据库连接"""
+    global _worker_app
+    from app import create_app
+    _worker_app = create_app()
+
+
+def run_in_worker(func, *args):
+    """在工作进程的应用上下文中执行 func，返回其结果"""
+    with _worker_app.app_context():
+        return func(*args)
+
+
+def _run_chunk(func, questionnaire_id, chunk):
+    try:
+        result = func(questionnaire_id, chunk.first_id, chunk.last_id)
+        db.session.commit()
+        return result
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def run_job(job, questionnaire_id, workers=1, chunk_size=JOB_CHUNK_SIZE, restart=False, progress=None):
+    """执行批量任务，workers 大于 1 时在进程池中并行处理各块
+
+    Args:
+        restart: 忽略已有检查点，从头执行
+        progress: 每块完成后以 JobProgress 调用
+
+    Returns:
+        int: 各块处理函数返回值之和
+    """
+    func, finish = JOBS[job]
+    workers = parallel_workers(workers)
+    if Questionnaire.query.get(questionnaire_id) is None:
+        raise ValueError(f'问卷不存在: {questionnaire_id}')
+    checkpoint = Checkpoint(job, questionnaire_id)
+    if restart:
+        checkpoint.clear()
+    chunks = plan_job_chunks(questionnaire_id, chunk_size, checkpoint.done)
+
+    processed = 0
+
+    def completed(done, chunk, result):
+        nonlocal processed
+        processed += result or 0
+        checkpoint.add(chunk)
+        if progress:
+            progress(JobProgress(chunk, done, len(chunks), processed))
+
+    if workers > 1 and chunks:
+        # 子进程各自建立连接，不继承主进程的连接池
+        db.session.remove()
+        db.engine.dispose()
+        with ProcessPoolExecutor(min(workers, len(chunks)), initializer=init_worker) as pool:
+            futures = {pool.submit(run_in_worker, _run_chunk, func, questionnaire_id, c): c for c in chunks}
+            try:
+                for done, future in enumerate(as_completed(futures), 1):
+                    completed(done, futures[future], future.result())
+            except BaseException:
+                # 某块失败或被中断时不再启动剩余的块，已完成的块保留在检查点中
+                pool.shutdown(cancel_futures=True)
+                raise
+    else:
+        for done, chunk in enumerate(chunks, 1):
+            completed(done, chunk, _run_chunk(func, questionnaire_id, chunk))
+
+    if finish:
+        finish(questionnaire_id)
+    checkpoint.clear()
+    return processed
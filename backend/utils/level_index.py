@@ -0,0 +1,115 @@
+"""
+@description 评估等级区间索引：按 (维度, 分组) 组织有序区间，二分查找分数所在等级
+"""
+
+from bisect import bisect_right
+from collections import namedtuple
+
+LevelBand = namedtuple('LevelBand', ['id', 'dimension_id', 'group_key', 'min_score', 'max_score', 'name', 'opinion'])
+# 构建索引时发现的配置问题，kind 为 invalid / overlap / gap
+LevelIssue = namedtuple('LevelIssue', ['kind', 'dimension_id', 'group_key', 'band_ids', 'low', 'high'])
+
+
+class _BandList:
+    """同一 (维度, 分组) 下按 min_score 排序的闭区间"""
+
+    __slots__ = ('bands', 'starts', 'reach', 'max_score')
+
+    def __init__(self, bands):
+        self.bands = sorted(bands, key=lambda b: (b.min_score, b.id))
+        self.starts = [b.min_score for b in self.bands]
+        # reach[i] 为前 i+1 个区间 max_score 的最大值，单调不减，用于在重叠区间中提前结束扫描
+        self.reach = []
+        reach = None
+        for band in self.bands:
+            reach = band.max_score if reach is None else max(reach, band.max_score)
+            self.reach.append(reach)
+        self.max_score = max((b.max_score for b in self.bands), default=None)
+
+    def find(self, score):
+        """返回包含 score 的区间；多个区间重叠时取 id 最小的，与按主键顺序取第一条一致"""
+        best = None
+        i = bisect_right(self.starts, score) - 1
+        while i >= 0 and self.reach[i] >= score:
+            band = self.bands[i]
+            if band.max_score >= score and (best is None or band.id < best.id):
+                best = band
+            i -= 1
+        return best
+
+
+class LevelIndex:
+    """评估等级区间索引（只读）
+
+    键为 (dimension_id, group_key)，dimension_id 为 None 表示总分等级，group_key 为 None 表示通用等级。
+    查询时分组等级优先，分组内没有匹配的区间时回退到通用等级。
+    """
+
+    def __init__(self, bands):
+        grouped = {}
+        for band in bands:
+            grouped.setdefault((band.dimension_id, band.group_key), []).append(band)
+        self._lists = {key: _BandList(items) for key, items in grouped.items()}
+        self.issues = self._check()
+
+    def _check(self):
+        issues = []
+        for (dim_id, group_key), band_list in self._lists.items():
+            prev = None
+            reach = None
+            for band in band_list.bands:
+                if band.min_score > band.max_score:
+                    issues.append(LevelIssue('invalid', dim_id, group_key, (band.id,), band.min_score, band.max_score))
+                    continue
+                if prev is not None:
+                    if band.min_score < reach:
+                        issues.append(LevelIssue('overlap', dim_id, group_key, (prev.id, band.id),
+                                                 band.min_score, min(reach, band.max_score)))
+                    elif band.min_score > reach:
+                        issues.append(LevelIssue('gap', dim_id, group_key, (prev.id, band.id), reach, band.min_score))
+                if reach is None or band.max_score >= reach:
+                    prev = band
+                    reach = band.max_score
+        return issues
+
+    def _candidates(self, dimension_id, group_key):
+        lists = []
+        if group_key:
+            band_list = self._lists.get((dimension_id, group_key))
+            if band_list is not None:
+                lists.append(band_list)
+        band_list = self._lists.get((dimension_id, None))
+        if band_list is not None:
+            lists.append(band_list)
+        return lists
+
+    def lookup(self, score, dimension_id=None, group_key=None):
+        """查找分数所在的评估等级，没有匹配时返回 None"""
+        for band_list in self._candidates(dimension_id, group_key):
+            band = band_list.find(score)
+            if band is not None:
+                return band
+        return None
+
+    def lookup_many(self, scores, dimension_id=None, group_key=None):
+        """批量查找同一 (维度, 分组) 下一组分数的评估等级，返回与 scores 等长的列表"""
+        lists = self._candidates(dimension_id, group_key)
+        results = []
+        for score in scores:
+            band = None
+            for band_list in lists:
+                band = band_list.find(score)
+                if band is not None:
+                    break
+            results.append(band)
+        return results
+
+    def max_score(self, dimension_id=None, group_key=None):
+        """该维度（或总分）在用户分组下配置的最高分，分组未配置时取通用配置；均未配置时返回 None"""
+        for band_list in self._candidates(dimension_id, group_key):
+            if band_list.max_score is not None:
+                return band_list.max_score
+        return None
+
+    def __len__(self):
+        return sum(len(band_list.bands) for band_list in self._lists.values())
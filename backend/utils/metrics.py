@@ -0,0 +1,259 @@
+"""
+@description 运行指标：请求计数与耗时直方图、处理中请求数、错误数、数据库连接池和答卷提交计数，
+以 Prometheus 文本格式从 /metrics 输出
+
+指标保存在进程内存中；gunicorn 多 worker 部署时每个 worker 各自计数。
+"""
+
+import hmac
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+from flask import request, g, current_app
+
+# 请求耗时直方图的分桶上界（秒）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# 等待连接池连接的分桶上界（秒），最大值与 pool_timeout 一致
+POOL_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """线程安全的计数器、仪表和直方图，标签以 ((名称, 值), ...) 元组区分"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._help = {}
+        self._types = {}
+        self._values = {}
+        self._buckets = {}
+        # 采集时才计算的仪表，如连接池状态；同名的后注册者覆盖前者
+        self._collectors = {}
+
+    def _declare(self, name, kind, help_text):
+        self._types.setdefault(name, kind)
+        self._help.setdefault(name, help_text)
+        self._values.setdefault(name, {})
+
+    def counter(self, name, help_text):
+        self._declare(name, 'counter', help_text)
+
+    def gauge(self, name, help_text):
+        self._declare(name, 'gauge', help_text)
+
+    def histogram(self, name, help_text, buckets):
+        self._declare(name, 'histogram', help_text)
+        self._buckets[name] = buckets
+
+    def inc(self, name, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._values[name]
+            series[key] = series.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._values[name]
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram(self._buckets[name])
+            histogram.observe(value)
+
+    def set_collector(self, key, collector):
+        """collector() 返回 [(指标名, 类型, 说明, {标签元组: 值})]"""
+        self._collectors[key] = collector
+
+    def render(self):
+        """输出 Prometheus 文本格式"""
+        lines = []
+        with self._lock:
+            families = [
+                (name, self._types[name], self._help[name], dict(series))
+                for name, series in self._values.items()
+            ]
+            histograms = {
+                name: {key: (list(h.counts), h.sum, h.count) for key, h in series.items()}
+                for name, kind, _, series in families if kind == 'histogram'
+            }
+        for collector in list(self._collectors.values()):
+            families.extend(collector())
+
+        for name, kind, help_text, series in families:
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            if kind != 'histogram':
+                for key, value in sorted(series.items()):
+                    lines.append(f'{name}{_format_labels(key)} {_format_value(value)}')
+                continue
+            buckets = self._buckets[name]
+            for key, (counts, total, count) in sorted(histograms[name].items()):
+                cumulative = 0
+                for bound, bucket_count in zip(buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(f'{name}_bucket{_format_labels(key + (("le", bound),))} {cumulative}')
+                lines.append(f'{name}_bucket{_format_labels(key + (("le", "+Inf"),))} {count}')
+                lines.append(f'{name}_sum{_format_labels(key)} {_format_value(total)}')
+                lines.append(f'{name}_count{_format_labels(key)} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics = MetricsRegistry()
+
+metrics.counter('http_requests_total', '按路由和状态码统计的请求数')
+metrics.counter('http_request_errors_total', '返回 5xx 或抛出未处理异常的请求数')
+metrics.histogram('http_request_duration_seconds', '请求处理耗时', LATENCY_BUCKETS)
+metrics.gauge('http_requests_in_flight', '正在处理的请求数')
+metrics.inc('http_requests_in_flight', 0)
+
+metrics.counter('db_pool_checkouts_total', '从连接池取出连接的次数')
+metrics.counter('db_pool_connections_created_total', '连接池新建数据库连接的次数')
+metrics.counter('db_pool_timeouts_total', '等待连接超过 pool_timeout 的次数')
+metrics.histogram('db_pool_checkout_wait_seconds', '从连接池取得连接的等待时间', POOL_WAIT_BUCKETS)
+
+metrics.counter('submissions_total', '答卷提交次数，按结果区分（success/duplicate/invalid/error；'
+                                      '队列模式下提交接口记 queued，写库结果由 drain-submissions 进程记录）')
+metrics.counter('submission_answers_total', '成功提交的答案条数')
+
+
+class TimedQueuePool(QueuePool):
+    """记录取连接等待时间和超时次数的 QueuePool，通过 SQLALCHEMY_ENGINE_OPTIONS 的 poolclass 启用"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            metrics.inc('db_pool_timeouts_total')
+            raise
+        metrics.observe('db_pool_checkout_wait_seconds', time.perf_counter() - start)
+        return connection
+
+
+def count_submission(outcome, answers=0):
+    """记录一次答卷提交，outcome 为 success/duplicate/invalid/error，已入队待写入为 queued"""
+    metrics.inc('submissions_total', outcome=outcome)
+    if answers:
+        metrics.inc('submission_answers_total', answers)
+
+
+def _route_labels():
+    endpoint = request.endpoint or 'unmatched'
+    return {
+        'blueprint': request.blueprint or '',
+        'endpoint': endpoint,
+        'method': request.method
+    }
+
+
+def _pool_collector(engine):
+    def collect():
+        # engine.dispose() 会替换连接池，每次采集时重新获取
+        pool = engine.pool
+        if not isinstance(pool, QueuePool):
+            return []
+        return [
+            ('db_pool_size', 'gauge', '连接池常驻连接数上限（pool_size）', {(): pool.size()}),
+            ('db_pool_max_overflow', 'gauge', '允许的溢出连接数（max_overflow）', {(): pool._max_overflow}),
+            ('db_pool_checked_out', 'gauge', '当前被占用的连接数', {(): pool.checkedout()}),
+            ('db_pool_checked_in', 'gauge', '当前空闲的连接数', {(): pool.checkedin()}),
+            # QueuePool.overflow() 在常驻连接未建满时为负数
+            ('db_pool_overflow', 'gauge', '当前使用中的溢出连接数', {(): max(pool.overflow(), 0)})
+        ]
+    return collect
+
+
+def init_metrics(app, engine):
+    """注册请求指标钩子、连接池事件和 /metrics 路由
+
+    配置项：
+        METRICS_ENABLED: 是否启用
+        METRICS_TOKEN: 访问 /metrics 需带 Authorization: Bearer <token>；未设置时不注册 /metrics，
+            指标仍在进程内统计
+    """
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+
+    event.listen(engine, 'checkout', lambda *args: metrics.inc('db_pool_checkouts_total'))
+    event.listen(engine, 'connect', lambda *args: metrics.inc('db_pool_connections_created_total'))
+    metrics.set_collector('db_pool', _pool_collector(engine))
+
+    @app.before_request
+    def _start_request_metrics():
+        g.metrics_start = time.perf_counter()
+        metrics.inc('http_requests_in_flight')
+
+    @app.after_request
+    def _record_request_metrics(response):
+        start = g.get('metrics_start')
+        if start is None:
+            return response
+        labels = _route_labels()
+        metrics.inc('http_requests_total', status=response.status_code, **labels)
+        metrics.observe('http_request_duration_seconds', time.perf_counter() - start, **labels)
+        if response.status_code >= 500:
+            metrics.inc('http_request_errors_total', **labels)
+        g.metrics_recorded = True
+        return response
+
+    @app.teardown_request
+    def _finish_request_metrics(exc):
+        start = g.pop('metrics_start', None)
+        if start is None:
+            return
+        metrics.inc('http_requests_in_flight', -1)
+        # 未处理异常时不会执行 after_request
+        if not g.pop('metrics_recorded', False):
+            labels = _route_labels()
+            metrics.inc('http_requests_total', status=500, **labels)
+            metrics.observe('http_request_duration_seconds', time.perf_counter() - start, **labels)
+            metrics.inc('http_request_errors_total', **labels)
+
+    if not app.config.get('METRICS_TOKEN'):
+        # 指标包含路由、错误数和连接池状态，不对未鉴权的请求开放
+        app.logger.warning('未设置 METRICS_TOKEN，/metrics 未开放')
+        return
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics_endpoint():
+        token = current_app.config.get('METRICS_TOKEN')
+        if not token or not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            return '', 401
+        return current_app.response_class(metrics.render(), content_type=CONTENT_TYPE)
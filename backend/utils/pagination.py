@@ -0,0 +1,40 @@
+"""
+@description 基于主键的游标分页（keyset），按 id 倒序翻页
+"""
+
+from flask import request
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 200
+
+
+def page_args():
+    """从查询参数读取 cursor、limit 和 with_total
+
+    cursor 为上一页最后一条的 id，不传表示第一页。
+
+    Raises:
+        ValueError: 参数不是整数
+    """
+    cursor = request.args.get('cursor', type=int)
+    limit = request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+    if cursor is None and request.args.get('cursor'):
+        raise ValueError('cursor 参数不合法')
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    with_total = request.args.get('with_total', '').lower() in ('1', 'true')
+    return cursor, limit, with_total
+
+
+def keyset_page(query, id_column, cursor, limit):
+    """取 id 小于 cursor 的下一页
+
+    Returns:
+        (rows, next_cursor): 没有更多数据时 next_cursor 为 None
+    """
+    if cursor is not None:
+        query = query.filter(id_column < cursor)
+    rows = query.order_by(id_column.desc()).limit(limit + 1).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, rows[-1].id
+    return rows, None
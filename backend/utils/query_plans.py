@@ -0,0 +1,98 @@
+"""
+@description 热点查询执行计划检查：对各接口的主查询执行 EXPLAIN，标记全表扫描
+"""
+
+from collections import namedtuple
+from sqlalchemy import select, func
+from models import (db, Questionnaire, Question, Option, BranchRule, Submission, Answer, AnswerArea, AnswerOption,
+                    AssessmentLevel, DimensionScore)
+
+PlanReport = namedtuple('PlanReport', ['name', 'sql', 'plan', 'full_scans'])
+
+
+def _sample_ids(questionnaire_id):
+    """取一组真实存在的 id 作为查询参数，表为空时使用占位值"""
+    qid = questionnaire_id or db.session.query(func.max(Questionnaire.id)).scalar() or 1
+    question_id = db.session.query(func.min(Question.id)).filter(Question.questionnaire_id == qid).scalar() or 1
+    option_id = db.session.query(func.min(Option.id)).filter(Option.question_id == question_id).scalar() or 1
+    submission_id = db.session.query(func.max(Submission.id)).filter(Submission.questionnaire_id == qid).scalar() or 1
+    return qid, question_id, option_id, submission_id
+
+
+def hot_queries(questionnaire_id=None):
+    """各接口的主查询，键为 "接口: 查询" 描述"""
+    qid, question_id, option_id, submission_id = _sample_ids(questionnaire_id)
+    live = db.and_(Submission.questionnaire_id == qid, Submission.is_deleted == False)
+    return {
+        '填写页: 题目': select(Question).where(
+            Question.questionnaire_id == qid, Question.is_deleted == False
+        ).order_by(Question.order),
+        '填写页: 选项': select(Option).where(
+            Option.question_id.in_([question_id]), Option.is_deleted == False
+        ),
+        '填写页: 跳转规则': select(BranchRule).where(
+            BranchRule.question_id.in_([question_id]), BranchRule.is_deleted == False
+        ),
+        '评分计划: 评估等级': select(AssessmentLevel).where(
+            AssessmentLevel.questionnaire_id == qid,
+            AssessmentLevel.dimension_id.is_(None),
+            AssessmentLevel.is_deleted == False
+        ),
+        '答卷列表: 首页': select(Submission).where(live).order_by(Submission.id.desc()).limit(21),
+        '答卷列表: 翻页': select(Submission).where(live, Submission.id < submission_id)
+        .order_by(Submission.id.desc()).limit(21),
+        '答卷列表: 按选项筛选': select(Submission).join(AnswerOption, AnswerOption.submission_id == Submission.id).where(
+            live, AnswerOption.question_id == question_id, AnswerOption.option_id == option_id
+        ).order_by(Submission.id.desc()).limit(21),
+        '答卷列表: 按区域筛选': select(Submission).join(AnswerArea, AnswerArea.submission_id == Submission.id).where(
+            live, AnswerArea.question_id == question_id, AnswerArea.province == '11'
+        ).order_by(Submission.id.desc()).limit(21),
+        '统计: 等级×基本信息': select(Submission.assessment_level, AnswerOption.option_id, func.count()).select_from(
+            AnswerOption
+        ).join(Submission, AnswerOption.submission_id == Submission.id).where(
+            live, AnswerOption.question_id == question_id
+        ).group_by(Submission.assessment_level, AnswerOption.option_id),
+        '统计: 答卷答案': select(Answer).join(Submission, Answer.submission_id == Submission.id).where(live),
+        '结果页: 维度得分': select(DimensionScore).where(DimensionScore.submission_id == submission_id),
+    }
+
+
+def _explain(sql):
+    dialect = db.session.get_bind().dialect.name
+    connection = db.session.connection()
+    if dialect == 'sqlite':
+        rows = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + sql).fetchall()
+        plan = [row[-1] for row in rows]
+        # "SCAN 表名" 为全表扫描；"SCAN 表名 USING INDEX" 为索引扫描
+        full_scans = [line for line in plan if line.startswith('SCAN ') and 'INDEX' not in line]
+    elif dialect == 'mysql':
+        result = connection.exec_driver_sql('EXPLAIN ' + sql)
+        keys = list(result.keys())
+        plan = [dict(zip(keys, row)) for row in result.fetchall()]
+        full_scans = [f"{row.get('table')}: type=ALL, rows={row.get('rows')}" for row in plan if row.get('type') == 'ALL']
+        plan = [
+            f"{row.get('table')}: type={row.get('type')}, key={row.get('key')}, rows={row.get('rows')}, {row.get('Extra') or ''}"
+            for row in plan
+        ]
+    elif dialect == 'postgresql':
+        plan = [row[0] for row in connection.exec_driver_sql('EXPLAIN ' + sql).fetchall()]
+        full_scans = [line.strip() for line in plan if 'Seq Scan' in line]
+    else:
+        raise RuntimeError(f'不支持的数据库: {dialect}')
+    return plan, full_scans
+
+
+def check_query_plans(questionnaire_id=None):
+    """对热点查询逐一执行 EXPLAIN
+
+    Returns:
+        [PlanReport]
+    """
+    dialect = db.session.get_bind().dialect
+    reports = []
+    for name, stmt in hot_queries(questionnaire_id).items():
+        sql = str(stmt.compile(dialect=dialect, compile_kwargs={'literal_binds': True}))
+        plan, full_scans = _explain(sql)
+        reports.append(PlanReport(name, sql, plan, full_scans))
+    db.session.rollback()
+    return reports
@@ -0,0 +1,210 @@
+"""
+@description 问卷定义编译与进程内缓存
+"""
+
+import os
+import threading
+from collections import OrderedDict, namedtuple
+from datetime import datetime
+from flask import current_app
+from models import db, Questionnaire, Dimension, Question, Option, BranchRule
+
+# 每个进程最多缓存的问卷数量
+DEFINITION_CACHE_SIZE = int(os.getenv('QUESTIONNAIRE_CACHE_SIZE', 256))
+# updated_at 在 MySQL 中只精确到秒，刚修改过的问卷先不缓存，避免同一秒内的两次修改被误判为同一版本
+VERSION_SETTLE_SECONDS = 2
+
+# 已编译的问卷填写结构：version 对应 Questionnaire.updated_at，body 为序列化好的响应体
+QuestionnaireDefinition = namedtuple('QuestionnaireDefinition', ['questionnaire_id', 'access_code', 'version', 'body'])
+
+
+class LRUCache:
+    """线程安全、容量受限的 LRU 缓存"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def discard_where(self, predicate):
+        """删除所有满足条件的缓存项"""
+        with self._lock:
+            for key in [k for k, v in self._data.items() if predicate(v)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+# 所有按问卷版本失效的缓存，缓存值需带有 questionnaire_id 属性
+_versioned_caches = []
+
+
+def versioned_cache(maxsize):
+    """创建一个随 invalidate_questionnaire 一起失效的缓存"""
+    cache = LRUCache(maxsize)
+    _versioned_caches.append(cache)
+    return cache
+
+
+def version_settled(version):
+    """判断问卷版本是否已稳定到可以缓存"""
+    return bool(version) and (datetime.now() - version).total_seconds() > VERSION_SETTLE_SECONDS
+
+
+_definitions = versioned_cache(DEFINITION_CACHE_SIZE)
+
+
+def compile_questionnaire_definition(questionnaire):
+    """一次性查询问卷的题目、选项、分支规则，组装并序列化填写结构"""
+    questions = Question.query.filter_by(
+        questionnaire_id=questionnaire.id,
+        is_deleted=False
+    ).order_by(Question.order).all()
+
+    dimensions = Dimension.query.filter_by(
+        questionnaire_id=questionnaire.id,
+        is_deleted=False
+    ).all()
+
+    question_ids = [q.id for q in questions]
+    options_by_question = {}
+    branch_rules_by_question = {}
+    if question_ids:
+        for opt in Option.query.filter(
+            Option.question_id.in_(question_ids),
+            Option.is_deleted == False
+        ).order_by(Option.id).all():
+            options_by_question.setdefault(opt.question_id, []).append(opt)
+        for br in BranchRule.query.filter(
+            BranchRule.question_id.in_(question_ids),
+            BranchRule.is_deleted == False
+        ).order_by(BranchRule.id).all():
+            branch_rules_by_question.setdefault(br.question_id, []).append(br)
+
+    # 分支问卷的 access_code 一次查出
+    next_ids = {br.next_questionnaire_id for rules in branch_rules_by_question.values() for br in rules}
+    access_codes = {}
+    if next_ids:
+        access_codes = dict(db.session.query(Questionnaire.id, Questionnaire.access_code).filter(
+            Questionnaire.id.in_(next_ids)
+        ).all())
+
+    questions_data = []
+    for q in questions:
+        questions_data.append({
+            'id': q.id,
+            'text': q.text,
+            'type': q.type,
+            'dimension_id': q.dimension_id,
+            'order': q.order,
+            'multiline': getattr(q, 'multiline', False),
+            'input_rows': getattr(q, 'input_rows', 1),
+            'input_type': getattr(q, 'input_type', None),
+            'options': [
+                {
+                    'id': opt.id,
+                    'text': opt.text,
+                    'value': opt.value,
+                    'is_other': opt.is_other
+                } for opt in options_by_question.get(q.id, [])
+            ],
+            'branch_rules': [
+                {
+                    'option_id': br.option_id,
+                    'next_questionnaire_id': br.next_questionnaire_id,
+                    'next_questionnaire_access_code': access_codes.get(br.next_questionnaire_id)
+                } for br in branch_rules_by_question.get(q.id, [])
+            ]
+        })
+
+    payload = {
+        'code': 0,
+        'msg': 'Success',
+        'data': {
+            'id': questionnaire.id,
+            'title': questionnaire.title,
+            'description': questionnaire.description,
+            'status': questionnaire.status,
+            'created_at': questionnaire.created_at.isoformat() if questionnaire.created_at else None,
+            'access_code': questionnaire.access_code,
+            'parent_id': questionnaire.parent_id,
+            'dimensions': [
+                {
+                    'id': dim.id,
+                    'name': dim.name,
+                    'weight': dim.weight
+                } for dim in dimensions
+            ],
+            'questions': questions_data
+        }
+    }
+    # 与 jsonify 的输出保持一致
+    body = current_app.json.response(payload).get_data()
+    return QuestionnaireDefinition(questionnaire.id, questionnaire.access_code, questionnaire.updated_at, body)
+
+
+def get_questionnaire_definition(access_code):
+    """获取已发布问卷的填写结构，缓存命中时只需一次按 access_code 的版本查询
+
+    Raises:
+        NotFound: 问卷不存在或未发布
+    """
+    qid, version = Questionnaire.query.with_entities(
+        Questionnaire.id,
+        Questionnaire.updated_at
+    ).filter_by(
+        access_code=access_code,
+        is_published=True
+    ).first_or_404()
+
+    definition = _definitions.get(access_code)
+    if definition is not None and definition.questionnaire_id == qid and definition.version == version:
+        return definition
+
+    questionnaire = Questionnaire.query.get(qid)
+    definition = compile_questionnaire_definition(questionnaire)
+    if version_settled(definition.version):
+        _definitions.set(access_code, definition)
+    return definition
+
+
+def invalidate_questionnaire(questionnaire_id):
+    """标记问卷配置已变更
+
+    更新 updated_at 使所有进程中的缓存失效，同时清除本进程的缓存项。
+    子问卷复用父问卷的维度，因此一并标记子问卷。
+    需在调用方的事务中执行，随业务修改一起提交。
+    """
+    affected_ids = {questionnaire_id}
+    affected_ids.update(qid for (qid,) in Questionnaire.query.with_entities(Questionnaire.id).filter_by(
+        parent_id=questionnaire_id
+    ).all())
+    Questionnaire.query.filter(Questionnaire.id.in_(affected_ids)).update(
+        {Questionnaire.updated_at: datetime.now()},
+        synchronize_session=False
+    )
+    for cache in _versioned_caches:
+        cache.discard_where(lambda v: v.questionnaire_id in affected_ids)
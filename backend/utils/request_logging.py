@@ -0,0 +1,140 @@
+"""
+@description 请求日志：按路由采样、限制请求体大小、脱敏，经队列交给后台线程写出
+"""
+
+import atexit
+import json
+import logging
+import queue
+import random
+import time
+from logging.handlers import QueueHandler, QueueListener
+from flask import request, g
+
+# 不记录原值的请求头（小写）
+REDACTED_HEADERS = {'authorization', 'cookie', 'set-cookie', 'x-csrf-token'}
+# 字段名包含这些词时，请求体中的值替换为 ***
+REDACTED_FIELD_WORDS = ('password', 'token', 'secret')
+REDACTED = '***'
+
+DEFAULT_LOG_FORMAT = '[%(asctime)s] %(levelname)s in %(module)s: %(message)s'
+
+
+class RequestLogFormatter(logging.Formatter):
+    """请求日志输出为一行 JSON，其他日志沿用普通格式"""
+
+    def format(self, record):
+        data = getattr(record, 'request_data', None)
+        if data is None:
+            return super().format(record)
+        return json.dumps(
+            {'time': self.formatTime(record), 'level': record.levelname, **data},
+            ensure_ascii=False,
+            default=str
+        )
+
+
+def parse_sample_rates(value):
+    """解析 "endpoint=rate,endpoint=rate" 格式的按路由采样率"""
+    rates = {}
+    for item in (value or '').split(','):
+        if '=' not in item:
+            continue
+        endpoint, rate = item.split('=', 1)
+        rates[endpoint.strip()] = float(rate)
+    return rates
+
+
+def _redact(value):
+    if isinstance(value, dict):
+        return {
+            k: REDACTED if any(word in str(k).lower() for word in REDACTED_FIELD_WORDS) else _redact(v)
+            for k, v in value.items()
+        }
+    if isinstance(value, list):
+        return [_redact(v) for v in value]
+    return value
+
+
+def _request_body(limit):
+    """请求体不超过 limit 字节时记录脱敏后的 JSON，超过时只记录大小"""
+    size = request.content_length or 0
+    if not size or not request.is_json:
+        return None
+    if size > limit:
+        return f'<{size} bytes, truncated>'
+    return _redact(request.get_json(silent=True))
+
+
+def _stop_listener(listener):
+    # 退出时写完队列中剩余的日志；已手动停止的不再重复停止
+    if listener._thread is not None:
+        listener.stop()
+
+
+def init_request_logging(app):
+    """把应用日志改为经队列异步写出，并注册请求日志钩子
+
+    配置项：
+        REQUEST_LOG_ENABLED: 是否记录请求日志
+        REQUEST_LOG_SAMPLE_RATE: 默认采样率（0~1）
+        REQUEST_LOG_SAMPLE_RATES: 按 endpoint 覆盖采样率，如 {'questionnaire.submit_answers': 0.05}
+        REQUEST_LOG_BODY_LIMIT: 记录请求体的最大字节数
+        REQUEST_LOG_HEADERS: 是否记录请求头（敏感头脱敏）
+    """
+    handlers = app.logger.handlers[:] or [logging.StreamHandler()]
+    for handler in handlers:
+        handler.setFormatter(RequestLogFormatter(DEFAULT_LOG_FORMAT))
+        app.logger.removeHandler(handler)
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(_stop_listener, listener)
+    # QueueHandler.prepare 在当前线程把消息参数和异常堆栈格式化为文本，后台线程写出时它们引用的对象可能已改变；
+    # 请求日志的 request_data 不参与这一步，JSON 序列化仍由后台线程的 RequestLogFormatter 完成
+    app.logger.addHandler(QueueHandler(log_queue))
+    app.extensions['request_log_listener'] = listener
+
+    if not app.config.get('REQUEST_LOG_ENABLED', True):
+        return
+
+    default_rate = app.config.get('REQUEST_LOG_SAMPLE_RATE', 1.0)
+    route_rates = app.config.get('REQUEST_LOG_SAMPLE_RATES') or {}
+    body_limit = app.config.get('REQUEST_LOG_BODY_LIMIT', 2048)
+    log_headers = app.config.get('REQUEST_LOG_HEADERS', False)
+
+    @app.before_request
+    def _sample_request():
+        rate = route_rates.get(request.endpoint, default_rate)
+        g.request_log_start = time.perf_counter()
+        g.request_log_sampled = rate >= 1 or (rate > 0 and random.random() < rate)
+
+    @app.after_request
+    def _log_request(response):
+        start = g.get('request_log_start')
+        if start is None:
+            return response
+        # 未采样的请求只在出错时记录
+        if not g.get('request_log_sampled') and response.status_code < 500:
+            return response
+        data = {
+            'method': request.method,
+            'path': request.path,
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+            'duration_ms': round((time.perf_counter() - start) * 1000, 2),
+            'remote_addr': request.remote_addr
+        }
+        if request.args:
+            data['args'] = _redact(request.args.to_dict(flat=False))
+        if log_headers:
+            data['headers'] = {
+                k: REDACTED if k.lower() in REDACTED_HEADERS else v
+                for k, v in request.headers.items()
+            }
+        body = _request_body(body_limit)
+        if body is not None:
+            data['body'] = body
+        level = logging.ERROR if response.status_code >= 500 else logging.INFO
+        app.logger.log(level, 'request', extra={'request_data': data})
+        return response
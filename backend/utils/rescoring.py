@@ -0,0 +1,230 @@
+"""
+@description 批量重新评分：维度权重、选项分值或评估等级修改后，按当前配置重新计算历史答卷的得分与等级
+
+按答卷 id 分块处理，每块读取答案后构造 答卷 × 维度 的得分矩阵一次算出全部得分，
+只回写有变化的行，每块单独提交；中断后用上次输出的答卷 id 作为 after_id 继续即可。
+计算规则与提交时的 ScoringPlan.score 一致。已软删除的题目和选项仍按当前分值计分、已删除的科室选项
+仍对应原分组，历史答卷不会因删除题目或选项而失分或改变分组；被物理删除的科室选项无法还原分组键，
+保留答卷原有的分组。
+"""
+
+import math
+from collections import namedtuple
+from models import db, Questionnaire, Submission, Answer, DimensionScore, SubmissionResult
+from utils.result_snapshot import parse_selected_ids
+from utils.scoring_plan import build_scoring_plan
+from utils.stats_aggregates import rebuild_questionnaire_stats
+
+RESCORE_CHUNK_SIZE = 2000
+
+# 每块处理完成后的进度
+RescoreProgress = namedtuple('RescoreProgress', [
+    'last_submission_id',  # 已提交的最大答卷 id，作为重启时的 after_id
+    'submissions',         # 累计处理的答卷数
+    'changed'              # 累计得分或等级有变化的答卷数
+])
+
+
+def _require_numpy():
+    try:
+        import numpy as np
+    except ImportError:
+        raise RuntimeError('批量重新评分需要安装 numpy：pip install numpy')
+    return np
+
+
+class Rescorer:
+    """按问卷当前配置批量重新评分的计算器"""
+
+    def __init__(self, questionnaire):
+        self.np = _require_numpy()
+        # 含已删除的题目和选项，避免历史答案因删除题目或选项而失分
+        self.plan = build_scoring_plan(questionnaire, include_deleted=True)
+        self.option_pos = {}
+        values = []
+        for option in self.plan.options.values():
+            self.option_pos[option.id] = len(values)
+            values.append(option.value or 0)
+        self.option_values = self.np.array(values, dtype=float)
+        self.dimension_ids = sorted(self.plan.dimension_weights)
+        self.dimension_pos = {dim_id: i for i, dim_id in enumerate(self.dimension_ids)}
+        self.weights = self.np.array([self.plan.dimension_weights[d] for d in self.dimension_ids], dtype=float)
+
+    def _lookup(self, scores, dimension_id, group_keys):
+        """按分组批量查找等级，返回 (名称, 意见) 列表"""
+        by_group = {}
+        for i, group_key in enumerate(group_keys):
+            by_group.setdefault(group_key, []).append(i)
+        results = [None] * len(scores)
+        for group_key, positions in by_group.items():
+            bands = self.plan.levels.lookup_many([scores[i] for i in positions], dimension_id, group_key)
+            for i, band in zip(positions, bands):
+                results[i] = (band.name, band.opinion) if band else (None, None)
+        return results
+
+    def rescore(self, submissions):
+        """重新计算一块答卷并回写有变化的行，由调用方提交
+
+        Args:
+            submissions: Submission 行（id、total_score、assessment_level、assessment_opinion、group_key）
+
+        Returns:
+            int: 有变化的答卷数
+        """
+        np = self.np
+        plan = self.plan
+        sub_pos = {s.id: i for i, s in enumerate(submissions)}
+        answers = db.session.query(
+            Answer.id, Answer.submission_id, Answer.question_id, Answer.option_id,
+            Answer.value, Answer.selected_option_ids
+        ).filter(Answer.submission_id.in_(list(sub_pos))).order_by(Answer.id).all()
+        answers = [a for a in answers if a.question_id in plan.questions]
+
+        # 每条答案所属答卷、维度与单选选项的位置，-1 表示无
+        n = len(answers)
+        answer_sub = np.empty(n, dtype=np.int64)
+        answer_dim = np.full(n, -1, dtype=np.int64)
+        answer_opt = np.full(n, -1, dtype=np.int64)
+        is_address = np.zeros(n, dtype=bool)
+        pair_rows, pair_opts = [], []
+        group_keys = [None] * len(submissions)
+        for row, ans in enumerate(answers):
+            question = plan.questions[ans.question_id]
+            answer_sub[row] = sub_pos[ans.submission_id]
+            answer_dim[row] = self.dimension_pos.get(question.dimension_id, -1)
+            if question.type == 'address':
+                is_address[row] = True
+            elif question.type == 'multiple':
+                for opt_id in parse_selected_ids(ans.selected_option_ids) if ans.selected_option_ids else ():
+                    pos = self.option_pos.get(opt_id)
+                    if pos is not None:
+                        pair_rows.append(row)
+                        pair_opts.append(pos)
+            elif ans.option_id is not None:
+                answer_opt[row] = self.option_pos.get(ans.option_id, -1)
+            keys = plan.group_keys.get(ans.question_id)
+            if keys and group_keys[answer_sub[row]] is None:
+                # 选项已被物理删除时无法重新生成分组键，保留原分组
+                group_keys[answer_sub[row]] = keys.get(ans.option_id, submissions[answer_sub[row]].group_key)
+
+        # 答案分值：单选取选项分值，多选累加所选选项分值，地址题无分值
+        values = np.zeros(n)
+        single = answer_opt >= 0
+        values[single] = self.option_values[answer_opt[single]]
+        if pair_rows:
+            np.add.at(values, np.array(pair_rows), self.option_values[np.array(pair_opts)])
+
+        # 答卷 × 维度：原始分求和，有答案的维度才生成维度得分
+        scored = answer_dim >= 0
+        raw = np.zeros((len(submissions), len(self.dimension_ids)))
+        answered = np.zeros(raw.shape, dtype=bool)
+        np.add.at(raw, (answer_sub[scored], answer_dim[scored]), values[scored])
+        answered[answer_sub[scored], answer_dim[scored]] = True
+        weighted = raw * self.weights
+        totals = weighted.sum(axis=1)
+
+        dimension_rows = {s.id: [] for s in submissions}
+        for col, dim_id in enumerate(self.dimension_ids):
+            positions = np.flatnonzero(answered[:, col])
+            if not len(positions):
+                continue
+            levels = self._lookup(weighted[positions, col].tolist(), dim_id, [group_keys[i] for i in positions])
+            for i, (name, opinion) in zip(positions.tolist(), levels):
+                dimension_rows[submissions[i].id].append({
+                    'submission_id': submissions[i].id,
+                    'dimension_id': dim_id,
+                    'score': float(weighted[i, col]),
+                    'weight': float(self.weights[col]),
+                    'assessment_level': name,
+                    'assessment_opinion': opinion
+                })
+        total_levels = self._lookup(totals.tolist(), None, group_keys)
+
+        changed = set()
+        answer_updates = []
+        for row, ans in enumerate(answers):
+            value = None if is_address[row] else float(values[row])
+            if value != ans.value and not (value is not None and ans.value is not None and math.isclose(value, ans.value)):
+                answer_updates.append({'id': ans.id, 'value': value})
+                changed.add(ans.submission_id)
+
+        submission_updates = []
+        for i, submission in enumerate(submissions):
+            name, opinion = total_levels[i]
+            new = {
+                'id': submission.id,
+                'total_score': float(totals[i]),
+                'assessment_level': name,
+                'assessment_opinion': opinion,
+                'group_key': group_keys[i]
+            }
+            if any(new[key] != getattr(submission, key) for key in new if key != 'total_score') or \
+                    submission.total_score is None or not math.isclose(new['total_score'], submission.total_score):
+                submission_updates.append(new)
+                changed.add(submission.id)
+
+        existing = {}
+        for ds in db.session.query(
+            DimensionScore.submission_id, DimensionScore.dimension_id, DimensionScore.score,
+            DimensionScore.weight, DimensionScore.assessment_level, DimensionScore.assessment_opinion
+        ).filter(DimensionScore.submission_id.in_(list(sub_pos))).order_by(DimensionScore.dimension_id).all():
+            existing.setdefault(ds.submission_id, []).append(
+                (ds.dimension_id, round(ds.score, 6), ds.weight, ds.assessment_level, ds.assessment_opinion)
+            )
+        replaced = []
+        for submission_id, rows in dimension_rows.items():
+            new = [(r['dimension_id'], round(r['score'], 6), r['weight'], r['assessment_level'], r['assessment_opinion'])
+                   for r in rows]
+            if new != existing.get(submission_id, []):
+                replaced.append(submission_id)
+                changed.add(submission_id)
+
+        if answer_updates:
+            db.session.bulk_update_mappings(Answer, answer_updates)
+        if submission_updates:
+            db.session.bulk_update_mappings(Submission, submission_updates)
+        if replaced:
+            DimensionScore.query.filter(DimensionScore.submission_id.in_(replaced)).delete(synchronize_session=False)
+            db.session.bulk_insert_mappings(
+                DimensionScore, [row for submission_id in replaced for row in dimension_rows[submission_id]]
+            )
+        if changed:
+            # 结果页快照已过期，查看时按新得分重新生成
+            SubmissionResult.query.filter(SubmissionResult.submission_id.in_(changed)).delete(synchronize_session=False)
+        return len(changed)
+
+
+def rescore_questionnaire(questionnaire_id, chunk_size=RESCORE_CHUNK_SIZE, after_id=0, progress=None):
+    """按问卷当前配置重新计算全部答卷（含已软删除的）的得分与等级，完成后重建统计汇总
+
+    Args:
+        after_id: 从该答卷 id 之后开始，用于中断后继续
+        progress: 每块提交后以 RescoreProgress 调用
+
+    Returns:
+        RescoreProgress
+    """
+    questionnaire = Questionnaire.query.get(questionnaire_id)
+    if questionnaire is None:
+        raise ValueError(f'问卷不存在: {questionnaire_id}')
+    rescorer = Rescorer(questionnaire)
+    state = RescoreProgress(after_id, 0, 0)
+    while True:
+        submissions = db.session.query(
+            Submission.id, Submission.total_score, Submission.assessment_level,
+            Submission.assessment_opinion, Submission.group_key
+        ).filter(
+            Submission.questionnaire_id == questionnaire_id,
+            Submission.id > state.last_submission_id
+        ).order_by(Submission.id).limit(chunk_size).all()
+        if not submissions:
+            break
+        changed = rescorer.rescore(submissions)
+        db.session.commit()
+        state = RescoreProgress(submissions[-1].id, state.submissions + len(submissions), state.changed + changed)
+        if progress:
+            progress(state)
+
+    rebuild_questionnaire_stats(questionnaire_id)
+    db.session.commit()
+    return state
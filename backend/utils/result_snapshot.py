@@ -0,0 +1,203 @@
+"""
+@description 答卷结果快照：提交时生成结果页响应体并压缩保存，结果页直接返回
+"""
+
+import json
+import zlib
+from flask import current_app
+from models import db, Question, Option, Answer, DimensionScore, SubmissionResult
+from utils.scoring_plan import BASIC_DIMENSION_NAME, PlanQuestion, PlanOption, get_scoring_plan
+
+
+def parse_selected_ids(raw):
+    """解析多选题的 selected_option_ids，兼容 JSON 数组和逗号分隔两种格式"""
+    if raw.startswith('['):
+        return json.loads(raw)
+    return [int(x) for x in raw.replace('"', '').split(',') if x.strip()]
+
+
+def build_result_body(questionnaire, submission, answers, dimension_scores, plan, questions=None, options=None):
+    """组装结果页响应体
+
+    Args:
+        questionnaire: 问卷
+        submission: 答卷（需已有总分、等级、分组和提交时间）
+        answers: Answer 字段字典列表，按提交顺序
+        dimension_scores: DimensionScore 字段字典列表
+        plan: 问卷的评分计划，提供题目、选项、维度和评估等级索引
+        questions / options: 补充计划中没有的题目和选项（如已删除的题目）
+
+    Returns:
+        bytes: 与 jsonify 输出一致的响应体
+    """
+    questions = {**plan.questions, **(questions or {})}
+    options = {**plan.options, **(options or {})}
+
+    question_results = []
+    answered_dimension_ids = set()
+    for ans in answers:
+        question = questions.get(ans['question_id'])
+        if not question:
+            continue
+        if question.dimension_id:
+            answered_dimension_ids.add(question.dimension_id)
+        option_text = None
+        fillin_text = ans['text_answer']
+        # 多选题处理
+        if question.type == 'multiple' and ans['selected_option_ids']:
+            try:
+                selected_ids = set(parse_selected_ids(ans['selected_option_ids']))
+                option_texts = []
+                for opt_id in sorted(selected_ids):
+                    opt = options.get(opt_id)
+                    if not opt:
+                        continue
+                    if opt.is_other and fillin_text:
+                        # 如果是"其他"选项且有填写内容，显示为"其他（填写内容）"
+                        option_texts.append(f"{opt.text}（{fillin_text}）")
+                    else:
+                        option_texts.append(opt.text)
+                option_text = ', '.join(option_texts)
+            except Exception:
+                option_text = str(ans['selected_option_ids'])
+        elif ans['option_id'] is not None:
+            option = options.get(ans['option_id'])
+            option_text = option.text if option else None
+            # 单选题的"其他"处理
+            if option and option.is_other and fillin_text:
+                option_text = f"{option_text}（{fillin_text}）"
+
+        # 组装题目结果
+        if question.type == 'address':
+            question_results.append({
+                'id': question.id,
+                'text': question.text,
+                'type': question.type,
+                'answer': ans['text_answer'],
+                'option_id': None,
+                'option_text': None,
+                'fillin_text': None,
+                'value': ans['value']
+            })
+            continue
+        question_results.append({
+            'id': question.id,
+            'text': question.text,
+            'type': question.type,
+            'answer': (
+                ans['text_answer'] if question.type == 'text'
+                else option_text
+            ),
+            'option_id': ans['option_id'],
+            'option_text': option_text,
+            'fillin_text': fillin_text,
+            'value': ans['value']
+        })
+
+    # 只返回有答案的维度，排除"用户基本信息(不参与得分评估)"维度
+    scores_by_dimension = {}
+    for dim_score in dimension_scores:
+        scores_by_dimension.setdefault(dim_score['dimension_id'], dim_score)
+    dim_list = []
+    for dim in plan.dimensions:
+        if dim.id not in answered_dimension_ids or dim.name == BASIC_DIMENSION_NAME:
+            continue
+        dim_score = scores_by_dimension.get(dim.id)
+        # 该维度的最大分数（从评估等级配置中查找，考虑用户分组）
+        dimension_max_score = plan.levels.max_score(dim.id, submission.group_key)
+        dim_list.append({
+            'dimension_id': dim.id,
+            'dimension_name': dim.name,
+            'score': dim_score['score'] if dim_score else 0,
+            'max_score': dimension_max_score if dimension_max_score is not None else 100,
+            'assessment_level': dim_score['assessment_level'] if dim_score else None,
+            'assessment_opinion': dim_score['assessment_opinion'] if dim_score else None
+        })
+
+    # 总分的最大值（从评估等级配置中查找，考虑用户分组）
+    total_max_score = plan.levels.max_score(None, submission.group_key)
+
+    response_data = {
+        'code': 0,
+        'msg': 'Success',
+        'data': {
+            'total_score': submission.total_score,
+            'total_max_score': total_max_score if total_max_score is not None else 100,
+            'dimensions': dim_list,
+            'questionnaire_title': questionnaire.title,
+            'assessment_level': submission.assessment_level,
+            'assessment_opinion': submission.assessment_opinion,
+            'questions': question_results,
+            'submitted_at': submission.submitted_at.isoformat() if submission.submitted_at else None
+        }
+    }
+    return current_app.json.response(response_data).get_data()
+
+
+def pack_result(body):
+    return zlib.compress(body)
+
+
+def unpack_result(snapshot):
+    return zlib.decompress(snapshot.payload)
+
+
+def regenerate_result_snapshot(submission, plan=None):
+    """根据已保存的答案和维度得分重新生成结果快照（用于历史答卷和重新评分后）
+
+    快照加入当前会话，由调用方提交。
+
+    Returns:
+        bytes: 结果页响应体
+    """
+    questionnaire = submission.questionnaire
+    if plan is None:
+        plan = get_scoring_plan(questionnaire)
+
+    answers = [{
+        'question_id': ans.question_id,
+        'option_id': ans.option_id,
+        'value': ans.value,
+        'selected_option_ids': ans.selected_option_ids,
+        'text_answer': ans.text_answer
+    } for ans in Answer.query.filter_by(submission_id=submission.id).order_by(Answer.id).all()]
+    dimension_scores = [{
+        'dimension_id': ds.dimension_id,
+        'score': ds.score,
+        'assessment_level': ds.assessment_level,
+        'assessment_opinion': ds.assessment_opinion
+    } for ds in DimensionScore.query.filter_by(submission_id=submission.id).order_by(DimensionScore.id).all()]
+
+    # 历史答卷可能引用已删除的题目和选项，一次补齐
+    missing_question_ids = {a['question_id'] for a in answers} - set(plan.questions)
+    extra_questions = {}
+    if missing_question_ids:
+        extra_questions = {
+            q.id: PlanQuestion(q.id, q.type, q.text, q.dimension_id)
+            for q in Question.query.filter(Question.id.in_(missing_question_ids)).all()
+        }
+    option_ids = set()
+    for a in answers:
+        if a['option_id'] is not None:
+            option_ids.add(a['option_id'])
+        if a['selected_option_ids']:
+            try:
+                option_ids.update(parse_selected_ids(a['selected_option_ids']))
+            except Exception:
+                pass
+    missing_option_ids = option_ids - set(plan.options)
+    extra_options = {}
+    if missing_option_ids:
+        extra_options = {
+            o.id: PlanOption(o.id, o.question_id, o.text, o.value, o.is_other)
+            for o in Option.query.filter(Option.id.in_(missing_option_ids)).all()
+        }
+
+    body = build_result_body(questionnaire, submission, answers, dimension_scores, plan,
+                             questions=extra_questions, options=extra_options)
+    snapshot = SubmissionResult.query.get(submission.id)
+    if snapshot is None:
+        db.session.add(SubmissionResult(submission_id=submission.id, payload=pack_result(body)))
+    else:
+        snapshot.payload = pack_result(body)
+    return body
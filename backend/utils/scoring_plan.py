@@ -0,0 +1,270 @@
+"""
+@description 问卷评分计划：提交评分所需的配置一次加载，评分过程纯内存计算
+"""
+
+import json
+from collections import namedtuple
+from flask import current_app
+from models import db, Dimension, Question, Option, AssessmentLevel
+from utils.grouping import generate_group_key
+from utils.level_index import LevelBand, LevelIndex
+from utils.questionnaire_cache import versioned_cache, version_settled, DEFINITION_CACHE_SIZE
+
+BASIC_DIMENSION_NAME = '用户基本信息(不参与得分评估)'
+
+PlanQuestion = namedtuple('PlanQuestion', ['id', 'type', 'text', 'dimension_id'])
+PlanOption = namedtuple('PlanOption', ['id', 'question_id', 'text', 'value', 'is_other'])
+PlanDimension = namedtuple('PlanDimension', ['id', 'name'])
+ScoredSubmission = namedtuple('ScoredSubmission', [
+    'answers',            # 待写入 Answer 的字段字典列表
+    'dimension_scores',   # 待写入 DimensionScore 的字段字典列表
+    'total_score',
+    'group_key',
+    'assessment_level',
+    'assessment_opinion'
+])
+
+_plans = versioned_cache(DEFINITION_CACHE_SIZE)
+
+
+class ScoringPlan:
+    """单个问卷的评分配置快照（只读）"""
+
+    def __init__(self, questionnaire_id, version, questions, options, dimensions, dimension_weights,
+                 basic_dimension_id, group_keys, levels):
+        self.questionnaire_id = questionnaire_id
+        self.version = version
+        # {question_id: PlanQuestion}
+        self.questions = questions
+        # {option_id: PlanOption}
+        self.options = options
+        # 问卷自身未删除的维度 [PlanDimension]，按 id 排序，用于结果页
+        self.dimensions = dimensions
+        # 参与得分的维度权重 {dimension_id: weight}，不含基本信息维度
+        self.dimension_weights = dimension_weights
+        self.basic_dimension_id = basic_dimension_id
+        # 科室题的分组键 {question_id: {option_id: group_key}}
+        self.group_keys = group_keys
+        # 评估等级区间索引 LevelIndex
+        self.levels = levels
+
+    def resolve_group_key(self, answers):
+        """根据基本信息维度中"科室"单选题的答案确定用户分组"""
+        for answer_data in answers:
+            keys = self.group_keys.get(answer_data.get('question_id'))
+            if keys is None:
+                continue
+            option_id_raw = answer_data.get('answer')
+            if not option_id_raw:
+                continue
+            try:
+                group_key = keys.get(int(option_id_raw))
+            except (ValueError, TypeError):
+                continue
+            if group_key:
+                return group_key
+        return None
+
+    def score(self, answers):
+        """计算一份答卷的答案、维度得分、总分与评估等级
+
+        Raises:
+            ValueError: 答案数据不合法
+        """
+        answer_rows = []
+        for answer_data in answers:
+            question_id = answer_data.get('question_id')
+            question = self.questions.get(question_id)
+            if not question:
+                continue
+
+            option_id = answer_data.get('answer')
+            try:
+                option_id = int(option_id)
+            except (TypeError, ValueError):
+                option_id = None
+            text = answer_data.get('text')
+
+            # 验证答案数据
+            if not question_id:
+                raise ValueError('题目ID不能为空')
+            if option_id is None and not text and not (isinstance(answer_data.get('answer'), list) and answer_data.get('answer')):
+                raise ValueError('答案不能为空')
+
+            # 计算分值
+            value = 0
+            selected_ids = []
+            if question.type == 'multiple':
+                # 多选题，answer字段为选项ID数组
+                answer_val = answer_data.get('answer')
+                if isinstance(answer_val, list):
+                    selected_ids = answer_val
+                elif isinstance(answer_val, str):
+                    selected_ids = [int(x) for x in answer_val.split(',') if x.strip()]
+                for opt_id in selected_ids:
+                    option = self.options.get(opt_id)
+                    if not option:
+                        raise ValueError(f'选项不存在: {opt_id}')
+                    value += option.value if option.value is not None else 0
+                option_id = None  # 多选题不设置单个option_id
+            elif option_id is not None:
+                option = self.options.get(option_id)
+                if not option:
+                    raise ValueError(f'选项不存在: {option_id}')
+                value = option.value if option.value is not None else 0
+
+            if question.type == 'address':
+                answer_rows.append({
+                    'question_id': question_id,
+                    'option_id': None,
+                    'value': None,
+                    'selected_option_ids': None,
+                    'text_answer': text
+                })
+                continue
+
+            # 判断是否需要保存 text_answer
+            save_text_answer = False
+            if text and isinstance(text, str):
+                if question.type == 'multiple':
+                    # 多选题，判断选中的选项里是否有 is_other
+                    save_text_answer = any(self.options[opt_id].is_other for opt_id in selected_ids)
+                elif question.type == 'single':
+                    option = self.options.get(option_id)
+                    save_text_answer = bool(option and option.is_other)
+                elif question.type == 'text':
+                    save_text_answer = True
+
+            answer_rows.append({
+                'question_id': question_id,
+                'option_id': option_id,
+                'value': value,
+                'selected_option_ids': json.dumps(selected_ids) if question.type == 'multiple' else None,
+                'text_answer': text if save_text_answer else None
+            })
+
+        # 维度原始分，排除"用户基本信息(不参与得分评估)"维度
+        raw_dim_scores = {}
+        for row in answer_rows:
+            dim_id = self.questions[row['question_id']].dimension_id
+            if dim_id in self.dimension_weights:
+                raw_dim_scores.setdefault(dim_id, 0)
+                raw_dim_scores[dim_id] += row['value'] if row['value'] is not None else 0
+
+        group_key = self.resolve_group_key(answers)
+
+        dimension_scores = []
+        for dim_id, raw_score in raw_dim_scores.items():
+            weight = self.dimension_weights[dim_id]
+            weighted_score = raw_score * weight
+            level = self.levels.lookup(weighted_score, dim_id, group_key)
+            dimension_scores.append({
+                'dimension_id': dim_id,
+                'score': weighted_score,
+                'weight': weight,
+                'assessment_level': level.name if level else None,
+                'assessment_opinion': level.opinion if level else None
+            })
+
+        # 总分为各维度加权分之和
+        total_score = sum(d['score'] for d in dimension_scores)
+        level = self.levels.lookup(total_score, None, group_key)
+        return ScoredSubmission(
+            answers=answer_rows,
+            dimension_scores=dimension_scores,
+            total_score=total_score,
+            group_key=group_key,
+            assessment_level=level.name if level else None,
+            assessment_opinion=level.opinion if level else None
+        )
+
+
+def build_scoring_plan(questionnaire, include_deleted=False):
+    """加载问卷的题目、选项、维度与评估等级，编译为评分计划
+
+    Args:
+        include_deleted: 同时加载已软删除的题目和选项，用于重新评分历史答卷
+    """
+    question_query = Question.query.filter_by(questionnaire_id=questionnaire.id)
+    if not include_deleted:
+        question_query = question_query.filter_by(is_deleted=False)
+    questions = {q.id: PlanQuestion(q.id, q.type, q.text, q.dimension_id) for q in question_query.all()}
+
+    options = {}
+    if questions:
+        option_query = Option.query.filter(Option.question_id.in_(list(questions)))
+        if not include_deleted:
+            option_query = option_query.filter(Option.is_deleted == False)
+        for opt in option_query.order_by(Option.id).all():
+            options[opt.id] = PlanOption(opt.id, opt.question_id, opt.text, opt.value, opt.is_other)
+
+    # 子问卷的题目挂在父问卷的维度上，按题目引用的维度加载；问卷自身的维度用于结果页
+    dimension_ids = {q.dimension_id for q in questions.values() if q.dimension_id}
+    dimension_weights = {}
+    dimensions = []
+    level_dimension_ids = set()
+    for dim in Dimension.query.filter(db.or_(
+        Dimension.id.in_(dimension_ids) if dimension_ids else db.false(),
+        db.and_(Dimension.questionnaire_id == questionnaire.id, Dimension.is_deleted == False)
+    )).order_by(Dimension.id).all():
+        level_dimension_ids.add(dim.id)
+        if dim.questionnaire_id == questionnaire.id and not dim.is_deleted:
+            dimensions.append(PlanDimension(dim.id, dim.name))
+        if dim.id in dimension_ids and dim.name != BASIC_DIMENSION_NAME:
+            dimension_weights[dim.id] = dim.weight
+
+    basic_dimension_id = db.session.query(Dimension.id).filter_by(
+        questionnaire_id=questionnaire.id,
+        name=BASIC_DIMENSION_NAME
+    ).scalar()
+
+    # "所在科室"等科室单选题决定用户分组，选项的分组键预先生成
+    group_keys = {}
+    if basic_dimension_id:
+        for q in questions.values():
+            if q.dimension_id == basic_dimension_id and q.type == 'single' and '科室' in q.text:
+                group_keys[q.id] = {
+                    opt.id: generate_group_key(q, opt)
+                    for opt in options.values() if opt.question_id == q.id
+                }
+
+    level_query = AssessmentLevel.query.filter(
+        AssessmentLevel.is_deleted == False,
+        db.or_(
+            db.and_(AssessmentLevel.questionnaire_id == questionnaire.id, AssessmentLevel.dimension_id.is_(None)),
+            AssessmentLevel.dimension_id.in_(level_dimension_ids) if level_dimension_ids else db.false()
+        )
+    )
+    levels = LevelIndex(
+        LevelBand(level.id, level.dimension_id, level.group_key, level.min_score, level.max_score,
+                  level.name, level.opinion)
+        for level in level_query.all()
+    )
+    for issue in levels.issues:
+        current_app.logger.warning(
+            f"[评估等级配置] 问卷 {questionnaire.id}: {issue.kind}, 维度: {issue.dimension_id}, "
+            f"分组: {issue.group_key}, 等级ID: {issue.band_ids}, 区间: {issue.low}~{issue.high}"
+        )
+
+    return ScoringPlan(
+        questionnaire_id=questionnaire.id,
+        version=questionnaire.updated_at,
+        questions=questions,
+        options=options,
+        dimensions=dimensions,
+        dimension_weights=dimension_weights,
+        basic_dimension_id=basic_dimension_id,
+        group_keys=group_keys,
+        levels=levels
+    )
+
+
+def get_scoring_plan(questionnaire):
+    """获取问卷的评分计划，配置未变更时复用缓存"""
+    plan = _plans.get(questionnaire.id)
+    if plan is not None and plan.version == questionnaire.updated_at:
+        return plan
+    plan = build_scoring_plan(questionnaire)
+    if version_settled(plan.version):
+        _plans.set(questionnaire.id, plan)
+    return plan
@@ -0,0 +1,143 @@
+"""
+@description SQL 语句计数：按请求统计语句数与 SQL 耗时，同一语句重复过多时标记为疑似 N+1
+
+慢请求或疑似 N+1 时记录日志；开启 SQL_PROFILE_HEADERS 时在响应头输出 X-SQL-Count / X-SQL-Time-Ms / X-SQL-Max-Repeat。
+测试和脚本可用 statement_budget 断言一段代码执行的语句数：
+
+    with statement_budget(6):
+        client.post('/fill/<access_code>/submit', json=payload)
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from sqlalchemy import event
+from flask import g, request
+
+_current = ContextVar('sql_stats', default=None)
+
+
+class SqlStats:
+    """一段代码内执行的 SQL 语句；嵌套时同时计入外层"""
+
+    __slots__ = ('count', 'seconds', 'shapes', 'parent')
+
+    def __init__(self, parent=None):
+        self.count = 0
+        self.seconds = 0.0
+        # 语句文本（参数为占位符）-> 执行次数
+        self.shapes = {}
+        self.parent = parent
+
+    def record(self, statement, seconds):
+        stats = self
+        while stats is not None:
+            stats.count += 1
+            stats.seconds += seconds
+            stats.shapes[statement] = stats.shapes.get(statement, 0) + 1
+            stats = stats.parent
+
+    @property
+    def max_repeat(self):
+        return max(self.shapes.values(), default=0)
+
+    def repeated(self, threshold):
+        """执行次数不少于 threshold 的语句，按次数倒序"""
+        return sorted(
+            ((statement, n) for statement, n in self.shapes.items() if n >= threshold),
+            key=lambda item: -item[1]
+        )
+
+
+class StatementBudgetExceeded(AssertionError):
+    pass
+
+
+@contextmanager
+def count_statements():
+    """统计 with 块内执行的 SQL 语句"""
+    stats = SqlStats(_current.get())
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def statement_budget(max_statements):
+    """with 块内执行的语句数超过 max_statements 时抛出 StatementBudgetExceeded"""
+    with count_statements() as stats:
+        yield stats
+    if stats.count > max_statements:
+        detail = '\n'.join(f'  {n}x {statement[:200]}' for statement, n in stats.repeated(1)[:10])
+        raise StatementBudgetExceeded(f'执行了 {stats.count} 条 SQL，预算为 {max_statements}:\n{detail}')
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault('sql_profiler_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is None:
+        return
+    starts = conn.info.get('sql_profiler_start')
+    if starts:
+        stats.record(statement, time.perf_counter() - starts.pop())
+
+
+def init_sql_profiler(app, engine):
+    """为引擎注册语句计数事件，并按请求输出统计
+
+    配置项：
+        SQL_PROFILE_ENABLED: 是否按请求统计
+        SQL_PROFILE_HEADERS: 是否在响应头中输出统计，默认关闭
+        SLOW_REQUEST_MS: 请求耗时超过该值（毫秒）时记录日志
+        N_PLUS_ONE_THRESHOLD: 同一语句在一个请求内执行不少于该次数时记录日志
+    """
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+    if not app.config.get('SQL_PROFILE_ENABLED', True):
+        return
+
+    with_headers = app.config.get('SQL_PROFILE_HEADERS', False)
+    slow_ms = app.config.get('SLOW_REQUEST_MS', 500)
+    repeat_threshold = app.config.get('N_PLUS_ONE_THRESHOLD', 10)
+
+    @app.before_request
+    def _start_sql_profile():
+        # 外层有 statement_budget 时请求内的语句同时计入外层
+        stats = SqlStats(_current.get())
+        _current.set(stats)
+        g.sql_profile = (stats, time.perf_counter())
+
+    @app.after_request
+    def _report_sql_profile(response):
+        profile = g.get('sql_profile')
+        if profile is None:
+            return response
+        stats, start = profile
+        if with_headers:
+            response.headers['X-SQL-Count'] = str(stats.count)
+            response.headers['X-SQL-Time-Ms'] = f'{stats.seconds * 1000:.1f}'
+            response.headers['X-SQL-Max-Repeat'] = str(stats.max_repeat)
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        repeated = stats.repeated(repeat_threshold)
+        if elapsed_ms >= slow_ms or repeated:
+            lines = [
+                f"{'慢请求' if elapsed_ms >= slow_ms else '疑似 N+1'}: {request.method} {request.path} "
+                f"{elapsed_ms:.0f}ms, SQL {stats.count} 条 / {stats.seconds * 1000:.0f}ms"
+            ]
+            lines.extend(f'  重复 {n} 次: {statement[:300]}' for statement, n in repeated[:5])
+            app.logger.warning('\n'.join(lines))
+        return response
+
+    @app.teardown_request
+    def _stop_sql_profile(exc):
+        profile = g.pop('sql_profile', None)
+        if profile is not None:
+            _current.set(profile[0].parent)
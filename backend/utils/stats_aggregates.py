@@ -0,0 +1,158 @@
+"""
+@description 问卷统计汇总的增量维护与重建
+"""
+
+from sqlalchemy import func, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects import mysql, sqlite, postgresql
+from models import db, Submission, Answer, Question, Dimension, QuestionnaireStat, DimensionStat, LevelStat, GroupStat
+from utils.scoring_plan import BASIC_DIMENSION_NAME
+
+
+def _upsert_add(model, key_columns, rows, value_columns):
+    """插入汇总行，主键已存在时把 value_columns 累加到原值上"""
+    if not rows:
+        return
+    table = model.__table__
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'mysql':
+        stmt = mysql.insert(table).values(rows)
+        stmt = stmt.on_duplicate_key_update({c: table.c[c] + stmt.inserted[c] for c in value_columns})
+    elif dialect in ('sqlite', 'postgresql'):
+        dialect_insert = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+        stmt = dialect_insert(table).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=key_columns,
+            set_={c: table.c[c] + stmt.excluded[c] for c in value_columns}
+        )
+    else:
+        for row in rows:
+            updated = db.session.execute(
+                table.update()
+                .where(*[table.c[c] == row[c] for c in key_columns])
+                .values({c: table.c[c] + row[c] for c in value_columns})
+            ).rowcount
+            if not updated:
+                db.session.execute(insert(table).values(row))
+        return
+    db.session.execute(stmt)
+
+
+def _apply(questionnaire_id, submission_count, dimension_totals, level_counts, group_counts):
+    """把答卷的贡献累加到已初始化的汇总中，扣除时各数值传负数
+
+    Args:
+        submission_count: 答卷数变化
+        dimension_totals: {dimension_id: (分值和, 答案数)}
+        level_counts / group_counts: {评估等级 / 分组: 答卷数}
+    """
+    initialized = QuestionnaireStat.query.filter_by(questionnaire_id=questionnaire_id).update(
+        {QuestionnaireStat.submission_count: QuestionnaireStat.submission_count + submission_count},
+        synchronize_session=False
+    )
+    if not initialized:
+        # 尚未初始化，首次读取统计时会整体重建
+        return
+    _upsert_add(DimensionStat, ['questionnaire_id', 'dimension_id'], [
+        {
+            'questionnaire_id': questionnaire_id,
+            'dimension_id': dim_id,
+            'score_sum': score_sum,
+            'answer_count': count
+        } for dim_id, (score_sum, count) in dimension_totals.items()
+    ], ['score_sum', 'answer_count'])
+    _upsert_add(LevelStat, ['questionnaire_id', 'assessment_level'], [
+        {'questionnaire_id': questionnaire_id, 'assessment_level': level, 'submission_count': count}
+        for level, count in level_counts.items()
+    ], ['submission_count'])
+    _upsert_add(GroupStat, ['questionnaire_id', 'group_key'], [
+        {'questionnaire_id': questionnaire_id, 'group_key': group_key, 'submission_count': count}
+        for group_key, count in group_counts.items()
+    ], ['submission_count'])
+
+
+def record_submissions(plan, scored_list):
+    """在提交事务中累加同一问卷新答卷的统计，多份答卷合并成一组 upsert"""
+    dimension_totals, level_counts, group_counts = {}, {}, {}
+    for scored in scored_list:
+        for row in scored.answers:
+            dim_id = plan.questions[row['question_id']].dimension_id
+            if dim_id in plan.dimension_weights and row['value'] is not None:
+                score_sum, count = dimension_totals.get(dim_id, (0, 0))
+                dimension_totals[dim_id] = (score_sum + row['value'], count + 1)
+        if scored.assessment_level is not None:
+            level_counts[scored.assessment_level] = level_counts.get(scored.assessment_level, 0) + 1
+        if scored.group_key is not None:
+            group_counts[scored.group_key] = group_counts.get(scored.group_key, 0) + 1
+    _apply(plan.questionnaire_id, len(scored_list), dimension_totals, level_counts, group_counts)
+
+
+def _dimension_totals_query():
+    """按维度汇总答案分值，排除"用户基本信息(不参与得分评估)"维度"""
+    return db.session.query(
+        Question.dimension_id,
+        func.sum(Answer.value),
+        func.count(Answer.value)
+    ).join(
+        Question, Answer.question_id == Question.id
+    ).join(
+        Dimension, Question.dimension_id == Dimension.id
+    ).filter(
+        Answer.value.isnot(None),
+        Dimension.name != BASIC_DIMENSION_NAME
+    ).group_by(Question.dimension_id)
+
+
+def retract_submission(submission):
+    """在软删除事务中扣除答卷的统计"""
+    dimension_totals = {
+        dim_id: (-score_sum, -count)
+        for dim_id, score_sum, count in _dimension_totals_query().filter(Answer.submission_id == submission.id).all()
+    }
+    level_counts = {submission.assessment_level: -1} if submission.assessment_level is not None else {}
+    group_counts = {submission.group_key: -1} if submission.group_key is not None else {}
+    _apply(submission.questionnaire_id, -1, dimension_totals, level_counts, group_counts)
+
+
+def rebuild_questionnaire_stats(questionnaire_id):
+    """根据未删除的答卷重新计算问卷的全部统计，由调用方提交"""
+    for model in (QuestionnaireStat, DimensionStat, LevelStat, GroupStat):
+        model.query.filter_by(questionnaire_id=questionnaire_id).delete(synchronize_session=False)
+
+    live = db.and_(Submission.questionnaire_id == questionnaire_id, Submission.is_deleted == False)
+    submission_count = db.session.query(func.count(Submission.id)).filter(live).scalar() or 0
+    db.session.add(QuestionnaireStat(questionnaire_id=questionnaire_id, submission_count=submission_count))
+
+    dimension_rows = _dimension_totals_query().join(
+        Submission, Answer.submission_id == Submission.id
+    ).filter(live).all()
+    db.session.add_all([
+        DimensionStat(questionnaire_id=questionnaire_id, dimension_id=dim_id, score_sum=score_sum or 0, answer_count=count)
+        for dim_id, score_sum, count in dimension_rows
+    ])
+
+    for model, column in ((LevelStat, Submission.assessment_level), (GroupStat, Submission.group_key)):
+        rows = db.session.query(column, func.count(Submission.id)).filter(live, column.isnot(None)).group_by(column).all()
+        db.session.add_all([
+            model(questionnaire_id=questionnaire_id, submission_count=count, **{column.key: value})
+            for value, count in rows
+        ])
+    db.session.flush()
+
+
+def ensure_questionnaire_stats(questionnaire_id):
+    """统计尚未初始化时整体重建一次
+
+    Returns:
+        QuestionnaireStat
+    """
+    stat = QuestionnaireStat.query.get(questionnaire_id)
+    if stat is None:
+        try:
+            rebuild_questionnaire_stats(questionnaire_id)
+            db.session.commit()
+        except IntegrityError:
+            # 并发请求已完成重建
+            db.session.rollback()
+        stat = QuestionnaireStat.query.get(questionnaire_id)
+    return stat
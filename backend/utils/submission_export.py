@@ -0,0 +1,187 @@
+"""
+@description 答卷明细导出：按答卷 id 分批读取，逐行产出，每份答卷一行、每道题一列
+"""
+
+import csv
+import io
+import json
+from models import db, Submission, Answer, DimensionScore, Question, Option, Dimension
+from utils.result_snapshot import parse_selected_ids
+from utils.answer_areas import extract_area, AREA_PATH_SEPARATOR
+from utils.scoring_plan import BASIC_DIMENSION_NAME, PlanQuestion, PlanOption, PlanDimension
+
+EXPORT_CHUNK_SIZE = 500
+# CSV 每积累多少行输出一次
+CSV_FLUSH_ROWS = 200
+# 以这些字符开头的文本会被 Excel 等表格软件当作公式执行
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+class SubmissionExport:
+    """一次导出的列定义，构建时加载题目、选项和维度，之后按批读取答卷
+
+    列定义保存为普通元组，不受分批结束事务时 ORM 对象过期的影响。
+    """
+
+    def __init__(self, questionnaire, start_id=None, end_id=None, chunk_size=EXPORT_CHUNK_SIZE):
+        self.questionnaire_id = questionnaire.id
+        self.start_id = start_id
+        self.end_id = end_id
+        self.chunk_size = chunk_size
+        self.questions = [
+            PlanQuestion(q.id, q.type, q.text, q.dimension_id)
+            for q in Question.query.filter_by(
+                questionnaire_id=questionnaire.id,
+                is_deleted=False
+            ).order_by(Question.order, Question.id).all()
+        ]
+        # 含已删除的选项，历史答卷可能选过
+        self.options = {}
+        if self.questions:
+            self.options = {
+                opt.id: PlanOption(opt.id, opt.question_id, opt.text, opt.value, opt.is_other)
+                for opt in Option.query.filter(
+                    Option.question_id.in_([q.id for q in self.questions])
+                ).all()
+            }
+        dimension_ids = {q.dimension_id for q in self.questions if q.dimension_id}
+        self.dimensions = [
+            PlanDimension(dim.id, dim.name)
+            for dim in Dimension.query.filter(
+                Dimension.id.in_(dimension_ids) if dimension_ids else db.false(),
+                Dimension.name != BASIC_DIMENSION_NAME
+            ).order_by(Dimension.id).all()
+        ]
+
+    def header(self):
+        return (
+            ['答卷ID', '提交时间', '总分', '评估等级', '用户分组']
+            + [f'{dim.name}得分' for dim in self.dimensions]
+            + [f'{dim.name}等级' for dim in self.dimensions]
+            + [q.text for q in self.questions]
+        )
+
+    def _option_text(self, option_id, fillin_text):
+        option = self.options.get(option_id)
+        if option is None:
+            return str(option_id)
+        if option.is_other and fillin_text:
+            return f"{option.text}（{fillin_text}）"
+        return option.text
+
+    def _answer_cell(self, question, answer):
+        if question.type == 'address':
+            area = extract_area(answer.text_answer)
+            if area is None:
+                return answer.text_answer
+            try:
+                detail = json.loads(answer.text_answer).get('detail')
+            except (ValueError, AttributeError):
+                detail = None
+            path = AREA_PATH_SEPARATOR.join(area)
+            return f"{path} {detail}" if detail else path
+        if question.type == 'multiple' and answer.selected_option_ids:
+            try:
+                selected_ids = parse_selected_ids(answer.selected_option_ids)
+            except Exception:
+                return answer.selected_option_ids
+            return ', '.join(self._option_text(opt_id, answer.text_answer) for opt_id in selected_ids)
+        if answer.option_id is not None:
+            return self._option_text(answer.option_id, answer.text_answer)
+        return answer.text_answer
+
+    def _chunks(self):
+        """按 id 升序分批读取答卷及其答案和维度得分，每批结束即释放连接"""
+        after_id = self.start_id - 1 if self.start_id else 0
+        while True:
+            query = db.session.query(
+                Submission.id,
+                Submission.submitted_at,
+                Submission.total_score,
+                Submission.assessment_level,
+                Submission.group_key
+            ).filter(
+                Submission.questionnaire_id == self.questionnaire_id,
+                Submission.is_deleted == False,
+                Submission.id > after_id
+            )
+            if self.end_id is not None:
+                query = query.filter(Submission.id <= self.end_id)
+            submissions = query.order_by(Submission.id).limit(self.chunk_size).all()
+            if not submissions:
+                return
+            ids = [s.id for s in submissions]
+
+            answers = {}
+            for ans in db.session.query(
+                Answer.submission_id,
+                Answer.question_id,
+                Answer.option_id,
+                Answer.selected_option_ids,
+                Answer.text_answer
+            ).filter(Answer.submission_id.in_(ids)).order_by(Answer.id):
+                answers.setdefault(ans.submission_id, {}).setdefault(ans.question_id, ans)
+
+            scores = {}
+            for ds in db.session.query(
+                DimensionScore.submission_id,
+                DimensionScore.dimension_id,
+                DimensionScore.score,
+                DimensionScore.assessment_level
+            ).filter(DimensionScore.submission_id.in_(ids)).order_by(DimensionScore.id):
+                scores.setdefault(ds.submission_id, {}).setdefault(ds.dimension_id, ds)
+
+            # 结束只读事务，避免长时间导出占用连接
+            db.session.rollback()
+            yield submissions, answers, scores
+            after_id = ids[-1]
+
+    def rows(self):
+        """产出表头和每份答卷一行"""
+        yield self.header()
+        for submissions, answers, scores in self._chunks():
+            for sub in submissions:
+                sub_answers = answers.get(sub.id, {})
+                sub_scores = scores.get(sub.id, {})
+                dim_scores = [sub_scores.get(dim.id) for dim in self.dimensions]
+                yield (
+                    [
+                        sub.id,
+                        sub.submitted_at.strftime('%Y-%m-%d %H:%M:%S') if sub.submitted_at else '',
+                        sub.total_score,
+                        sub.assessment_level,
+                        sub.group_key
+                    ]
+                    + [ds.score if ds else None for ds in dim_scores]
+                    + [ds.assessment_level if ds else None for ds in dim_scores]
+                    + [
+                        self._answer_cell(q, sub_answers[q.id]) if q.id in sub_answers else None
+                        for q in self.questions
+                    ]
+                )
+
+
+def csv_cell(value):
+    """CSV 单元格的值：文本以公式字符开头时加前导单引号，按普通文本显示"""
+    if value is None:
+        return ''
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def stream_csv(rows):
+    """把行迭代器写成 UTF-8（带 BOM，Excel 可直接打开）的 CSV，逐块产出
+
+    题目、选项和填写内容来自用户输入，写出前经 csv_cell 处理，防止打开文件时执行公式。
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')
+    for index, row in enumerate(rows, 1):
+        writer.writerow([csv_cell(v) for v in row])
+        if index % CSV_FLUSH_ROWS == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
@@ -0,0 +1,291 @@
+"""
+@description 答卷异步写入队列：提交接口只校验并把答案追加到本地 SQLite 日志，后台 drain 进程分批评分写库
+
+日志与业务库分离，使用 WAL 模式，每次入队都落盘后才返回令牌。条目状态依次为
+pending → processing → done / failed，客户端凭令牌轮询结果。drain 进程可以开多个，
+领取条目时用 BEGIN IMMEDIATE 加写锁，同一条目只会被一个进程领取。
+
+每个条目都带 client_key（客户端未提供时用令牌代替），写库时按答卷的 client_key 去重：
+同一幂等键重复入队返回同一令牌，放回队列的条目再次处理也不会重复写入。
+
+只有校验失败和数据冲突标记为 failed；数据库暂时不可用等错误把条目放回 pending，
+按尝试次数指数退避后再领取，答卷不会因此丢失。
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import namedtuple
+from datetime import datetime
+from flask import current_app
+from models import db, Questionnaire
+from utils.metrics import count_submission
+from utils.scoring_plan import get_scoring_plan
+from utils.submission_writer import save_keyed_submissions
+
+SUBMIT_QUEUE_BATCH_SIZE = 200
+# 放回队列后再次领取的最长等待秒数
+RETRY_BACKOFF_MAX = 300
+
+QueueEntry = namedtuple('QueueEntry', ['token', 'questionnaire_id', 'client_key', 'answers', 'submitted_at'])
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS submission_queue (
+    token TEXT PRIMARY KEY,
+    questionnaire_id INTEGER NOT NULL,
+    client_key TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    submitted_at TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    result TEXT,
+    enqueued_at REAL NOT NULL,
+    claimed_at REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at REAL
+);
+CREATE INDEX IF NOT EXISTS ix_submission_queue_status ON submission_queue (status, enqueued_at);
+CREATE UNIQUE INDEX IF NOT EXISTS ux_submission_queue_client_key ON submission_queue (questionnaire_id, client_key);
+"""
+
+
+def queue_enabled():
+    return current_app.config.get('SUBMIT_QUEUE_ENABLED', False)
+
+
+# 本进程已建好表的日志路径
+_prepared_paths = set()
+_prepare_lock = threading.Lock()
+
+
+def _prepare(path):
+    """建表、补齐早期日志缺少的列并切换到 WAL 模式（WAL 记录在文件中），每个进程每个路径只执行一次"""
+    with _prepare_lock:
+        if path in _prepared_paths:
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(_SCHEMA)
+            # 早期创建的日志没有重试相关的列；加写锁，避免多个进程同时补列
+            conn.execute('BEGIN IMMEDIATE')
+            columns = {row[1] for row in conn.execute('PRAGMA table_info(submission_queue)')}
+            for name, ddl in (('attempts', 'INTEGER NOT NULL DEFAULT 0'), ('available_at', 'REAL')):
+                if name not in columns:
+                    conn.execute(f'ALTER TABLE submission_queue ADD COLUMN {name} {ddl}')
+            conn.execute('COMMIT')
+        finally:
+            conn.close()
+        _prepared_paths.add(path)
+
+
+def _connect():
+    path = current_app.config['SUBMIT_QUEUE_PATH']
+    _prepare(path)
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    conn.execute('PRAGMA synchronous=FULL')
+    return conn
+
+
+def enqueue(questionnaire_id, answers, client_key=None):
+    """追加一份待写入的答卷，返回轮询用的令牌
+
+    幂等键已有 pending/processing/done 条目时返回原令牌；原条目已 failed 时删除后重新入队，
+    否则同一页面修改答案后再次提交只能拿到旧的失败结果。
+    """
+    token = uuid.uuid4().hex
+    client_key = client_key or token
+    conn = _connect()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        existing = conn.execute(
+            'SELECT token, status FROM submission_queue WHERE questionnaire_id = ? AND client_key = ?',
+            (questionnaire_id, client_key)
+        ).fetchone()
+        if existing and existing[1] != 'failed':
+            conn.execute('COMMIT')
+            return existing[0]
+        if existing:
+            conn.execute('DELETE FROM submission_queue WHERE token = ?', (existing[0],))
+        conn.execute(
+            'INSERT INTO submission_queue '
+            '(token, questionnaire_id, client_key, payload, submitted_at, enqueued_at) VALUES (?, ?, ?, ?, ?, ?)',
+            (token, questionnaire_id, client_key, json.dumps(answers, ensure_ascii=False),
+             datetime.now().isoformat(), time.time())
+        )
+        conn.execute('COMMIT')
+        return token
+    finally:
+        conn.close()
+
+
+def get_status(token):
+    """令牌对应条目的状态，不存在时返回 None
+
+    Returns:
+        dict: status 以及 done/failed 时的结果字段
+    """
+    conn = _connect()
+    try:
+        row = conn.execute('SELECT status, result FROM submission_queue WHERE token = ?', (token,)).fetchone()
+    finally:
+        conn.close()
+    if row is None:
+        return None
+    status, result = row
+    return {'status': status, **(json.loads(result) if result else {})}
+
+
+def claim(limit):
+    """领取最早的 limit 个待处理条目并标记为 processing"""
+    conn = _connect()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        rows = conn.execute(
+            "SELECT token, questionnaire_id, client_key, payload, submitted_at FROM submission_queue "
+            "WHERE status = 'pending' AND (available_at IS NULL OR available_at <= ?) "
+            "ORDER BY enqueued_at LIMIT ?", (time.time(), limit)
+        ).fetchall()
+        conn.executemany(
+            "UPDATE submission_queue SET status = 'processing', claimed_at = ? WHERE token = ?",
+            [(time.time(), row[0]) for row in rows]
+        )
+        conn.execute('COMMIT')
+    finally:
+        conn.close()
+    return [
+        QueueEntry(token, questionnaire_id, client_key, json.loads(payload), datetime.fromisoformat(submitted_at))
+        for token, questionnaire_id, client_key, payload, submitted_at in rows
+    ]
+
+
+def finish(results):
+    """记录处理结果，状态为 retry 的条目放回队列
+
+    Args:
+        results: {token: (status, result 字典)}，status 为 done/failed/retry
+    """
+    retry = {token: result for token, (status, result) in results.items() if status == 'retry'}
+    final = [
+        (status, json.dumps(result, ensure_ascii=False), token)
+        for token, (status, result) in results.items() if status != 'retry'
+    ]
+    if final:
+        conn = _connect()
+        try:
+            conn.executemany('UPDATE submission_queue SET status = ?, result = ? WHERE token = ?', final)
+        finally:
+            conn.close()
+    if retry:
+        release(retry)
+
+
+def release(results):
+    """把领取的条目放回 pending，尝试次数加一，按 2^次数 秒退避（最多 RETRY_BACKOFF_MAX 秒）
+
+    Args:
+        results: {token: result 字典}，result 记录最近一次失败原因，轮询时可见
+    """
+    conn = _connect()
+    try:
+        conn.executemany(
+            "UPDATE submission_queue SET status = 'pending', claimed_at = NULL, result = ?, "
+            "attempts = attempts + 1, available_at = ? + min(?, 1 << min(attempts, 16)) WHERE token = ?",
+            [(json.dumps(result, ensure_ascii=False), time.time(), RETRY_BACKOFF_MAX, token)
+             for token, result in results.items()]
+        )
+    finally:
+        conn.close()
+
+
+def requeue_stale(timeout):
+    """把领取超过 timeout 秒仍未完成的条目放回队列（drain 进程中途退出）
+
+    写库已提交但结果未回写的条目再次处理时按 client_key 识别为重复，返回原答卷。
+    """
+    conn = _connect()
+    try:
+        return conn.execute(
+            "UPDATE submission_queue SET status = 'pending', claimed_at = NULL "
+            "WHERE status = 'processing' AND claimed_at < ?", (time.time() - timeout,)
+        ).rowcount
+    finally:
+        conn.close()
+
+
+def purge(retention):
+    """删除完成超过 retention 秒的条目，此后轮询这些令牌会返回不存在"""
+    conn = _connect()
+    try:
+        return conn.execute(
+            "DELETE FROM submission_queue WHERE status IN ('done', 'failed') AND enqueued_at < ?",
+            (time.time() - retention,)
+        ).rowcount
+    finally:
+        conn.close()
+
+
+def process_batch(entries):
+    """评分并写入已领取的条目，每个问卷一个事务
+
+    Returns:
+        dict: {token: (status, result 字典)}
+    """
+    results = {}
+    by_questionnaire = {}
+    for entry in entries:
+        by_questionnaire.setdefault(entry.questionnaire_id, []).append(entry)
+
+    for questionnaire_id, group in by_questionnaire.items():
+        questionnaire = Questionnaire.query.get(questionnaire_id)
+        if questionnaire is None:
+            for entry in group:
+                results[entry.token] = ('failed', {'msg': '问卷不存在或已下架'})
+            continue
+        plan = get_scoring_plan(questionnaire)
+        keyed_entries = {}  # client_key -> (client_key, 评分结果, 提交时间)
+        tokens = {}
+        for entry in group:
+            try:
+                keyed_entries[entry.client_key] = (entry.client_key, plan.score(entry.answers), entry.submitted_at)
+                tokens[entry.client_key] = entry.token
+            except ValueError as e:
+                results[entry.token] = ('failed', {'msg': str(e)})
+                count_submission('invalid')
+        written = save_keyed_submissions(questionnaire, plan, list(keyed_entries.values()))
+        for client_key, (status, result) in written.items():
+            if status == 'error':
+                current_app.logger.error(f"队列答卷写入失败: {result['msg']}")
+                results[tokens[client_key]] = ('failed', result)
+                count_submission('error')
+            elif status == 'retry':
+                results[tokens[client_key]] = ('retry', result)
+            elif status == 'created':
+                results[tokens[client_key]] = ('done', result)
+                count_submission('success', answers=len(keyed_entries[client_key][1].answers))
+            else:
+                results[tokens[client_key]] = ('done', result)
+                count_submission('duplicate')
+    return results
+
+
+def drain(batch_size=SUBMIT_QUEUE_BATCH_SIZE):
+    """处理一批待写入条目，返回处理的条目数，队列为空时返回 0"""
+    entries = claim(batch_size)
+    if not entries:
+        return 0
+    try:
+        results = process_batch(entries)
+    except Exception as e:
+        # 查询问卷、评分计划或去重时出错，整批放回队列，避免条目停留在 processing
+        db.session.rollback()
+        current_app.logger.error(f"处理提交队列失败，{len(entries)} 条已放回队列: {str(e)}")
+        release({entry.token: {'msg': '暂时无法写入，稍后自动重试'} for entry in entries})
+        return len(entries)
+    # 全部无效或重复的问卷组不会提交，结束其只读事务，下一批才能读到最新的问卷版本和答卷
+    db.session.rollback()
+    finish(results)
+    return len(entries)
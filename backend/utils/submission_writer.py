@@ -0,0 +1,128 @@
+"""
+@description 答卷写入：把评分结果连同答案、区域/选项索引、维度分数、结果快照和统计汇总写入当前事务
+
+同步提交、队列批量写入与离线批量上传共用。save_submissions 由调用方提交事务；
+save_keyed_submissions 按客户端标识去重并自行提交。
+"""
+
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from models import db, Submission, Answer, AnswerArea, AnswerOption, DimensionScore, SubmissionResult
+from utils.answer_areas import collect_area_rows
+from utils.answer_options import collect_option_rows
+from utils.result_snapshot import build_result_body, pack_result
+from utils.stats_aggregates import record_submissions
+
+
+def save_submissions(questionnaire, plan, entries):
+    """写入同一问卷的多份答卷，答案等子表按表各用一条多行插入
+
+    Args:
+        questionnaire: 问卷
+        plan: 问卷的评分计划
+        entries: (评分结果, 提交时间, 客户端标识或 None) 列表
+
+    Returns:
+        list[Submission]: 与 entries 顺序一致的答卷
+    """
+    submissions = [
+        Submission(
+            questionnaire_id=questionnaire.id,
+            submitted_at=submitted_at,
+            total_score=scored.total_score,
+            assessment_level=scored.assessment_level,
+            assessment_opinion=scored.assessment_opinion,
+            group_key=scored.group_key,
+            client_key=client_key
+        ) for scored, submitted_at, client_key in entries
+    ]
+    db.session.add_all(submissions)
+    db.session.flush()
+
+    answer_rows, area_rows, option_rows, dimension_rows, result_rows = [], [], [], [], []
+    for submission, (scored, _, _) in zip(submissions, entries):
+        answer_rows.extend({'submission_id': submission.id, **row} for row in scored.answers)
+        area_rows.extend(collect_area_rows(plan, submission.id, scored.answers))
+        option_rows.extend(collect_option_rows(plan, submission.id, scored.answers))
+        dimension_rows.extend({'submission_id': submission.id, **row} for row in scored.dimension_scores)
+        # 结果页在提交时一次生成，之后直接读取快照
+        result_body = build_result_body(questionnaire, submission, scored.answers, scored.dimension_scores, plan)
+        result_rows.append({'submission_id': submission.id, 'payload': pack_result(result_body)})
+    record_submissions(plan, [scored for scored, _, _ in entries])
+
+    # render_nulls 让值为 None 的字段也写成 NULL，各行字段一致才能合并成一条语句，
+    # 否则 SQLAlchemy 按非空字段组合拆成多条，语句数随答案内容变化
+    for model, rows in ((Answer, answer_rows), (AnswerArea, area_rows), (AnswerOption, option_rows),
+                        (DimensionScore, dimension_rows), (SubmissionResult, result_rows)):
+        if rows:
+            db.session.bulk_insert_mappings(model, rows, render_nulls=True)
+    return submissions
+
+
+def submission_summary(submission):
+    """提交接口返回的答卷摘要"""
+    return {
+        'submission_id': submission.id,
+        'total_score': submission.total_score,
+        'assessment_level': submission.assessment_level
+    }
+
+
+def find_by_client_keys(questionnaire_id, client_keys):
+    """已存在的客户端标识 -> 答卷摘要，走 (questionnaire_id, client_key) 唯一索引"""
+    if not client_keys:
+        return {}
+    rows = db.session.query(
+        Submission.client_key, Submission.id, Submission.total_score, Submission.assessment_level
+    ).filter(
+        Submission.questionnaire_id == questionnaire_id,
+        Submission.client_key.in_(list(client_keys))
+    ).all()
+    return {
+        row.client_key: {'submission_id': row.id, 'total_score': row.total_score, 'assessment_level': row.assessment_level}
+        for row in rows
+    }
+
+
+def save_keyed_submissions(questionnaire, plan, entries):
+    """按客户端标识去重后写入并提交，已存在的标识返回原答卷
+
+    整批写入失败（如并发上传了相同标识）时逐份重试。单份仍失败时，找不到同标识答卷的唯一约束冲突
+    属于数据本身的问题，状态为 error；死锁、断连、锁等待超时等其余异常可能是暂时的，状态为 retry，
+    由调用方稍后用同一标识重试。
+
+    Args:
+        entries: (客户端标识, 评分结果, 提交时间) 列表，标识互不相同
+
+    Returns:
+        dict: {客户端标识: (状态, 结果字典)}，状态为 created/duplicate/error/retry
+    """
+    results = {
+        key: ('duplicate', summary)
+        for key, summary in find_by_client_keys(questionnaire.id, [key for key, _, _ in entries]).items()
+    }
+    pending = [entry for entry in entries if entry[0] not in results]
+    if not pending:
+        return results
+    try:
+        submissions = save_submissions(questionnaire, plan, [(scored, at, key) for key, scored, at in pending])
+        # 提交后对象会过期，先取出结果字段
+        created = [submission_summary(submission) for submission in submissions]
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        if len(pending) > 1:
+            for entry in pending:
+                results.update(save_keyed_submissions(questionnaire, plan, [entry]))
+            return results
+        key = pending[0][0]
+        if not isinstance(e, IntegrityError):
+            current_app.logger.warning(f"答卷写入暂时失败，稍后重试: {str(e)}")
+            results[key] = ('retry', {'msg': '暂时无法写入，请稍后重试'})
+            return results
+        existing = find_by_client_keys(questionnaire.id, [key])
+        results[key] = ('duplicate', existing[key]) if key in existing else ('error', {'msg': f'提交失败: {str(e)}'})
+        return results
+    for (key, _, _), summary in zip(pending, created):
+        results[key] = ('created', summary)
+    return results
@@ -0,0 +1,256 @@
+"""
+@description 合成数据生成：按种子确定性地建问卷结构并批量写入大规模答卷，用于本地复现统计与列表的性能问题
+
+答卷按块生成，每块使用独立的随机数序列和预先分配的答卷 id 区间，
+因此各块可以在多个进程中并行写入，且结果与进程数、执行顺序无关。
+"""
+
+import json
+import random
+import uuid
+from collections import namedtuple
+from datetime import datetime, timedelta
+from models import (db, Questionnaire, Dimension, Question, Option, BranchRule, AssessmentLevel,
+                    Submission, Answer, AnswerArea, AnswerOption, DimensionScore)
+from utils.answer_areas import collect_area_rows
+from utils.answer_options import collect_option_rows
+from utils.grouping import generate_group_key
+from utils.scoring_plan import BASIC_DIMENSION_NAME, build_scoring_plan
+from utils.stats_aggregates import rebuild_questionnaire_stats
+
+GENERATE_CHUNK_SIZE = 5000
+
+DEPARTMENTS = ['内科', '外科', '儿科', '妇产科', '急诊科', '眼科', '口腔科', '皮肤科', '神经科', '康复科',
+               '肿瘤科', '麻醉科', '检验科', '影像科', '药剂科', '护理部']
+TITLES = ['住院医师', '主治医师', '副主任医师', '主任医师']
+PROVINCES = ['44', '32', '37', '33', '41', '51', '42', '43', '11', '31', '13', '34', '35', '61', '50', '12']
+
+# 生成参数，由命令行传入，各工作进程共享
+GenerateSpec = namedtuple('GenerateSpec', [
+    'seed', 'submissions', 'questions', 'options', 'dimensions', 'levels', 'departments',
+    'branches', 'child_questions', 'deleted_ratio', 'days', 'chunk_size'
+])
+# 单个生成块：答卷序号 [start, start + count)，答卷 id 从 first_id 开始，每份父答卷占两个 id（第二个留给分支子答卷）
+GenerateChunk = namedtuple('GenerateChunk', ['index', 'start', 'count', 'first_id'])
+
+
+def _weights(rnd, count, skew=None):
+    """长尾分布的权重：按随机顺序排列的 1/rank^skew"""
+    skew = rnd.uniform(0.6, 1.6) if skew is None else skew
+    weights = [1 / (rank + 1) ** skew for rank in range(count)]
+    rnd.shuffle(weights)
+    return weights
+
+
+def build_structure(spec):
+    """创建父问卷、分支子问卷、维度、题目、分支规则与各分组的评估等级，由调用方提交
+
+    Returns:
+        Questionnaire: 父问卷
+    """
+    rnd = random.Random(f'{spec.seed}:structure')
+    now = datetime.now()
+
+    def questionnaire(title, parent_id=None):
+        q = Questionnaire(
+            title=title, description='合成数据', status='published', created_at=now,
+            is_published=True, published_at=now, access_code=str(uuid.uuid4())[:8], parent_id=parent_id
+        )
+        db.session.add(q)
+        db.session.flush()
+        return q
+
+    def question(qid, dimension_id, text, qtype, order, options=()):
+        q = Question(questionnaire_id=qid, dimension_id=dimension_id, text=text, type=qtype, order=order)
+        db.session.add(q)
+        db.session.flush()
+        created = [Option(question_id=q.id, text=text, value=value, is_other=is_other)
+                   for text, value, is_other in options]
+        db.session.add_all(created)
+        db.session.flush()
+        return q, created
+
+    def scored_questions(qid, dimension_ids, count):
+        for i in range(count):
+            qtype = 'multiple' if rnd.random() < 0.3 else 'single'
+            options = [(f'选项{j + 1}', j + 1, False) for j in range(spec.options - 1)]
+            options.append(('其他', spec.options, True))
+            question(qid, dimension_ids[i % len(dimension_ids)], f'题目{i + 1}', qtype, i + 10, options)
+        question(qid, dimension_ids[0], '意见建议', 'text', count + 10)
+
+    parent = questionnaire(f'合成问卷（种子 {spec.seed}）')
+    basic = Dimension(questionnaire_id=parent.id, name=BASIC_DIMENSION_NAME, weight=0)
+    dimensions = [Dimension(questionnaire_id=parent.id, name=f'维度{i + 1}', weight=1.0)
+                  for i in range(spec.dimensions)]
+    db.session.add_all([basic] + dimensions)
+    db.session.flush()
+    dimension_ids = [d.id for d in dimensions]
+
+    department_question, department_options = question(
+        parent.id, basic.id, '所在科室', 'single', 1,
+        [(name, 0, False) for name in DEPARTMENTS[:spec.departments]]
+    )
+    question(parent.id, basic.id, '职称', 'single', 2, [(name, 0, False) for name in TITLES])
+    question(parent.id, basic.id, '所在地区', 'address', 3)
+    scored_questions(parent.id, dimension_ids, spec.questions)
+
+    # 前 branches 个科室各自跳转到一份子问卷，子问卷的题目挂在父问卷的维度上
+    children = []
+    for i, option in enumerate(department_options[:spec.branches]):
+        child = questionnaire(f'合成子问卷{i + 1}（{option.text}）', parent.id)
+        scored_questions(child.id, dimension_ids, spec.child_questions)
+        db.session.add(BranchRule(questionnaire_id=parent.id, question_id=department_question.id,
+                                  option_id=option.id, next_questionnaire_id=child.id))
+        children.append(child)
+    db.session.flush()
+
+    def add_levels(qid, dimension_id, upper, group_key=None):
+        step = upper / spec.levels
+        db.session.add_all([
+            AssessmentLevel(
+                questionnaire_id=qid, name=f'等级{i + 1}', opinion=f'评估意见{i + 1}',
+                min_score=round(step * i, 2), max_score=round(step * (i + 1), 2) if i < spec.levels - 1 else upper,
+                group_key=group_key, dimension_id=dimension_id
+            ) for i in range(spec.levels)
+        ])
+
+    # 单选最高分为 options，多选全选为 1..options 之和，取二者的中间值估计满分
+    per_question = (spec.options + spec.options * (spec.options + 1) / 2) / 2
+    group_keys = [None] + [generate_group_key(department_question, option) for option in department_options]
+    for group_key in group_keys:
+        add_levels(parent.id, None, spec.questions * per_question, group_key)
+        for dimension_id in dimension_ids:
+            add_levels(parent.id, dimension_id, spec.questions * per_question / spec.dimensions, group_key)
+    for child in children:
+        add_levels(child.id, None, spec.child_questions * per_question)
+    db.session.flush()
+    return parent
+
+
+class AnswerProfile:
+    """问卷各题的答案分布，由种子和题目顺序决定，与生成块无关"""
+
+    def __init__(self, plan, seed):
+        rnd = random.Random(f'{seed}:profile:{plan.questionnaire_id}')
+        options_by_question = {}
+        for option in sorted(plan.options.values(), key=lambda o: o.id):
+            options_by_question.setdefault(option.question_id, []).append(option)
+        self.plan = plan
+        self.questions = []
+        for question in sorted(plan.questions.values(), key=lambda q: q.id):
+            options = options_by_question.get(question.id, [])
+            if question.type == 'multiple':
+                # 每个选项独立以各自的概率被选中
+                weights = [rnd.uniform(0.05, 0.7) for _ in options]
+            else:
+                weights = _weights(rnd, len(options))
+            self.questions.append((question, [o.id for o in options], weights))
+        self.provinces = _weights(rnd, len(PROVINCES), skew=0.9)
+
+    def answers(self, rnd):
+        """生成一份与填写接口提交格式一致的答案列表"""
+        answers = []
+        for question, option_ids, weights in self.questions:
+            if question.type == 'address':
+                province = rnd.choices(PROVINCES, self.provinces)[0]
+                city = province + f'{min(int(rnd.expovariate(0.5)) + 1, 20):02d}'
+                area = [province, city, city + f'{rnd.randint(1, 12):02d}']
+                answers.append({'question_id': question.id,
+                                'text': json.dumps({'area': area, 'detail': f'{rnd.randint(1, 999)}号'})})
+            elif question.type == 'text':
+                if rnd.random() < 0.2:
+                    answers.append({'question_id': question.id, 'text': f'建议{rnd.randint(1, 5000)}'})
+            elif question.type == 'multiple':
+                chosen = [option_id for option_id, p in zip(option_ids, weights) if rnd.random() < p]
+                chosen = chosen or [rnd.choice(option_ids)]
+                other = any(self.plan.options[option_id].is_other for option_id in chosen)
+                answers.append({'question_id': question.id, 'answer': chosen, 'text': '其他说明' if other else None})
+            elif option_ids:
+                chosen = rnd.choices(option_ids, weights)[0]
+                other = self.plan.options[chosen].is_other
+                answers.append({'question_id': question.id, 'answer': chosen, 'text': '其他说明' if other else None})
+        return answers
+
+
+def plan_chunks(spec, first_id):
+    """把答卷切分为生成块，并为每块预留答卷 id 区间"""
+    chunks = []
+    for index, start in enumerate(range(0, spec.submissions, spec.chunk_size)):
+        chunks.append(GenerateChunk(index, start, min(spec.chunk_size, spec.submissions - start),
+                                    first_id + start * 2))
+    return chunks
+
+
+def generate_chunk(spec, parent_id, chunk, anchor):
+    """生成并写入一个块的答卷（含分支子答卷）及其答案、区域、选项与维度得分，在当前应用上下文中执行并提交
+
+    Returns:
+        tuple: (答卷数, 答案数)
+    """
+    parent = Questionnaire.query.get(parent_id)
+    plan = build_scoring_plan(parent)
+    profile = AnswerProfile(plan, spec.seed)
+    rules = BranchRule.query.filter_by(questionnaire_id=parent_id, is_deleted=False).all()
+    child_profiles = {}
+    for rule in rules:
+        child = Questionnaire.query.get(rule.next_questionnaire_id)
+        child_profiles[rule.option_id] = (child.id, AnswerProfile(build_scoring_plan(child), spec.seed))
+    branch_question_ids = {rule.question_id for rule in rules}
+
+    rnd = random.Random(f'{spec.seed}:chunk:{chunk.index}')
+    submissions, answers, areas, options, dimension_scores = [], [], [], [], []
+
+    def add(submission_id, questionnaire_id, plan, payload, submitted_at, is_deleted):
+        scored = plan.score(payload)
+        submissions.append({
+            'id': submission_id,
+            'questionnaire_id': questionnaire_id,
+            'submitted_at': submitted_at,
+            'total_score': scored.total_score,
+            'assessment_level': scored.assessment_level,
+            'assessment_opinion': scored.assessment_opinion,
+            'group_key': scored.group_key,
+            'is_deleted': is_deleted
+        })
+        answers.extend(dict(row, submission_id=submission_id) for row in scored.answers)
+        areas.extend(collect_area_rows(plan, submission_id, scored.answers))
+        options.extend(collect_option_rows(plan, submission_id, scored.answers))
+        dimension_scores.extend(dict(row, submission_id=submission_id) for row in scored.dimension_scores)
+
+    for i in range(chunk.count):
+        submission_id = chunk.first_id + i * 2
+        submitted_at = anchor - timedelta(seconds=rnd.uniform(0, spec.days * 86400))
+        is_deleted = rnd.random() < spec.deleted_ratio
+        payload = profile.answers(rnd)
+        add(submission_id, parent_id, plan, payload, submitted_at, is_deleted)
+
+        branch = next((a['answer'] for a in payload if a['question_id'] in branch_question_ids), None)
+        if branch in child_profiles:
+            child_id, child_profile = child_profiles[branch]
+            add(submission_id + 1, child_id, child_profile.plan, child_profile.answers(rnd),
+                submitted_at + timedelta(seconds=rnd.randint(30, 600)), is_deleted)
+
+    db.session.bulk_insert_mappings(Submission, submissions)
+    db.session.bulk_insert_mappings(Answer, answers)
+    db.session.bulk_insert_mappings(AnswerArea, areas)
+    db.session.bulk_insert_mappings(AnswerOption, options)
+    db.session.bulk_insert_mappings(DimensionScore, dimension_scores)
+    db.session.commit()
+    return len(submissions), len(answers)
+
+
+def finish_generation(parent_id):
+    """写入完成后重建父问卷及子问卷的统计汇总"""
+    questionnaire_ids = [parent_id] + [
+        qid for (qid,) in db.session.query(Questionnaire.id).filter_by(parent_id=parent_id).all()
+    ]
+    for qid in questionnaire_ids:
+        rebuild_questionnaire_stats(qid)
+    db.session.commit()
+    return questionnaire_ids
+
+
+def next_submission_id():
+    """新生成答卷的起始 id"""
+    return (db.session.query(db.func.max(Submission.id)).scalar() or 0) + 1
+
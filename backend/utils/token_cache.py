@@ -0,0 +1,53 @@
+"""
+@description 已验证令牌的进程内缓存：token -> admin_id，带 TTL，修改密码或删除管理员时失效
+"""
+
+import os
+import time
+from collections import namedtuple
+from sqlalchemy import event, inspect
+from models import Admin
+from utils.questionnaire_cache import LRUCache
+
+# 验证结果的最长缓存时间（秒）；其他进程中的缓存最多在该时间后失效
+AUTH_CACHE_TTL = int(os.getenv('AUTH_CACHE_TTL', 60))
+AUTH_CACHE_SIZE = int(os.getenv('AUTH_CACHE_SIZE', 1024))
+
+# expires_at 为时间戳，不超过令牌自身的过期时间
+VerifiedToken = namedtuple('VerifiedToken', ['admin_id', 'expires_at'])
+
+_tokens = LRUCache(AUTH_CACHE_SIZE)
+
+
+def get_cached_admin_id(token):
+    """返回缓存中令牌对应的管理员ID，未缓存或已过期时返回 None"""
+    entry = _tokens.get(token)
+    if entry is None:
+        return None
+    if entry.expires_at <= time.time():
+        _tokens.discard(token)
+        return None
+    return entry.admin_id
+
+
+def remember_token(token, admin_id, token_exp):
+    """缓存验证通过的令牌"""
+    if AUTH_CACHE_TTL <= 0:
+        return
+    _tokens.set(token, VerifiedToken(admin_id, min(time.time() + AUTH_CACHE_TTL, token_exp)))
+
+
+def invalidate_admin_tokens(admin_id):
+    """删除该管理员的全部缓存令牌"""
+    _tokens.discard_where(lambda entry: entry.admin_id == admin_id)
+
+
+@event.listens_for(Admin, 'after_delete')
+def _admin_deleted(mapper, connection, target):
+    invalidate_admin_tokens(target.id)
+
+
+@event.listens_for(Admin, 'after_update')
+def _admin_updated(mapper, connection, target):
+    if inspect(target).attrs.password_hash.history.has_changes():
+        invalidate_admin_tokens(target.id)
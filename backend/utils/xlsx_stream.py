@@ -0,0 +1,122 @@
+"""
+@description 流式生成单工作表的 xlsx 文件，边写边输出，内存占用与行数无关
+"""
+
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+# XML 1.0 不允许的控制字符
+_ILLEGAL_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+# 工作表名称不允许的字符
+_ILLEGAL_SHEET_CHARS = re.compile(r'[\[\]:*?/\\]')
+# 每写入多少行向外输出一次已压缩的数据
+FLUSH_EVERY_ROWS = 200
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{name}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '</Relationships>'
+)
+_SHEET_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+_SHEET_TAIL = '</sheetData></worksheet>'
+
+
+class _Sink:
+    """zipfile 的输出目标：不支持 seek，写入的数据暂存到下次取走"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _cell(value):
+    # 文本一律写为内联字符串，不会被当作公式执行，无需像 CSV 那样加前导单引号
+    if value is None or value == '':
+        return '<c/>'
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return f'<c><v>{value}</v></c>'
+    text = escape(_ILLEGAL_XML_CHARS.sub('', str(value)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _sheet_name(name):
+    name = _ILLEGAL_SHEET_CHARS.sub('_', _ILLEGAL_XML_CHARS.sub('', name))[:31] or 'Sheet1'
+    return escape(name, {'"': '&quot;'})
+
+
+def _row(index, values):
+    return f'<row r="{index}">{"".join(_cell(v) for v in values)}</row>'
+
+
+def stream_xlsx(rows, sheet_name='Sheet1'):
+    """把行迭代器写成 xlsx，逐块产出文件内容
+
+    Args:
+        rows: 每行为值列表，数字写为数值单元格，其余写为文本（包括以 = 开头的内容）
+        sheet_name: 工作表名称
+
+    Yields:
+        bytes
+    """
+    sink = _Sink()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr('[Content_Types].xml', _CONTENT_TYPES)
+        zf.writestr('_rels/.rels', _ROOT_RELS)
+        zf.writestr('xl/workbook.xml', _WORKBOOK.format(name=_sheet_name(sheet_name)))
+        zf.writestr('xl/_rels/workbook.xml.rels', _WORKBOOK_RELS)
+        yield sink.drain()
+
+        with zf.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(_SHEET_HEAD.encode('utf-8'))
+            for index, values in enumerate(rows, 1):
+                sheet.write(_row(index, values).encode('utf-8'))
+                if index % FLUSH_EVERY_ROWS == 0:
+                    data = sink.drain()
+                    if data:
+                        yield data
+            sheet.write(_SHEET_TAIL.encode('utf-8'))
+    yield sink.drain()
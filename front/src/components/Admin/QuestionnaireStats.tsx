@@ -1,5 +1,5 @@
 import React, { useEffect, useState } from 'react';
-import { Card, Table, Typography, Button, message, Spin, Select, Row, Col } from 'antd';
+import { Card, Table, Typography, Button, message, Spin, Select, Row, Col, DatePicker, Progress } from 'antd';
 import { DownloadOutlined } from '@ant-design/icons';
 import { get } from '../../utils/request';
 import { useParams } from 'react-router-dom';
@@ -39,14 +39,38 @@ interface LevelByBasic {
   count: number;
 }
 
+interface OptionDistribution {
+  total_submissions: number;
+  questions: {
+    question_id: number;
+    text: string;
+    type: string;
+    answered: number;
+    other_text_count: number;
+    options: { option_id: number; text: string; is_other: boolean; count: number; percent: number }[];
+  }[];
+  score_distribution: {
+    avg: number | null;
+    min: number | null;
+    max: number | null;
+    buckets: { min: number; max: number; count: number }[];
+  };
+}
+
+interface DistributionFilters {
+  group_key?: string;
+  level?: string;
+  start_date?: string;
+  end_date?: string;
+}
+
 interface StatsData {
   total_submissions: number;
   dimension_scores: DimensionScore[];
-  raw_answers: any[];
+  raw_answers?: any[];
   area_stats: Record<string, number>;
   address_questions: { id: number; text: string }[];
-  area_stats_raw: any[];
-  area_level_stats_raw: any[];
+  area_level_stats: { question_id: number; area: string[]; level: string | null; count: number }[];
 }
 
 function getAreaNameByCodes(codes: string[] | number[]): string {
@@ -72,9 +96,11 @@ const QuestionnaireStats: React.FC = () => {
   const [selectedAddressQ, setSelectedAddressQ] = useState<number | undefined>(undefined);
   const [areaLevel, setAreaLevel] = useState<'province' | 'city' | 'district'>('province');
   const [addressQuestions, setAddressQuestions] = useState<{ id: number; text: string }[]>([]);
-  const [areaStatsRaw, setAreaStatsRaw] = useState<any[]>([]);
-  const [areaLevelStatsRaw, setAreaLevelStatsRaw] = useState<any[]>([]);
+  const [areaLevelStats, setAreaLevelStats] = useState<any[]>([]);
   const [dimensionWeights, setDimensionWeights] = useState<Record<number, number>>({});
+  const [distribution, setDistribution] = useState<OptionDistribution | null>(null);
+  const [distributionFilters, setDistributionFilters] = useState<DistributionFilters>({});
+  const [groups, setGroups] = useState<{ group_key: string; label: string }[]>([]);
 
   const isUnmountedRef = useUnmountProtection();
   const { getController } = useAbortController();
@@ -120,8 +146,7 @@ const QuestionnaireStats: React.FC = () => {
         
         setStats(overviewData);
         setAddressQuestions(overviewData?.address_questions || []);
-        setAreaStatsRaw(overviewData?.area_stats_raw || []);
-        setAreaLevelStatsRaw(overviewData?.area_level_stats_raw || []);
+        setAreaLevelStats(overviewData?.area_level_stats || []);
         
         if ((overviewData?.address_questions || []).length > 0) {
           setSelectedAddressQ(overviewData.address_questions[0].id);
@@ -149,6 +174,43 @@ const QuestionnaireStats: React.FC = () => {
     }
   }, [id, fetchWithRetry, getController, isUnmountedRef]);
 
+  React.useEffect(() => {
+    if (id) {
+      globalRequestCache.withDeduplication(
+        `basic-groups-${id}`,
+        () => fetchWithRetry(`/api/questionnaire/${id}/basic-groups`)
+      ).then(res => {
+        if (!isUnmountedRef.current) {
+          setGroups((res as any).data || []);
+        }
+      }).catch(() => {});
+    }
+  }, [id, fetchWithRetry, isUnmountedRef]);
+
+  // 选项分布由服务端聚合，筛选条件变化时重新获取
+  React.useEffect(() => {
+    if (id) {
+      const controller = getController();
+      const params = new URLSearchParams();
+      Object.entries(distributionFilters).forEach(([key, value]) => {
+        if (value) params.append(key, value);
+      });
+      const query = params.toString();
+
+      globalRequestCache.withDeduplication(
+        `option-distribution-${id}-${query}`,
+        () => fetchWithRetry(`/api/stats/questionnaire/${id}/option-distribution?${query}`, { signal: controller.signal })
+      ).then(res => {
+        if (!isUnmountedRef.current) {
+          setDistribution((res as any).data || null);
+        }
+      }).catch((error) => {
+        if (isUnmountedRef.current || error.name === 'AbortError') return;
+        console.error('Failed to fetch option distribution:', error);
+      });
+    }
+  }, [id, distributionFilters, fetchWithRetry, getController, isUnmountedRef]);
+
   React.useEffect(() => {
     if (id && selectedBasicQ) {
       const controller = getController();
@@ -324,9 +386,9 @@ const QuestionnaireStats: React.FC = () => {
   };
 
   // 区域 × 评估等级 聚合
-  function aggregateAreaLevelStats(raw: any[], questionId: number | undefined, level: 'province' | 'city' | 'district') {
+  function aggregateAreaLevelStats(grouped: any[], questionId: number | undefined, level: 'province' | 'city' | 'district') {
     if (!questionId) return { areaList: [], levelList: [], data: [] };
-    const filtered = raw.filter(item => Number(item.question_id) === Number(questionId) && item.level);
+    const filtered = grouped.filter(item => Number(item.question_id) === Number(questionId) && item.level);
     // 统计所有出现过的等级
     const levelSet = new Set(filtered.map(item => item.level));
     const levelList = Array.from(levelSet);
@@ -339,7 +401,7 @@ const QuestionnaireStats: React.FC = () => {
       else if (level === 'district') key = item.area.slice(0, 3).join('/');
       if (!key) return;
       if (!areaMap[key]) areaMap[key] = {};
-      areaMap[key][item.level] = (areaMap[key][item.level] || 0) + 1;
+      areaMap[key][item.level] = (areaMap[key][item.level] || 0) + item.count;
     });
     const areaList = Object.keys(areaMap);
     // 生成表格和图表数据
@@ -354,10 +416,10 @@ const QuestionnaireStats: React.FC = () => {
   }
 
   // 区域 × 评估等级 聚合结果
-  const areaLevelAgg = aggregateAreaLevelStats(areaLevelStatsRaw, selectedAddressQ, areaLevel);
+  const areaLevelAgg = aggregateAreaLevelStats(areaLevelStats, selectedAddressQ, areaLevel);
 
   // 调试用：打印数据
-  console.log('areaLevelStatsRaw', areaLevelStatsRaw);
+  console.log('areaLevelStats', areaLevelStats);
   console.log('areaLevelAgg', areaLevelAgg);
   console.log('selectedAddressQ', selectedAddressQ, typeof selectedAddressQ);
 
@@ -376,6 +438,21 @@ const QuestionnaireStats: React.FC = () => {
     }))
   };
 
+  // 总分分布柱状图 option
+  const scoreBarOption = {
+    tooltip: { trigger: 'axis' },
+    xAxis: {
+      type: 'category',
+      data: (distribution?.score_distribution.buckets || []).map(b => `${b.min}~${b.max}`)
+    },
+    yAxis: { type: 'value' },
+    series: [{
+      name: '人数',
+      type: 'bar',
+      data: (distribution?.score_distribution.buckets || []).map(b => b.count)
+    }]
+  };
+
   // 导出CSV
   const handleExport = () => {
     if (!stats || !stats.raw_answers) return;
@@ -452,6 +529,64 @@ const QuestionnaireStats: React.FC = () => {
         )}
       </Card>
 
+      {/* 选项分布与总分分布 */}
+      <Card title="题目选项分布" style={{ marginBottom: 32 }}>
+        <div style={{ marginBottom: 16, display: 'flex', gap: 16, alignItems: 'center', flexWrap: 'wrap' }}>
+          <Select
+            style={{ width: 220 }}
+            placeholder="用户分组"
+            allowClear
+            value={distributionFilters.group_key}
+            onChange={value => setDistributionFilters(f => ({ ...f, group_key: value }))}
+            options={groups.map(g => ({ label: g.label, value: g.group_key }))}
+          />
+          <Select
+            style={{ width: 160 }}
+            placeholder="评估等级"
+            allowClear
+            value={distributionFilters.level}
+            onChange={value => setDistributionFilters(f => ({ ...f, level: value }))}
+            options={levelStats.filter(l => l.level).map(l => ({ label: l.level, value: l.level }))}
+          />
+          <DatePicker.RangePicker
+            onChange={dates => setDistributionFilters(f => ({
+              ...f,
+              start_date: dates?.[0]?.format('YYYY-MM-DD'),
+              end_date: dates?.[1]?.format('YYYY-MM-DD')
+            }))}
+          />
+          <span>答卷数：{distribution?.total_submissions ?? '-'}，平均分：{distribution?.score_distribution.avg ?? '-'}</span>
+        </div>
+        {(distribution?.score_distribution.buckets || []).length > 0 && (
+          <ReactECharts option={scoreBarOption} style={{ height: 300, marginBottom: 24 }} />
+        )}
+        {(distribution?.questions || []).map(q => (
+          <div key={q.question_id} style={{ marginBottom: 24 }}>
+            <Title level={5}>
+              {q.text}（{q.type === 'multiple' ? '多选' : '单选'}，作答 {q.answered} 人
+              {q.other_text_count > 0 ? `，"其他"填写 ${q.other_text_count} 条` : ''}）
+            </Title>
+            <Table
+              dataSource={q.options}
+              rowKey={o => o.option_id}
+              size="small"
+              pagination={false}
+              columns={[
+                { title: '选项', dataIndex: 'text', key: 'text' },
+                { title: '人数', dataIndex: 'count', key: 'count', width: 100 },
+                {
+                  title: '占比',
+                  dataIndex: 'percent',
+                  key: 'percent',
+                  width: 240,
+                  render: (percent: number) => <Progress percent={percent} size="small" />
+                }
+              ]}
+            />
+          </div>
+        ))}
+      </Card>
+
       {/* 第四块：区域分布 */}
       {addressQuestions.length > 0 && (
         <Card title="区域分布" style={{ marginBottom: 32 }}>
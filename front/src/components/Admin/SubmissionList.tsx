@@ -1,7 +1,7 @@
 import React, { useEffect, useState } from 'react';
 import { Table, Card, Button, Tag, message, Form, Select, Input, Cascader, Popconfirm } from 'antd';
-import { EyeOutlined, DeleteOutlined } from '@ant-design/icons';
-import { get, del } from '../../utils/request';
+import { EyeOutlined, DeleteOutlined, DownloadOutlined } from '@ant-design/icons';
+import { get, del, download } from '../../utils/request';
 import { useNavigate, useParams } from 'react-router-dom';
 import areaOptions from '../Questionnaire/areaOptions';
 
@@ -12,6 +12,13 @@ interface Submission {
   assessment_level: string;
 }
 
+interface SubmissionPage {
+  items: Submission[];
+  next_cursor: number | null;
+  total: number | null;
+}
+
+const PAGE_SIZE = 10;
 
 
 interface BasicQuestion {
@@ -25,6 +32,12 @@ const SubmissionList: React.FC = () => {
   const { id } = useParams<{ id: string }>();
   const [data, setData] = useState<Submission[]>([]);
   const [loading, setLoading] = useState(false);
+  // 游标分页：cursors[i] 为第 i 页的起始游标，第一页为 null
+  const [cursors, setCursors] = useState<(number | null)[]>([null]);
+  const [pageIndex, setPageIndex] = useState(0);
+  const [nextCursor, setNextCursor] = useState<number | null>(null);
+  const [total, setTotal] = useState<number | null>(null);
+  const [filterParams, setFilterParams] = useState<any>({});
   const [basicQuestions, setBasicQuestions] = useState<BasicQuestion[]>([]);
   const [selectedBasicQ, setSelectedBasicQ] = useState<BasicQuestion | undefined>();
   const [form] = Form.useForm();
@@ -49,18 +62,50 @@ const SubmissionList: React.FC = () => {
     }
   }, [id]);
 
-  // 查询方法
-  const fetchData = (params = {}) => {
+  // 查询方法，cursor 为空时从第一页开始并重新获取总数
+  const fetchData = (params: any = {}, cursor: number | null = null) => {
     setLoading(true);
     let url = `/api/stats/questionnaire/${id}/submissions`;
-    get<Submission[]>(url, params)
-      .then(res => setData(res.data || []))
+    const query: any = { ...params, limit: PAGE_SIZE };
+    if (cursor !== null) {
+      query.cursor = cursor;
+    } else {
+      query.with_total = 1;
+    }
+    get<SubmissionPage>(url, query)
+      .then(res => {
+        setData(res.data?.items || []);
+        setNextCursor(res.data?.next_cursor ?? null);
+        if (cursor === null) setTotal(res.data?.total ?? null);
+      })
       .catch(() => message.error('加载答卷列表失败'))
       .finally(() => setLoading(false));
   };
 
+  // 按新的筛选条件从第一页查询
+  const search = (params: any = {}) => {
+    setFilterParams(params);
+    setCursors([null]);
+    setPageIndex(0);
+    fetchData(params);
+  };
+
+  const goNext = () => {
+    if (nextCursor === null) return;
+    const nextCursors = [...cursors.slice(0, pageIndex + 1), nextCursor];
+    setCursors(nextCursors);
+    setPageIndex(pageIndex + 1);
+    fetchData(filterParams, nextCursor);
+  };
+
+  const goPrev = () => {
+    if (pageIndex === 0) return;
+    setPageIndex(pageIndex - 1);
+    fetchData(filterParams, cursors[pageIndex - 1]);
+  };
+
   useEffect(() => {
-    if (id) fetchData();
+    if (id) search();
   }, [id]);
 
   const onFinish = (values: any) => {
@@ -76,7 +121,7 @@ const SubmissionList: React.FC = () => {
         params.basic_question_value = values.basic_question_value;
       }
     }
-    fetchData(params);
+    search(params);
   };
 
   // 删除答卷
@@ -84,12 +129,27 @@ const SubmissionList: React.FC = () => {
     try {
       await del(`/api/stats/questionnaire/${id}/submissions/${submissionId}`);
       message.success('删除成功');
-      fetchData(form.getFieldsValue()); // 重新加载列表，保持当前筛选条件
+      search(filterParams); // 重新加载列表，保持当前筛选条件
     } catch (error) {
       message.error('删除失败');
     }
   };
 
+  // 导出全部答卷明细（服务端流式生成）
+  const handleExport = async (format: 'csv' | 'xlsx') => {
+    try {
+      const blob = await download(`/api/stats/questionnaire/${id}/export`, { format });
+      const url = window.URL.createObjectURL(blob);
+      const a = document.createElement('a');
+      a.href = url;
+      a.download = `answers_${id}.${format}`;
+      a.click();
+      window.URL.revokeObjectURL(url);
+    } catch (error) {
+      message.error('导出失败');
+    }
+  };
+
   const columns = [
     { title: '答卷ID', dataIndex: 'id', key: 'id' },
     { title: '提交时间', dataIndex: 'submitted_at', key: 'submitted_at' },
@@ -130,7 +190,15 @@ const SubmissionList: React.FC = () => {
   };
 
   return (
-    <Card title="答卷者列表">
+    <Card
+      title="答卷者列表"
+      extra={
+        <div>
+          <Button icon={<DownloadOutlined />} onClick={() => handleExport('csv')} style={{ marginRight: 8 }}>导出CSV</Button>
+          <Button icon={<DownloadOutlined />} onClick={() => handleExport('xlsx')}>导出Excel</Button>
+        </div>
+      }
+    >
       <Form
         form={form}
         layout="inline"
@@ -172,10 +240,16 @@ const SubmissionList: React.FC = () => {
           <Button type="primary" htmlType="submit">查询</Button>
         </Form.Item>
         <Form.Item>
-          <Button onClick={() => { form.resetFields(); setSelectedBasicQ(undefined); fetchData(); }}>重置</Button>
+          <Button onClick={() => { form.resetFields(); setSelectedBasicQ(undefined); search(); }}>重置</Button>
         </Form.Item>
       </Form>
-      <Table rowKey="id" columns={columns} dataSource={data} loading={loading} pagination={{ pageSize: 10 }} />
+      <Table rowKey="id" columns={columns} dataSource={data} loading={loading} pagination={false} />
+      <div style={{ marginTop: 16, display: 'flex', justifyContent: 'flex-end', alignItems: 'center', gap: 8 }}>
+        {total !== null && <span>共 {total} 条</span>}
+        <span>第 {pageIndex + 1} 页</span>
+        <Button onClick={goPrev} disabled={pageIndex === 0 || loading}>上一页</Button>
+        <Button onClick={goNext} disabled={nextCursor === null || loading}>下一页</Button>
+      </div>
     </Card>
   );
 };
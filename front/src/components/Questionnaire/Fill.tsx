@@ -54,11 +54,31 @@ interface QuestionnaireResponse {
 }
 
 interface SubmitResponse {
-  submission_id: number;
-  total_score: number;
-  assessment_level: string;
+  submission_id?: number;
+  total_score?: number;
+  assessment_level?: string;
+  // 异步提交模式下返回令牌，需轮询处理结果
+  token?: string;
+  status?: string;
 }
 
+interface SubmitStatus {
+  status: 'pending' | 'processing' | 'done' | 'failed';
+  submission_id?: number;
+  msg?: string;
+}
+
+// 本次填写的幂等键，网络中断后重试提交时不变，服务端据此返回原答卷而不重复写入
+const createClientKey = (): string => {
+  if (typeof crypto !== 'undefined' && typeof crypto.randomUUID === 'function') {
+    return crypto.randomUUID();
+  }
+  return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 12)}`;
+};
+
+const SUBMIT_POLL_INTERVAL = 1000;
+const SUBMIT_POLL_TIMEOUT = 120000;
+
 // 递归拍平题目树
 const flattenQuestions = (tree: any[]): any[] => {
   const result: any[] = [];
@@ -399,6 +419,7 @@ const Fill: React.FC<FillProps> = (props) => {
   const abortControllerRef = useRef<AbortController | null>(null);
   const requestCacheRef = useRef<Map<string, Promise<any>>>(new Map());
   const isUnmountedRef = useRef(false);
+  const clientKeyRef = useRef<string>(createClientKey());
 
   // 清理函数
   useEffect(() => {
@@ -626,13 +647,31 @@ const Fill: React.FC<FillProps> = (props) => {
       });
       
       const res = await post<SubmitResponse>(`/api/questionnaire/fill/${access_code}/submit`, { 
-        answers: answerArr 
+        answers: answerArr,
+        client_key: clientKeyRef.current
       });
       
       if (isUnmountedRef.current) return;
       
-      if (res.data?.submission_id) {
-        navigate(`/result/${res.data.submission_id}`);
+      let submissionId = res.data?.submission_id;
+      if (!submissionId && res.data?.token) {
+        // 异步提交：轮询直到后台写入完成
+        const deadline = Date.now() + SUBMIT_POLL_TIMEOUT;
+        while (!submissionId && Date.now() < deadline) {
+          await new Promise(resolve => setTimeout(resolve, SUBMIT_POLL_INTERVAL));
+          if (isUnmountedRef.current) return;
+          const statusRes = await get<SubmitStatus>(`/api/questionnaire/fill/submit-status/${res.data.token}`);
+          if (statusRes.data?.status === 'failed') {
+            message.warning(statusRes.data.msg || '提交失败');
+            setSubmitted(false);
+            return;
+          }
+          submissionId = statusRes.data?.submission_id;
+        }
+      }
+      
+      if (submissionId) {
+        navigate(`/result/${submissionId}`);
       } else {
         message.warning('提交失败');
         setSubmitted(false);
@@ -149,4 +149,9 @@ export const put = <T>(url: string, data?: any): Promise<ApiResponse<T>> => {
 
 export const del = <T>(url: string): Promise<ApiResponse<T>> => {
   return instance.delete<any, ApiResponse<T>>(url);
-}; 
\ No newline at end of file
+}; 
+
+// 下载文件（导出等耗时较长的接口不设超时）
+export const download = (url: string, params?: any): Promise<Blob> => {
+  return instance.get<any, Blob>(url, { params, responseType: 'blob', timeout: 0 });
+};